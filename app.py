@@ -3,15 +3,26 @@ from dotenv import load_dotenv
 import os
 from datetime import datetime
 import json
+import uuid
 
-from components.sidebar import render_sidebar
+from components.sidebar import render_sidebar, render_live_stats
 from components.chat_interface import ChatInterface
-from components.hint_buttons import render_hint_buttons
+from components.hint_buttons import render_hint_buttons, HINT_REQUEST_MESSAGES
 from components.analytics import render_analytics
 from components.teacher_selection import render_teacher_selection
 from utils.session_manager import SessionManager
-from utils.prompt_manager import PromptManager
-from config.settings import APP_CONFIG
+from utils.prompt_manager import get_prompt_manager
+from utils.problem_analyzer import start_problem_analysis, get_problem_analysis
+from utils.hint_prefetcher import HintPrefetcher, is_prefetch_enabled
+from utils.solution_review import start_solution_review
+from utils.rerun import fragment, request_rerun
+from utils.response_parser import extract_topic_from_response, is_correct_verdict
+from utils.telemetry import request_trace
+from utils.profiler import profile_rerun, profile_component
+from utils.analytics_engine import (
+    empty_analytics_state, EVENT_HINT_USED, EVENT_PROBLEM_STARTED, EVENT_PROBLEM_SOLVED, EVENT_ANSWER_INCORRECT
+)
+from config.settings import APP_CONFIG, UI_CONFIG, LEARNING_CONFIG
 
 load_dotenv()
 
@@ -23,6 +34,13 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+def new_text_problem():
+    """이미지 없이 대화로 푸는 문제: 판정 집계/풀이 리뷰가 문제별로 나뉘도록 ID를 새로 발급"""
+    return {
+        "problem_id": f"text-{uuid.uuid4().hex[:12]}",
+        "started_at": datetime.now().isoformat()
+    }
+
 # CSS 스타일 적용
 def load_css():
     """커스텀 CSS 로드"""
@@ -129,29 +147,24 @@ def init_session_state():
     if 'chat_interface' not in st.session_state:
         st.session_state.chat_interface = ChatInterface()
     if 'prompt_manager' not in st.session_state:
-        st.session_state.prompt_manager = PromptManager()
+        st.session_state.prompt_manager = get_prompt_manager()
+    if 'hint_prefetcher' not in st.session_state:
+        st.session_state.hint_prefetcher = HintPrefetcher()
     
     # 기본 설정값들
     defaults = {
         'chat_history': [],
         'hint_level': 0,
         'selected_persona': 'friendly',
-        'total_problems': 0,
-        'solved_problems': 0,
         'current_problem': None,
-        'analytics_data': {
-            'total_hints': 0,
-            'hint_distribution': [0, 0, 0],
-            'problem_types': {},
-        },
+        'analytics_data': empty_analytics_state(),
         'show_analytics': False,
         'uploaded_image': None,
         'user_name': '학생',
 
         # 🔽🔽 여기 추가
         'last_uploaded_filename': None,
-        'solution_review_cache_key': None,
-        'solution_review_text': "",
+        'last_solved_problem_id': None,
     }
     
     for key, value in defaults.items():
@@ -162,41 +175,61 @@ def init_session_state():
 def main():
     """메인 애플리케이션 실행"""
     
-    # CSS 로드
-    load_css()
-    
-    # 세션 상태 초기화
-    init_session_state()
-    
-    # 사이드바 렌더링
-    render_sidebar()
-    
-    # 메인 컨테이너
-    main_container = st.container()
-    
-    with main_container:
-        # 헤더
-        st.markdown("""
-        <div class="main-header">
-            <h1>🎓 나만의 AI 과외쌤 "피움"</h1>
-            <p>정답을 알려주지 않고 사고력을 키워주는 단계별 학습도구 AI</p>
-        </div>
-        """, unsafe_allow_html=True)
+    # 디버그 모드에서는 실행 1회의 컴포넌트별 시간과 rerun 원인을 기록 (utils/profiler.py)
+    with profile_rerun():
         
-        # 탭 생성
-        tab1, tab2, tab3 = st.tabs(["📚 학습하기", "📊 학습 분석", "ℹ️ 사용 방법"])
+        # CSS 로드
+        load_css()
         
-        with tab1:
-            render_learning_tab()
+        # 세션 상태 초기화
+        init_session_state()
         
-        with tab2:
-            render_analytics_tab()
+        # 사이드바 렌더링 (학습 통계 자리는 비워 두고 받음)
+        stats_slot = render_sidebar()
         
-        with tab3:
-            render_help_tab()
-
-def render_learning_tab():
-    """학습 탭 렌더링"""
+        # 메인 컨테이너
+        main_container = st.container()
+        
+        with main_container:
+            # 헤더
+            st.markdown("""
+            <div class="main-header">
+                <h1>🎓 나만의 AI 과외쌤 "피움"</h1>
+                <p>정답을 알려주지 않고 사고력을 키워주는 단계별 학습도구 AI</p>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            if UI_CONFIG.get('navigation') == 'tabs':
+                # 탭 생성 (st.tabs는 보이지 않는 탭까지 매 rerun마다 전부 실행함)
+                tab1, tab2, tab3 = st.tabs(list(MAIN_VIEWS.keys()))
+                
+                with tab1:
+                    render_learning_tab(stats_slot)
+                
+                with tab2:
+                    render_analytics_tab()
+                
+                with tab3:
+                    render_help_tab()
+            else:
+                # 선택한 화면만 실행: 채팅으로 생긴 rerun이 분석 차트/풀이 리뷰 비용을 내지 않음
+                view = st.radio(
+                    "화면",
+                    list(MAIN_VIEWS.keys()),
+                    horizontal=True,
+                    key='active_view',
+                    label_visibility='collapsed'
+                )
+                if MAIN_VIEWS[view] is render_learning_tab:
+                    render_learning_tab(stats_slot)
+                else:
+                    # 대화 패널이 없는 화면에서는 통계를 여기서 그림
+                    with stats_slot:
+                        render_live_stats()
+                    MAIN_VIEWS[view]()
+
+def render_learning_tab(stats_slot):
+    """학습 탭 렌더링 (stats_slot: 사이드바 학습 통계 자리, 대화 패널이 채움)"""
 
     # 현재 선택된 선생님 페르소나 표시 (기존 코드 그대로 둬도 되고, 빼도 됨)
     persona_info = get_persona_info(st.session_state.selected_persona)
@@ -226,17 +259,21 @@ def render_learning_tab():
         current_name = uploaded_file.name
 
         if prev_name != current_name:
-            # 👉 새 문제라고 판단되면, 이 문제에 대한 대화/상태만 리셋
-            st.session_state.chat_history = []
+            # 👉 새 문제라고 판단되면, 이 문제에 대한 대화/상태만 리셋 (이전 대화는 저장소에 보관)
+            st.session_state.session_manager.reset_chat()
             st.session_state.hint_level = 0
             st.session_state.request_type = None
 
-            # 최근 풀이 리뷰 캐시도 초기화
-            st.session_state.solution_review_cache_key = None
-            st.session_state.solution_review_text = ""
+            # 이전 문제용으로 미리 만들어 둔 힌트 폐기
+            st.session_state.hint_prefetcher.discard()
+            st.session_state.hint_ladders = {}
+
+            # 문제 전사는 업로드 시점에 백그라운드로 한 번만 시작
+            problem_id = start_problem_analysis(uploaded_file)
 
             # 현재 문제 정보(원하면 Analytics에서 쓸 수도 있음)
             st.session_state.current_problem = {
+                "problem_id": problem_id,
                 "filename": current_name,
                 "uploaded_at": datetime.now().isoformat()
             }
@@ -252,13 +289,24 @@ def render_learning_tab():
         with col2:
             st.info("💡 이미지가 업로드되었습니다. 아래에서 힌트 단계를 선택하거나 질문을 입력하세요!")
 
-    # 👨‍🏫 선생님 선택 섹션 (새로 추가)
+    # 👨‍🏫 선생님 선택 섹션 (프래그먼트: 카드 버튼은 이 부분만 다시 실행)
 
     render_teacher_selection()
 
     st.divider()
 
-    # 🎯 힌트 버튼 섹션
+    # 🎯 힌트 + 💬 대화 (프래그먼트: 힌트 클릭/채팅은 이 패널만 다시 실행)
+    render_tutoring_panel(stats_slot)
+
+
+@fragment
+def render_tutoring_panel(stats_slot):
+    """
+    힌트 버튼 + 대화 패널
+    힌트 클릭이 바로 대화 응답 생성으로 이어지므로 둘을 한 프래그먼트로 묶음
+    통계를 바꾸는 것도 이 패널(판정/힌트)뿐이라 사이드바 통계 자리(stats_slot)도 여기서 그림
+    → 프래그먼트가 바깥 컨테이너에 그린 내용은 프래그먼트 rerun 때 그 자리에서 다시 그려짐
+    """
     st.subheader("🎯 힌트 선택")
     render_hint_buttons()
 
@@ -282,7 +330,7 @@ def render_learning_tab():
         if st.button("✅ 정답 입력하기", use_container_width=True):
             st.session_state.request_type = "answer"
             # 버튼 누른 뒤 바로 placeholder 바뀌도록
-            st.rerun()
+            request_rerun()
 
     # 👉 채팅 입력창 (모드에 따라 안내 문구 변경)
     placeholder = "질문을 입력하거나 풀이를 시도해보세요..."
@@ -294,53 +342,164 @@ def render_learning_tab():
     if user_input or st.session_state.hint_level > 0:
         handle_user_input(user_input)
 
+    # 사이드바 학습 진도 + 빠른 통계 (응답 생성 후 rerun에서 바뀐 통계로 다시 그림)
+    with stats_slot:
+        render_live_stats()
+
 
 
+@profile_component("display_chat_history")
 def display_chat_history():
-    """대화 기록 표시"""
-    for message in st.session_state.chat_history:
-        role, content, timestamp = message
-        
-        if role == "user":
-            with st.chat_message("user", avatar="👦"):
-                st.markdown(f"**{st.session_state.user_name}**: {content}")
-                st.caption(timestamp)
-        else:
-            persona_info = get_persona_info(st.session_state.selected_persona)
-            with st.chat_message("assistant", avatar=persona_info['emoji']):
-                st.markdown(f"**{persona_info['name']} 선생님**: {content}")
-                st.caption(timestamp)
+    """
+    대화 기록 표시 (최근 chat_window개만 그림)
+    - 세션 대화가 max_chat_history를 넘으면 오래된 메시지는 저장소로 보관하고 세션에서 제거
+    - '이전 대화 더 보기': 세션 안의 메시지를 한 페이지씩 더 그림
+    - '보관된 이전 대화 불러오기': 세션에 없는 메시지를 저장소에서 한 페이지씩 읽어 옴
+    """
+    session_manager = st.session_state.session_manager
+    page_size = LEARNING_CONFIG.get('chat_page_size', 20)
+
+    archived = session_manager.archive_chat_overflow()
+    if archived:
+        st.session_state.chat_has_archive = True
+        if st.session_state.get('chat_archive_view'):
+            # 이미 펼쳐 본 보관 대화와 이어지도록 뒤에 붙임
+            st.session_state.chat_archive_view.extend(archived)
+
+    history = st.session_state.chat_history
+    archive_view = st.session_state.get('chat_archive_view', [])
+    window = st.session_state.get('chat_window', page_size)
+    hidden = len(history) - window
+
+    if hidden > 0:
+        if st.button(f"⬆️ 이전 대화 더 보기 ({hidden}개)", key="chat_load_earlier", use_container_width=True):
+            st.session_state.chat_window = window + page_size
+            request_rerun()
+    elif st.session_state.get('chat_has_archive'):
+        if st.button("📦 보관된 이전 대화 불러오기", key="chat_load_archive", use_container_width=True):
+            older = session_manager.load_archived_messages(
+                offset=len(history) + len(archive_view), limit=page_size
+            )
+            if len(older) < page_size:
+                st.session_state.chat_has_archive = False
+            st.session_state.chat_archive_view = older + archive_view
+            request_rerun()
+
+    if hidden <= 0 and archive_view:
+        st.caption("📦 보관된 대화")
+        for role, content, timestamp in archive_view:
+            render_chat_message(role, content, timestamp)
+        st.divider()
+
+    for role, content, timestamp in history[max(hidden, 0):]:
+        render_chat_message(role, content, timestamp)
+
+def render_chat_message(role, content, timestamp):
+    """메시지 한 개 표시"""
+    if role == "user":
+        with st.chat_message("user", avatar="👦"):
+            st.markdown(f"**{st.session_state.user_name}**: {content}")
+            st.caption(timestamp)
+    else:
+        persona_info = get_persona_info(st.session_state.selected_persona)
+        with st.chat_message("assistant", avatar=persona_info['emoji']):
+            st.markdown(f"**{persona_info['name']} 선생님**: {content}")
+            st.caption(timestamp)
+
+def render_streaming_response(chunks, timestamp):
+    """
+    스트리밍 응답을 받는 대로 화면에 이어서 표시하고, 전체 원문 텍스트를 반환
+    (내부용 '##TOPIC:' 줄은 화면에 보이지 않게 잘라냄)
+    """
+    persona_info = get_persona_info(st.session_state.selected_persona)
+    raw_text = ""
+
+    with st.chat_message("assistant", avatar=persona_info['emoji']):
+        placeholder = st.empty()
+        for delta in chunks:
+            raw_text += delta
+            cut = raw_text.find("##TOPIC")
+            visible = raw_text if cut < 0 else raw_text[:cut]
+            # '##TOP' 처럼 토픽 표시가 중간까지만 도착한 경우도 숨김
+            visible = visible.rstrip("#")
+            placeholder.markdown(f"**{persona_info['name']} 선생님**: {visible}▌")
+
+        visible, _ = extract_topic_from_response(raw_text)
+        placeholder.markdown(f"**{persona_info['name']} 선생님**: {visible}")
+        st.caption(timestamp)
+
+    return raw_text
 
 def handle_user_input(user_input):
     """사용자 입력 처리"""
-    from utils.ai_handler import get_ai_response
+    from utils.ai_handler import (
+        get_ai_response, stream_ai_response, prefetch_ai_response, is_streaming_enabled, mark_context_reused
+    )
     
     timestamp = datetime.now().strftime("%H:%M")
     request_type = st.session_state.get("request_type", None)
+    streaming = is_streaming_enabled()
+
+    prefetcher = st.session_state.hint_prefetcher
+    session_manager = st.session_state.session_manager
 
     # 1) 사용자 메시지 저장
     if user_input:
+        # 자유 질문이 끼어들면 미리 만든 다음 단계 힌트는 대화 흐름과 맞지 않음
+        prefetcher.discard()
         st.session_state.chat_history.append(
             ("user", user_input, timestamp)
         )
+        # 스트리밍 중에는 rerun 전이라 방금 입력한 메시지도 직접 그려줌
+        if streaming:
+            render_chat_message("user", user_input, timestamp)
 
     # 2) 모드 결정
     mode = "hint"
     if request_type == "answer":
         mode = "answer"
     persona = st.session_state.get("selected_persona", "friendly")
-    # 3) AI 응답 생성
-    raw_response = get_ai_response(
-        user_input=user_input,
-        hint_level=st.session_state.hint_level,
-        persona=persona,
-        uploaded_image=st.session_state.uploaded_image,
-        chat_history=st.session_state.chat_history,
-        mode=mode
-    )
 
-    # 4) 응답에서 TOPIC 줄 추출 & 제거
-    response, topic = extract_topic_from_response(raw_response)
+    # 요청 한 건의 구간별 시간/토큰을 logs/telemetry.jsonl에 기록 (ai_handler도 같은 추적을 이어서 씀)
+    with request_trace(mode, persona=persona, hint_level=st.session_state.hint_level) as trace:
+        # 문제 전사본이 준비됐으면 이미지 대신 텍스트로 보냄
+        current_problem = st.session_state.get("current_problem") or {}
+        with trace.span('analysis_wait'):
+            problem_analysis = get_problem_analysis(current_problem.get("problem_id"))
+
+        # 3) AI 응답 생성 (스트리밍이면 토큰이 도착하는 대로 표시)
+        request_kwargs = dict(
+            user_input=user_input,
+            hint_level=st.session_state.hint_level,
+            persona=persona,
+            uploaded_image=st.session_state.uploaded_image,
+            chat_history=st.session_state.chat_history,
+            mode=mode,
+            problem_analysis=problem_analysis
+        )
+
+        # 미리 만들어 둔 같은 문제/선생님/단계의 힌트가 있으면 바로 사용
+        prefetched = None
+        if mode == "hint" and not user_input and st.session_state.hint_level > 0:
+            prefetched = prefetcher.take(
+                current_problem.get("problem_id"), persona, st.session_state.hint_level
+            )
+
+        if prefetched is not None:
+            trace.set(prefetched=True)
+            mark_context_reused(mode, 'prefetch')
+            raw_response = prefetched
+            if streaming:
+                with trace.span('rendering'):
+                    render_streaming_response([prefetched], timestamp)
+        elif streaming:
+            raw_response = render_streaming_response(stream_ai_response(**request_kwargs), timestamp)
+        else:
+            raw_response = get_ai_response(**request_kwargs)
+
+        # 4) 응답에서 TOPIC 줄 추출 & 제거
+        with trace.span('parsing'):
+            response, topic = extract_topic_from_response(raw_response)
 
     # 5) AI 응답 저장 (학생에게 보이는 텍스트는 cleaned response)
     st.session_state.chat_history.append(
@@ -348,84 +507,81 @@ def handle_user_input(user_input):
     )
 
     # 6) 모드별 후처리
+    is_correct = False
     if mode == "hint":
-        update_analytics()
+        delivered_level = st.session_state.hint_level
+        if delivered_level > 0:
+            session_manager.update_analytics(
+                EVENT_HINT_USED, {'level': delivered_level, 'problem_id': current_problem.get("problem_id")}
+            )
         st.session_state.hint_level = 0
 
-    elif mode == "answer":
-        cleaned = (response or "").strip()
-        is_correct = cleaned.startswith("정답입니다")
+        # 다음 단계 힌트를 백그라운드로 미리 생성
+        if is_prefetch_enabled() and 0 < delivered_level < 3:
+            next_level = delivered_level + 1
+            next_history = st.session_state.chat_history + [
+                ("user", HINT_REQUEST_MESSAGES[next_level], timestamp)
+            ]
+            prefetcher.schedule(
+                current_problem.get("problem_id"),
+                persona,
+                next_level,
+                prefetch_ai_response(
+                    user_input=None,
+                    hint_level=next_level,
+                    persona=persona,
+                    uploaded_image=st.session_state.uploaded_image,
+                    chat_history=next_history,
+                    mode="hint",
+                    problem_analysis=problem_analysis
+                )
+            )
 
-        # 토픽 통계 업데이트 (정답/오답 모두 시도로 기록)
-        update_topic_stats(topic, is_correct)
+    elif mode == "answer":
+        is_correct = is_correct_verdict(response)
+
+        # 문제당 첫 답안 제출에서 시도 1회, 첫 정답에서 해결 1회로 집계
+        # (토픽 통계 / 일별 지표는 판정마다 집계기가 갱신)
+        problem = st.session_state.get("current_problem")
+        if not problem:
+            problem = st.session_state.current_problem = new_text_problem()
+        elif not problem.get("problem_id"):
+            # 이미지 해시를 만들지 못한 업로드 문제도 리뷰를 따로 저장하도록 ID 발급
+            problem["problem_id"] = new_text_problem()["problem_id"]
+        event_data = {'topic': topic, 'problem_id': problem.get("problem_id")}
+        if not problem.get("attempted"):
+            problem["attempted"] = True
+            session_manager.update_analytics(EVENT_PROBLEM_STARTED, {'problem_id': problem.get("problem_id")})
+        if not is_correct:
+            session_manager.update_analytics(EVENT_ANSWER_INCORRECT, event_data)
+        elif not problem.get("solved"):
+            problem["solved"] = True
+            session_manager.update_analytics(EVENT_PROBLEM_SOLVED, event_data)
+
+            # 풀이 리뷰는 백그라운드에서 만들어 문제별로 저장
+            review_id = problem["problem_id"]
+            start_solution_review(session_manager.student_id, review_id, st.session_state.chat_history)
+            st.session_state.last_solved_problem_id = review_id
 
         if is_correct:
-            st.session_state.solved_problems += 1
-            st.session_state.total_problems += 1
             st.session_state.request_type = None
             st.session_state.hint_level = 0
+            # 이미지 없는 문제는 정답 뒤 대화가 다음 문제이므로 새 문제로 시작 (업로드 문제는 새 이미지가 올 때 교체)
+            if not problem.get("filename"):
+                st.session_state.current_problem = new_text_problem()
             st.success("🎉 정답입니다! 문제를 잘 해결했어. 다음 문제로 넘어가 보자!")
         else:
             st.info("아쉽지만 아직 정답은 아니래. 선생님 설명을 참고해서 한 번 더 생각해보자!")
             # 한 번만 정답 모드로 판정하고 초기화
             st.session_state.request_type = None
 
-    st.rerun()
-
-
-def update_analytics():
-    """학습 통계 업데이트"""
-    if st.session_state.hint_level > 0:
-        st.session_state.analytics_data['total_hints'] += 1
-        st.session_state.analytics_data['hint_distribution'][st.session_state.hint_level - 1] += 1
-    
-    st.session_state.analytics_data['last_study_date'] = datetime.now().strftime("%Y-%m-%d %H:%M")
-
-def extract_topic_from_response(response_text: str):
-    """
-    LLM 응답에서 '##TOPIC:...' 줄을 찾아서
-    (깨끗해진_응답_텍스트, 토픽명 또는 None)을 반환
-    """
-    if not response_text:
-        return response_text, None
-
-    lines = response_text.splitlines()
-    topic = None
-    cleaned_lines = []
-
-    for line in lines:
-        stripped = line.strip()
-        if stripped.startswith("##TOPIC:"):
-            # ##TOPIC: 뒤에 오는 부분만 토픽명으로 사용
-            topic = stripped.split(":", 1)[1].strip()
-        else:
-            cleaned_lines.append(line)
-
-    cleaned_text = "\n".join(cleaned_lines).strip()
-    return cleaned_text, topic
-
-
-def update_topic_stats(topic: str, is_correct: bool):
-    """
-    토픽별 시도/정답 횟수 업데이트
-    analytics_data['topic_stats'][topic] = {'attempted': n, 'solved': m}
-    """
-    if not topic:
-        return
-
-    analytics = st.session_state.analytics_data
-
-    if 'topic_stats' not in analytics:
-        analytics['topic_stats'] = {}
-
-    stats = analytics['topic_stats'].get(topic, {'attempted': 0, 'solved': 0})
-
-    stats['attempted'] += 1
-    if is_correct:
-        stats['solved'] += 1
+    # 7) 저장 예약 (디스크 쓰기는 백그라운드에서, 정답이면 바로 저장 요청)
+    if st.session_state.get('settings', {}).get('auto_save', True):
+        session_manager.save_session_data(
+            milestone=is_correct
+        )
 
-    analytics['topic_stats'][topic] = stats
-    st.session_state.analytics_data = analytics
+    request_rerun()
 
 
 def render_analytics_tab():
@@ -499,5 +655,12 @@ def get_persona_info(persona_type):
     }
     return personas.get(persona_type, personas['friendly'])
 
+# 메인 화면 (라벨: 렌더 함수)
+MAIN_VIEWS = {
+    "📚 학습하기": render_learning_tab,
+    "📊 학습 분석": render_analytics_tab,
+    "ℹ️ 사용 방법": render_help_tab,
+}
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,333 @@
+# 동시 접속 부하 테스트: 학생 N명이 동시에 실제 학습 흐름(문제 업로드 → 1~3단계 힌트 → 정답 제출)을 진행
+# 모델 호출은 로컬 스텁 서버(benchmarks/stub_server.py)로 보내므로 API 키/비용 없이 인스턴스 크기를 가늠할 수 있음
+#
+# 사용법 (프로젝트 루트에서):
+#   python benchmarks/load_test.py --students 50 --concurrency 50 --latency-ms 800 --stream
+#   python benchmarks/load_test.py --students 200 --concurrency 100 --error-rate 0.05 --backend json
+#   python benchmarks/load_test.py --stub-url http://127.0.0.1:8765/v1   # 따로 띄운 스텁 서버 사용
+#
+# 화면(AppTest) 대신 화면이 호출하는 엔진 함수(문제 분석, get_ai_response / stream_ai_response, 집계기, 저장소)를
+# 학생마다 스레드 하나로 직접 호출함 (AppTest는 파일 업로드를 흉내 낼 수 없고, 한 프로세스에서 여러 세션을 돌릴 수 없음)
+# 보고 항목: 처리량, 모드별 p50/p95/p99 지연(스트리밍이면 첫 토큰까지 포함), 세션당 메모리, 저장 파일 쓰기 경합
+
+import io
+import os
+import sys
+import time
+import random
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+import statistics
+import urllib.request
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import settings
+from stub_server import add_stub_arguments
+from utils.telemetry import percentile
+
+STUB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stub_server.py')
+
+# get_ai_response / stream_ai_response가 예외를 대화 메시지로 바꿔 돌려줄 때의 앞부분
+ERROR_PREFIXES = ("죄송합니다. 답변을 생성하는 중에 오류가 발생했습니다.", "⚠️")
+
+class UploadedImage(io.BytesIO):
+    """st.file_uploader가 돌려주는 UploadedFile 대역 (getvalue / name / type)"""
+
+    def __init__(self, data, name, mime='image/png'):
+        super().__init__(data)
+        self.name = name
+        self.type = mime
+
+def make_problem_image(index):
+    """학생마다 다른 문제 이미지 (같은 이미지면 전사 결과를 공유하므로 학생별로 다르게)"""
+    from PIL import Image, ImageDraw
+
+    image = Image.new('RGB', (800, 400), 'white')
+    draw = ImageDraw.Draw(image)
+    draw.text((40, 40), f"Problem #{index}: x^2 - 5x + 6 = 0", fill='black')
+    rng = random.Random(index)
+    for _ in range(40):
+        x, y = rng.randrange(800), rng.randrange(120, 400)
+        draw.line((x, y, x + rng.randrange(-60, 60), y + rng.randrange(-60, 60)), fill='black', width=2)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return UploadedImage(buffer.getvalue(), f"problem_{index}.png")
+
+def deep_size(obj, seen=None):
+    """객체가 붙잡고 있는 메모리(바이트) 근사치 (dict/list/tuple/set 재귀, 공유 객체는 한 번만)"""
+    seen = seen if seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif isinstance(obj, io.BytesIO):
+        size += len(obj.getbuffer())
+    return size
+
+class Recorder:
+    """스레드 안전한 측정값 모음: samples[이름] = [ms, ...], errors[이름] = 횟수"""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, ms, error=False):
+        with self._lock:
+            self.samples.setdefault(name, []).append(ms)
+            if error:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+def _timed(recorder, name, fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    recorder.add(name, (time.perf_counter() - start) * 1000)
+    return result
+
+def _ask(recorder, mode, streaming, **request):
+    """응답 한 번 생성, 모드별 지연 기록 (스트리밍이면 첫 조각까지 시간도 따로 기록)"""
+    from utils.ai_handler import get_ai_response, stream_ai_response
+
+    start = time.perf_counter()
+    if streaming:
+        parts = []
+        for delta in stream_ai_response(mode=mode, **request):
+            if not parts:
+                recorder.add(f"{mode}_ttft", (time.perf_counter() - start) * 1000)
+            parts.append(delta)
+        text = "".join(parts)
+    else:
+        text = get_ai_response(mode=mode, **request)
+    failed = not text or text.startswith(ERROR_PREFIXES)
+    recorder.add(mode, (time.perf_counter() - start) * 1000, error=failed)
+    return text
+
+def run_student(index, args, recorder):
+    """
+    학생 한 명의 학습 흐름: 업로드 → 1~3단계 힌트 → 정답 제출
+    단계마다 새 메시지를 저장소에 바로 씀 (정답 시 바로 저장하는 것과 같은 최악의 경우)
+    반환: 세션이 붙잡고 있는 상태 (메모리 측정용)
+    """
+    from utils.problem_analyzer import start_problem_analysis, get_problem_analysis
+    from utils.analytics_engine import AnalyticsAggregator, EVENT_HINT_USED, EVENT_PROBLEM_STARTED, \
+        EVENT_PROBLEM_SOLVED, EVENT_ANSWER_INCORRECT
+    from utils.response_parser import extract_topic_from_response, is_correct_verdict
+    from utils.storage import get_storage_backend
+    from components.hint_buttons import HINT_REQUEST_MESSAGES
+
+    backend = get_storage_backend()
+    student_id = f"load-{index:04d}"
+    aggregator = AnalyticsAggregator()
+    chat_history = []
+
+    def now():
+        return datetime.now().strftime("%H:%M")
+
+    def think():
+        if args.think_ms:
+            time.sleep(random.uniform(0.5, 1.5) * args.think_ms / 1000)
+
+    def save(new_messages, problem_id):
+        _timed(recorder, 'save', backend.append_messages, student_id, new_messages, problem_id)
+
+    def event(event_type, data):
+        aggregator.apply({'type': event_type, 'timestamp': datetime.now().isoformat(), 'data': data})
+
+    # 1) 업로드 → 문제 분석 (백그라운드 스레드 풀에서 실행, 결과를 기다린 시간까지 측정)
+    upload = make_problem_image(index)
+    start = time.perf_counter()
+    problem_id = start_problem_analysis(upload)
+    analysis = get_problem_analysis(problem_id, wait_seconds=args.analysis_wait)
+    recorder.add('analysis', (time.perf_counter() - start) * 1000, error=analysis is None)
+
+    request = dict(persona=args.persona, uploaded_image=upload, problem_analysis=analysis)
+
+    # 2) 1~3단계 힌트
+    for level in (1, 2, 3):
+        think()
+        user_message = ("user", HINT_REQUEST_MESSAGES[level], now())
+        chat_history.append(user_message)
+        text = _ask(recorder, 'hint', args.stream, user_input=None, hint_level=level,
+                    chat_history=chat_history, **request)
+        chat_history.append(("assistant", text, now()))
+        event(EVENT_HINT_USED, {'level': level, 'problem_id': problem_id})
+        save(chat_history[-2:], problem_id)
+
+    # 3) 정답 제출 → 판정
+    think()
+    answer = "5"
+    chat_history.append(("user", answer, now()))
+    raw = _ask(recorder, 'answer', args.stream, user_input=answer, hint_level=3,
+               chat_history=chat_history, **request)
+    cleaned, topic = extract_topic_from_response(raw)
+    chat_history.append(("assistant", cleaned, now()))
+    event(EVENT_PROBLEM_STARTED, {'problem_id': problem_id})
+    event(EVENT_PROBLEM_SOLVED if is_correct_verdict(cleaned) else EVENT_ANSWER_INCORRECT,
+          {'topic': topic, 'problem_id': problem_id})
+    save(chat_history[-2:], problem_id)
+    _timed(recorder, 'save', backend.save_profile, student_id, {
+        'user_name': student_id, 'grade': '중학생', 'selected_persona': args.persona,
+        'analytics_data': aggregator.state, 'last_saved': datetime.now().isoformat()
+    })
+
+    return {
+        'chat_history': chat_history,
+        'uploaded_image': upload,
+        'current_problem': analysis,
+        'analytics_data': aggregator.state
+    }
+
+def start_stub(args):
+    """스텁 서버를 별도 프로세스로 실행 (같은 프로세스면 GIL을 나눠 써서 측정이 왜곡됨)"""
+    import socket
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    command = [sys.executable, STUB_PATH, '--port', str(port),
+               '--latency-ms', str(args.latency_ms), '--latency-dist', args.latency_dist,
+               '--jitter', str(args.jitter), '--tokens-per-second', str(args.tokens_per_second),
+               '--error-rate', str(args.error_rate), '--error-status', str(args.error_status),
+               '--correct-rate', str(args.correct_rate)]
+    if args.seed is not None:
+        command += ['--seed', str(args.seed)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{base_url}/health", timeout=0.5).read()
+            return process, f"{base_url}/v1"
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise SystemExit("스텁 서버가 시작되지 않았습니다")
+
+def measure_uncontended_writes(count=20):
+    """경합 없는 상태(한 스레드)에서 같은 저장 파일에 쓰는 시간 (ms 목록)"""
+    from utils.storage import get_storage_backend
+
+    backend = get_storage_backend()
+    timings = []
+    for i in range(count):
+        start = time.perf_counter()
+        backend.append_messages('load-baseline', [("user", f"기준 측정 {i}", "00:00")], None)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def _row(name, values, errors=0):
+    p50, p95, p99 = (percentile(values, p) for p in (50, 95, 99))
+    return (f"{name:<14}{len(values):>7}{errors:>7}{p50:>10.0f}{p95:>10.0f}{p99:>10.0f}"
+            f"{statistics.mean(values):>10.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="동시 접속 학생 부하 테스트 (로컬 스텁 서버 사용)")
+    parser.add_argument('--students', type=int, default=20, help="학습 흐름을 진행할 학생 수")
+    parser.add_argument('--concurrency', type=int, default=None, help="동시에 진행하는 학생 수 (기본: 전원)")
+    parser.add_argument('--ramp-seconds', type=float, default=0.0, help="학생 시작 시점을 이 시간에 걸쳐 분산")
+    parser.add_argument('--think-ms', type=float, default=0.0, help="단계 사이 학생이 생각하는 시간 (평균)")
+    parser.add_argument('--stream', action='store_true', help="스트리밍 응답 사용 (첫 토큰까지 시간도 측정)")
+    parser.add_argument('--persona', choices=list(settings.PERSONAS.keys()), default='friendly')
+    parser.add_argument('--backend', choices=['json', 'sqlite'], default='json', help="저장소 (json: session_data.json)")
+    parser.add_argument('--cache', action='store_true', help="응답 캐시 사용 (기본은 꺼서 모든 요청이 스텁까지 감)")
+    parser.add_argument('--analysis-wait', type=float, default=60.0, help="문제 분석 결과를 기다리는 최대 시간 (초)")
+    parser.add_argument('--background-workers', type=int, default=None,
+                        help="문제 분석 스레드 풀 크기 (기본: API_CONFIG['background_workers'])")
+    parser.add_argument('--stub-url', default=None, help="이미 실행 중인 스텁 서버 주소 (없으면 새로 띄움)")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    stub = None
+    base_url = args.stub_url
+    if base_url is None:
+        stub, base_url = start_stub(args)
+
+    settings.API_CONFIG['base_url'] = base_url
+    settings.API_CONFIG['openai_api_key'] = 'stub-key'
+    settings.API_CONFIG['stream'] = args.stream
+    if args.background_workers:
+        settings.API_CONFIG['background_workers'] = args.background_workers
+    settings.CASSETTE_CONFIG['mode'] = 'off'
+    settings.CACHE_CONFIG['enabled'] = args.cache
+    settings.PATHS['data_dir'] = tempfile.mkdtemp(prefix='tutor-load-')
+    settings.STORAGE_CONFIG['backend'] = args.backend
+
+    concurrency = args.concurrency or args.students
+    recorder = Recorder()
+    sessions = []
+
+    def job(index):
+        if args.ramp_seconds:
+            time.sleep(args.ramp_seconds * index / max(1, args.students))
+        return run_student(index, args, recorder)
+
+    print(f"학생 {args.students}명, 동시 {concurrency}명, 스트리밍 {'on' if args.stream else 'off'}, "
+          f"저장소 {args.backend}, 스텁 {base_url}")
+    started = time.perf_counter()
+    failed_students = 0
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='student') as pool:
+            for future in [pool.submit(job, i) for i in range(args.students)]:
+                try:
+                    sessions.append(future.result())
+                except Exception as e:
+                    failed_students += 1
+                    print(f"학생 흐름 실패: {str(e)}")
+        elapsed = time.perf_counter() - started
+
+        model_requests = sum(len(recorder.samples.get(mode, [])) for mode in ('analysis', 'hint', 'answer'))
+        print(f"\n전체 {elapsed:.1f}초, 완료 {len(sessions)}명 / 실패 {failed_students}명")
+        print(f"처리량: 학생 흐름 {len(sessions) / elapsed * 60:.1f}명/분, 모델 요청 {model_requests / elapsed:.1f}건/초")
+
+        print(f"\n{'구간':<14}{'횟수':>7}{'오류':>7}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'평균(ms)':>10}")
+        for name in ('analysis', 'hint_ttft', 'hint', 'answer_ttft', 'answer', 'save'):
+            values = recorder.samples.get(name)
+            if values:
+                print(_row(name, values, recorder.errors.get(name, 0)))
+
+        if sessions:
+            sizes = [deep_size(session) for session in sessions]
+            print(f"\n세션당 메모리(대화 기록 + 업로드 이미지 + 전사본 + 집계 상태): "
+                  f"평균 {statistics.mean(sizes) / 1024:.1f}KB, 최대 {max(sizes) / 1024:.1f}KB")
+        # ru_maxrss: Linux는 KB, macOS는 바이트
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        max_rss_mb = max_rss / 1024 / (1024 if sys.platform == 'darwin' else 1)
+        print(f"프로세스 최대 RSS: {max_rss_mb:.0f}MB")
+
+        saves = recorder.samples.get('save', [])
+        baseline = measure_uncontended_writes()
+        baseline_p50 = percentile(baseline, 50)
+        store_file = settings.STORAGE_CONFIG['json_file' if args.backend == 'json' else 'sqlite_file']
+        store_path = os.path.join(settings.PATHS['data_dir'], store_file)
+        print(f"\n저장 경합 ({store_file}, {os.path.getsize(store_path) / 1024:.0f}KB):")
+        print(f"  경합 없는 쓰기 p50 {baseline_p50:.1f}ms, 부하 중 쓰기 p50 {percentile(saves, 50):.1f}ms / "
+              f"p99 {percentile(saves, 99):.1f}ms → 대기 배율 p50 x{percentile(saves, 50) / max(baseline_p50, 0.001):.1f}")
+        # JSON 저장소는 쓰기마다 파일 전체를 다시 쓰고 잠금으로 직렬화됨 → 순수 쓰기 시간 합 / 전체 시간 = 잠금 점유율
+        busy = statistics.mean(baseline) * len(saves) / 1000
+        print(f"  쓰기 {len(saves)}회, 대기 포함 합계 {sum(saves) / 1000:.1f}초, "
+              f"저장소 잠금 점유율 추정 {min(busy / elapsed, 1.0) * 100:.0f}% (전체 {elapsed:.1f}초 중)")
+
+        try:
+            stats = urllib.request.urlopen(base_url.rsplit('/v1', 1)[0] + '/stats', timeout=2).read().decode()
+            print(f"\n스텁 서버 통계: {stats}")
+        except OSError:
+            pass
+    finally:
+        if stub is not None:
+            stub.terminate()
+            stub.wait(timeout=5)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+# 프롬프트 회귀 & 비용 벤치마크: 문제 모음 × 선생님 × 힌트 단계 × 모드를 녹화본(카세트)으로 재생해서
+# 요청별 프롬프트/완성 토큰, 예상 비용, 녹화 당시 지연, 토픽 추출/정답 판정 파싱 성공 여부를 집계
+#
+# 사용법 (프로젝트 루트에서):
+#   OPENAI_API_KEY=... python benchmarks/prompt_regression.py --mode record   # 실제 호출로 녹화 (처음 한 번)
+#   python benchmarks/prompt_regression.py                                     # 녹화본만으로 재생 (오프라인)
+#   python benchmarks/prompt_regression.py --json before.json                  # 결과를 파일로 남겨 프롬프트 변경 전후 비교
+#   python benchmarks/prompt_regression.py --mode synthetic                    # API 키 없이 스모크 테스트
+#
+# prompts/*.yaml을 고치면 요청 해시가 바뀌어 재생 시 '녹화본 없음'으로 표시됨 → --mode auto로 바뀐 요청만 새로 녹화
+# 비교 기준이 되는 녹화본은 실제 모델 호출(--mode record)로만 만듦
+#
+# --mode synthetic: 스모크 테스트 전용 (기준값 아님)
+#   문제 모음의 토픽/기대 판정으로 만든 대역 응답을 임시 폴더에 녹화 → 요청 조립과 응답 파싱 경로가 깨지지 않았는지만 확인
+#   판정/토픽 일치는 구성상 항상 맞고 토큰은 추정치라, 보고서에 비용·지연을 표시하지 않음
+# 응답 캐시는 끄고 실행 (같은 요청도 매번 모델 호출 경로를 탐)
+# 녹화본에 없는 요청이나 토픽/판정 파싱 실패가 하나라도 있으면 종료 코드 1
+
+import os
+import sys
+import json
+import re
+import argparse
+import tempfile
+from types import SimpleNamespace
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus', 'problems.yaml')
+
+PERSONA_KEYS = tuple(settings.PERSONAS.keys())
+HINT_LEVELS = (1, 2, 3)
+MODES = ('hint', 'answer', 'review')
+
+SYNTHETIC_MODEL = 'synthetic'
+SYNTHETIC_HINTS = {
+    1: "먼저 문제에서 무엇을 구해야 하는지 정리해 보자. 이 문제는 {topic} 단원에서 배운 내용을 쓰면 돼. 주어진 식이나 조건에서 어디부터 볼지 생각해 볼래?",
+    2: "{topic}에서 이 문제의 핵심 개념을 떠올려 보자. 정의를 그대로 적용하면 식을 한 단계 간단하게 만들 수 있어.",
+    3: "이제 식을 세워 보자. 조건을 하나씩 대입해서 정리하면 바로 답을 구하기 직전까지 갈 수 있어. 마지막 계산은 직접 해 볼래?"
+}
+SYNTHETIC_REVIEW = (
+    "### 🧮 최근 푼 문제 풀이 흐름\n"
+    "- 1단계: 문제에서 구해야 하는 값을 정리했어요\n"
+    "- 2단계: 핵심 개념을 떠올려 식을 세웠어요\n"
+    "- 3단계: 계산을 마무리해서 답을 구했어요\n\n"
+    "### ✨ 잘한 점\n"
+    "- 힌트를 바탕으로 스스로 식을 세웠어요\n"
+    "- 계산 과정을 끝까지 차근차근 진행했어요\n\n"
+    "### 🔍 더 연습하면 좋을 점\n"
+    "- 답을 구한 뒤 조건에 맞는지 다시 확인해 보세요\n"
+    "- 비슷한 유형을 한두 문제 더 풀어 보면 좋아요"
+)
+
+class SyntheticClient:
+    """
+    --mode synthetic(스모크 테스트)용 OpenAI 클라이언트 대역 (비스트리밍 chat.completions.create만 지원)
+    문제 모음의 토픽/기대 판정으로 앱이 파싱할 수 있는 응답을 만들고, 토큰 수는 context_builder 추정치 사용
+    """
+
+    def __init__(self, problems):
+        self.problems = problems
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def close(self):
+        pass
+
+    def _create(self, **kwargs):
+        from utils.cassette import classify_request
+        from utils.context_builder import estimate_tokens, MESSAGE_OVERHEAD_TOKENS
+
+        messages = kwargs.get('messages', [])
+        texts = ["\n".join(self._text_parts(message)) for message in messages]
+        content = self._content(classify_request(kwargs), messages, "\n".join(texts))
+
+        prompt_tokens = sum(estimate_tokens(text) + MESSAGE_OVERHEAD_TOKENS for text in texts)
+        completion_tokens = estimate_tokens(content)
+        return SimpleNamespace(
+            model=SYNTHETIC_MODEL,
+            choices=[SimpleNamespace(message=SimpleNamespace(role='assistant', content=content),
+                                     finish_reason='stop')],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+                prompt_tokens_details=SimpleNamespace(cached_tokens=0)
+            )
+        )
+
+    @staticmethod
+    def _text_parts(message):
+        content = message.get('content')
+        if isinstance(content, str):
+            return [content]
+        return [part.get('text', '') for part in content or [] if part.get('type') == 'text']
+
+    def _content(self, kind, messages, text):
+        if kind == 'review':
+            return SYNTHETIC_REVIEW
+
+        problem = next((p for p in self.problems if p['problem_text'] in text), None)
+        if problem is None:
+            raise ValueError("합성 응답: 문제 모음에 없는 요청")
+        topic = problem.get('topic')
+
+        if kind == 'answer':
+            # 학생 답안은 마지막 메시지의 첫 텍스트 파트 (그 뒤는 문제 전사본)
+            answer = (self._text_parts(messages[-1]) or [""])[0].strip()
+            expected = next((a for a in problem.get('answers', []) if a['answer'] == answer), None)
+            if expected is None:
+                raise ValueError(f"합성 응답: 기대 판정이 없는 답안 ({problem['id']}: {answer})")
+            if expected['correct']:
+                return f"정답입니다! {answer}, 맞았어. 풀이 과정을 차근차근 잘 따라왔어.\n##TOPIC: {topic}"
+            return f"아쉽지만 정답이 아니야. {answer}이(가) 나온 과정을 다시 확인해 보자.\n##TOPIC: {topic}"
+
+        if kind == 'hint':
+            match = re.search(r"힌트 레벨: (\d)단계", text)
+            return SYNTHETIC_HINTS[int(match.group(1)) if match else 1].format(topic=topic)
+        raise ValueError(f"합성 응답: 지원하지 않는 요청 종류 ({kind})")
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)['problems']
+
+def _usage_totals():
+    """모드 구분 없이 누적 사용량 합계"""
+    from utils.usage_tracker import get_usage_stats
+    totals = {'requests': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0}
+    for stats in get_usage_stats().values():
+        for key in totals:
+            totals[key] += stats[key]
+    return totals
+
+def _measure(client, call):
+    """call() 한 번의 응답 텍스트, 사용량 증가분, 녹화본 정보 (녹화본이 안 쓰였으면 entry None)"""
+    before_entry = client.last_entry
+    before = _usage_totals()
+    text = call()
+    after = _usage_totals()
+    entry = client.last_entry
+    if entry is before_entry:
+        entry = None
+    usage = {key: after[key] - before[key] for key in ('prompt_tokens', 'cached_tokens', 'completion_tokens')}
+    return text, usage, entry
+
+def run_cases(problems, personas, hint_levels, modes):
+    """모든 조합을 순서대로 실행하고 결과 행 목록 반환"""
+    from utils.ai_handler import get_ai_response
+    from utils.openai_client import get_openai_client
+    from utils.response_parser import extract_topic_from_response, is_correct_verdict
+    from utils.solution_review import build_review_conversation, generate_solution_review
+    from utils.usage_tracker import estimate_cost
+    from components.hint_buttons import HINT_REQUEST_MESSAGES
+
+    client = get_openai_client()
+    if client is None or not hasattr(client, 'last_entry'):
+        raise SystemExit("카세트 클라이언트를 만들 수 없습니다 (record/auto 모드는 OPENAI_API_KEY 필요)")
+
+    model = settings.API_CONFIG['model_name']
+    rows = []
+
+    def add_row(problem, persona, mode, level, text, usage, entry, **checks):
+        rows.append({
+            'problem_id': problem['id'],
+            'persona': persona,
+            'mode': mode,
+            'hint_level': level,
+            'cassette': entry['key'][:12] if entry else None,
+            'missing': entry is None,
+            'latency_ms': entry['latency_ms'] if entry else None,
+            'usage': usage,
+            'cost_usd': estimate_cost(usage, model),
+            'response_chars': len(text or ""),
+            **checks
+        })
+
+    for problem in problems:
+        analysis = {key: problem.get(key) for key in ('problem_text', 'latex', 'conditions', 'choices')}
+        analysis['problem_id'] = problem['id']
+
+        for persona in personas:
+            if 'hint' in modes:
+                for level in hint_levels:
+                    history = [("user", HINT_REQUEST_MESSAGES[level], "10:00")]
+                    text, usage, entry = _measure(client, lambda: get_ai_response(
+                        user_input=None, hint_level=level, persona=persona,
+                        chat_history=history, mode="hint", problem_analysis=analysis
+                    ))
+                    add_row(problem, persona, 'hint', level, text, usage, entry)
+
+            if 'answer' not in modes and 'review' not in modes:
+                continue
+
+            for answer in problem.get('answers', []):
+                history = [("user", answer['answer'], "10:00")]
+                raw, usage, entry = _measure(client, lambda: get_ai_response(
+                    user_input=answer['answer'], hint_level=0, persona=persona,
+                    chat_history=history, mode="answer", problem_analysis=analysis
+                ))
+                cleaned, topic = extract_topic_from_response(raw)
+                verdict = is_correct_verdict(cleaned)
+                if 'answer' in modes:
+                    add_row(problem, persona, 'answer', None, raw, usage, entry,
+                            topic=topic,
+                            topic_ok=bool(topic),
+                            topic_match=topic == problem.get('topic'),
+                            verdict_ok=verdict == answer['correct'])
+
+                # 풀이 리뷰는 정답 판정을 받은 대화로만 생성 (앱과 같은 흐름)
+                if 'review' in modes and answer['correct'] and entry is not None:
+                    conversation = build_review_conversation(history + [("assistant", cleaned, "10:01")])
+                    text, usage, review_entry = _measure(client, lambda: generate_solution_review(
+                        'benchmark', problem['id'], conversation
+                    ))
+                    add_row(problem, persona, 'review', None, text, usage, review_entry)
+    return rows
+
+def summarize(rows):
+    """모드별 요약: 호출 수, 평균 토큰, 총 예상 비용, 평균 지연, 파싱 성공률"""
+    summary = {}
+    for mode in MODES:
+        mode_rows = [row for row in rows if row['mode'] == mode]
+        if not mode_rows:
+            continue
+        played = [row for row in mode_rows if not row['missing']]
+        count = len(played) or 1
+        latencies = [row['latency_ms'] for row in played if row['latency_ms'] is not None]
+        costs = [row['cost_usd'] for row in played if row['cost_usd'] is not None]
+        entry = {
+            'calls': len(mode_rows),
+            'missing': len(mode_rows) - len(played),
+            'avg_prompt_tokens': round(sum(r['usage']['prompt_tokens'] for r in played) / count, 1),
+            'avg_cached_tokens': round(sum(r['usage']['cached_tokens'] for r in played) / count, 1),
+            'avg_completion_tokens': round(sum(r['usage']['completion_tokens'] for r in played) / count, 1),
+            'total_cost_usd': round(sum(costs), 6) if costs else None,
+            'avg_latency_ms': round(sum(latencies) / len(latencies), 1) if latencies else None
+        }
+        if mode == 'answer':
+            entry['topic_ok'] = sum(1 for r in played if r['topic_ok'])
+            entry['topic_match'] = sum(1 for r in played if r['topic_match'])
+            entry['verdict_ok'] = sum(1 for r in played if r['verdict_ok'])
+        summary[mode] = entry
+    return summary
+
+def print_report(rows, summary, verbose=False, synthetic=False):
+    if synthetic:
+        print("※ 합성 응답 스모크 테스트: 요청 조립/응답 파싱 경로만 확인 (비교 기준 아님)")
+        print("  토큰은 추정치, 비용·지연은 표시하지 않음, 토픽/판정은 문제 모음 기대값으로 만든 응답이라 항상 일치\n")
+    if verbose:
+        print(f"{'문제':<22}{'선생님':<10}{'모드':<8}{'단계':>4}{'프롬프트':>10}{'캐시':>8}{'완성':>8}{'지연(ms)':>10}  비고")
+        for row in rows:
+            notes = []
+            if row['missing']:
+                notes.append("녹화본 없음")
+            if row['mode'] == 'answer' and not row['missing']:
+                notes.append(f"토픽={row['topic'] or '-'}")
+                if not row['verdict_ok']:
+                    notes.append("판정 불일치")
+            usage = row['usage']
+            latency = f"{row['latency_ms']:.0f}" if row['latency_ms'] is not None else "-"
+            print(f"{row['problem_id']:<22}{row['persona']:<10}{row['mode']:<8}{row['hint_level'] or '-':>4}"
+                  f"{usage['prompt_tokens']:>10}{usage['cached_tokens']:>8}{usage['completion_tokens']:>8}"
+                  f"{latency:>10}  {', '.join(notes)}")
+        print()
+
+    print(f"{'모드':<8}{'호출':>6}{'없음':>6}{'평균 프롬프트':>14}{'평균 캐시':>10}{'평균 완성':>10}"
+          f"{'예상 비용($)':>14}{'평균 지연(ms)':>14}")
+    for mode, entry in summary.items():
+        cost = f"{entry['total_cost_usd']:.4f}" if entry['total_cost_usd'] is not None else "-"
+        latency = f"{entry['avg_latency_ms']:.0f}" if entry['avg_latency_ms'] is not None else "-"
+        print(f"{mode:<8}{entry['calls']:>6}{entry['missing']:>6}{entry['avg_prompt_tokens']:>14}"
+              f"{entry['avg_cached_tokens']:>10}{entry['avg_completion_tokens']:>10}{cost:>14}{latency:>14}")
+
+    answer = summary.get('answer')
+    if answer:
+        played = answer['calls'] - answer['missing']
+        print(f"\n정답 판정: 토픽 추출 {answer['topic_ok']}/{played}, 토픽 일치 {answer['topic_match']}/{played}, "
+              f"판정 일치 {answer['verdict_ok']}/{played}")
+
+def main():
+    parser = argparse.ArgumentParser(description="녹화본 기반 프롬프트 회귀 & 비용 벤치마크")
+    parser.add_argument('--mode', choices=['replay', 'record', 'auto', 'synthetic'], default='replay',
+                        help="replay: 녹화본만 사용 (기본) / record: 모두 새로 녹화 / auto: 없는 것만 녹화"
+                             " / synthetic: API 키 없이 합성 응답으로 스모크 테스트 (임시 폴더에 녹화)")
+    parser.add_argument('--cassette-dir', default=None,
+                        help="녹화본 폴더 (기본: CASSETTE_CONFIG['dir'], synthetic은 임시 폴더)")
+    parser.add_argument('--corpus', default=CORPUS_PATH, help="문제 모음 YAML")
+    parser.add_argument('--personas', nargs='+', choices=PERSONA_KEYS, default=list(PERSONA_KEYS))
+    parser.add_argument('--levels', nargs='+', type=int, choices=HINT_LEVELS, default=list(HINT_LEVELS))
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--json', dest='json_path', default=None, help="요청별 결과와 요약을 저장할 파일")
+    parser.add_argument('--verbose', action='store_true', help="요청별 결과 출력")
+    args = parser.parse_args()
+
+    synthetic = args.mode == 'synthetic'
+    settings.CASSETTE_CONFIG['mode'] = 'record' if synthetic else args.mode
+    if args.cassette_dir:
+        settings.CASSETTE_CONFIG['dir'] = args.cassette_dir
+    elif synthetic:
+        # 합성 녹화본이 실제 녹화본 폴더에 섞이지 않도록
+        settings.CASSETTE_CONFIG['dir'] = tempfile.mkdtemp(prefix='tutor-synthetic-cassettes-')
+    settings.CACHE_CONFIG['enabled'] = False
+    # 풀이 리뷰 저장은 임시 폴더로 (data/ 폴더를 건드리지 않음)
+    settings.PATHS['data_dir'] = tempfile.mkdtemp(prefix='tutor-regression-')
+    settings.STORAGE_CONFIG['backend'] = 'json'
+
+    problems = load_corpus(args.corpus)
+    if synthetic:
+        from utils.cassette import CassetteClient
+        from utils.openai_client import set_openai_client
+        set_openai_client(CassetteClient('record', SyntheticClient(problems)))
+
+    rows = run_cases(problems, args.personas, args.levels, args.modes)
+    if synthetic:
+        for row in rows:
+            row['latency_ms'] = None
+            row['cost_usd'] = None
+    summary = summarize(rows)
+    print_report(rows, summary, args.verbose, synthetic)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'mode': args.mode, 'synthetic': synthetic, 'model': settings.API_CONFIG['model_name'],
+                       'summary': summary, 'rows': rows}, f, ensure_ascii=False, indent=2)
+
+    failed = any(row['missing'] for row in rows) or any(
+        not (row['topic_ok'] and row['verdict_ok']) for row in rows if row['mode'] == 'answer' and not row['missing']
+    )
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
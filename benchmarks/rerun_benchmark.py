@@ -0,0 +1,129 @@
+# rerun 시간 측정: 긴 대화 기록이 있는 세션에서 rerun 한 번에 걸리는 시간을 화면 구성 방식별로 비교
+# - tabs: st.tabs로 모든 탭 실행 / radio: 선택한 화면만 실행
+# - 프래그먼트: 힌트 클릭/채팅/판정 뒤에는 대화 패널 프래그먼트(render_tutoring_panel)만 다시 실행됨
+#   AppTest는 항상 스크립트 전체를 실행하고 프래그먼트 단독 rerun을 하지 않으므로, rerun 프로파일러로
+#   앱 전체 실행 시간(total_ms)과 그 안에서 프래그먼트 함수 본문에 걸린 시간을 실행마다 따로 잼
+#   → 프래그먼트 rerun 시간 ≈ 프래그먼트 본문 시간 (Streamlit이 프래그먼트를 다시 부르는 고정 비용은 빠짐)
+#
+# 사용법 (프로젝트 루트에서):
+#   python benchmarks/rerun_benchmark.py --runs 20
+#   python benchmarks/rerun_benchmark.py --scenario hint   # 1단계 힌트 버튼 클릭
+#   python benchmarks/rerun_benchmark.py --history 100 --max-chat-history 100 --scenario hint
+#
+# 대화 기록 기본값은 LEARNING_CONFIG['max_chat_history'] (그보다 많이 넣으면 첫 실행에서 넘친 만큼 저장소로 보관되어
+# 실제로는 max_chat_history개로 측정됨 → 결과에 보관된 메시지 수를 함께 표시, --max-chat-history로 한도 조정)
+# 측정 결과 기록: benchmarks/results/rerun_benchmark.md
+#
+# streamlit.testing.v1.AppTest로 app.py를 같은 프로세스에서 실행하므로 브라우저 없이 측정 가능
+# 저장소는 임시 폴더의 JSON 파일을 사용 (data/ 폴더를 건드리지 않음)
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from streamlit.testing.v1 import AppTest
+from config import settings
+from utils.telemetry import percentile
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+FRAGMENT_NAME = 'render_tutoring_panel'
+
+def make_history(n):
+    """학생/선생님이 번갈아 말한 긴 대화 기록"""
+    history = []
+    for i in range(n):
+        role = 'user' if i % 2 == 0 else 'assistant'
+        content = f"{i}번째 메시지입니다. " + "이차방정식의 근의 공식을 떠올려 보자. " * 5
+        history.append((role, content, '10:00'))
+    return history
+
+def make_analytics():
+    """분석 탭이 실제로 차트를 그리도록 채운 집계 상태"""
+    from utils.analytics_engine import empty_analytics_state
+    analytics = empty_analytics_state()
+    analytics.update({
+        'total_hints': 30,
+        'hint_distribution': [12, 10, 8],
+        'total_problems': 15,
+        'solved_problems': 11,
+        'topic_stats': {'수열': {'attempted': 5, 'solved': 4}, '미적분': {'attempted': 4, 'solved': 2}}
+    })
+    return analytics
+
+# (이름, navigation)
+LAYOUTS = [
+    ('tabs', 'tabs'),
+    ('radio', 'radio'),
+]
+
+def measure(navigation, history_size, runs, scenario='rerun'):
+    """
+    첫 실행 후 상호작용을 runs번 반복해서 측정
+    scenario: 'rerun' (아무 입력 없는 rerun) / 'hint' (1단계 힌트 버튼 클릭 → 응답 생성까지)
+    API 키 없이 실행하면 모델 호출은 바로 실패하므로 화면 실행 비용만 측정됨
+    반환: {'interaction': 상호작용별 시간(ms), 'app': 스크립트 실행별 전체 시간,
+           'fragment': 같은 실행 안의 프래그먼트 본문 시간, 'archived': 보관된 메시지 수}
+    """
+    settings.UI_CONFIG['navigation'] = navigation
+    settings.UI_CONFIG['fragments'] = True
+
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    at.session_state['chat_history'] = make_history(history_size)
+    at.session_state['analytics_data'] = make_analytics()
+    at.run()
+    archived = history_size - len(at.session_state['chat_history'])
+    skip = len(at.session_state['rerun_profile']['history'])  # 첫 실행(들)은 제외
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        if scenario == 'hint':
+            at.button(key='hint_1').click().run()
+        else:
+            at.run()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    # 힌트 클릭은 응답 생성 뒤 rerun까지 스크립트가 두 번 실행됨 → 실행 단위로 따로 집계
+    script_runs = list(at.session_state['rerun_profile']['history'])[skip:]
+    return {
+        'interaction': timings,
+        'app': [run['total_ms'] for run in script_runs],
+        'fragment': [run['components'][FRAGMENT_NAME] for run in script_runs if FRAGMENT_NAME in run['components']],
+        'archived': archived
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="화면 구성 방식별 rerun 시간 비교")
+    parser.add_argument('--history', type=int, default=settings.LEARNING_CONFIG.get('max_chat_history', 50),
+                        help="대화 기록 메시지 수 (기본: max_chat_history)")
+    parser.add_argument('--max-chat-history', type=int, default=None,
+                        help="세션에 남기는 메시지 수 한도 (기본: LEARNING_CONFIG['max_chat_history'])")
+    parser.add_argument('--runs', type=int, default=20, help="측정할 rerun 횟수")
+    parser.add_argument('--scenario', choices=['rerun', 'hint'], default='rerun', help="측정할 상호작용")
+    args = parser.parse_args()
+
+    settings.PATHS['data_dir'] = tempfile.mkdtemp(prefix='tutor-bench-')
+    settings.STORAGE_CONFIG['backend'] = 'json'
+    if args.max_chat_history:
+        settings.LEARNING_CONFIG['max_chat_history'] = args.max_chat_history
+    # 사이드바 디버그 화면 없이 실행별 시간만 기록
+    settings.PROFILER_CONFIG['always'] = True
+    settings.PROFILER_CONFIG['history_size'] = args.runs * 4
+
+    print(f"대화 기록 {args.history}개, {args.scenario} {args.runs}회")
+    print(f"{'방식':<10}{'상호작용 중앙값':>16}{'p95':>10}{'앱 전체 실행':>14}{'프래그먼트':>12}{'비율':>8}{'보관됨':>8}")
+    for name, navigation in LAYOUTS:
+        result = measure(navigation, args.history, args.runs, args.scenario)
+        app_ms = statistics.median(result['app'])
+        fragment_ms = statistics.median(result['fragment'])
+        print(f"{name:<10}{statistics.median(result['interaction']):>16.1f}{percentile(result['interaction'], 95):>10.1f}"
+              f"{app_ms:>14.1f}{fragment_ms:>12.1f}{fragment_ms / app_ms:>8.0%}{result['archived']:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+# OpenAI 호환 스텁 서버: /v1/chat/completions를 흉내 내서 부하 테스트를 실제 API 없이 돌리기 위한 로컬 서버
+# - 지연 분포(fixed / uniform / lognormal / exponential), 스트리밍(SSE), 오류 비율(429/500)을 설정 가능
+# - 요청 종류(문제 전사 / 힌트 사다리 / 정답 판정 / 힌트)를 프롬프트로 구분해서 앱이 파싱할 수 있는 응답을 돌려줌
+#
+# 사용법 (프로젝트 루트에서):
+#   python benchmarks/stub_server.py --port 8765 --latency-ms 800 --latency-dist lognormal --error-rate 0.02
+#   OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub streamlit run app.py
+#
+# GET /health: 준비 확인, GET /stats: 받은 요청/오류/스트리밍 수
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.cassette import classify_request
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal', 'exponential')
+
+ANALYSIS_RESPONSE = {
+    'problem_text': "이차방정식 $x^2 - 5x + 6 = 0$ 의 두 근의 합을 구하시오.",
+    'latex': ["x^2 - 5x + 6 = 0"],
+    'conditions': [],
+    'choices': [],
+    'topic': "이차방정식",
+    'figure_required': False
+}
+
+LADDER_RESPONSE = {
+    'hint_1': "식의 모양을 먼저 살펴볼까? 인수분해가 되는지 확인해 보자.",
+    'hint_2': "곱해서 6, 더해서 -5가 되는 두 수를 찾아보자.",
+    'hint_3': "$(x-2)(x-3)=0$ 이니까 두 근을 구해서 더해 보자."
+}
+
+HINT_RESPONSE = (
+    "좋은 질문이야! 먼저 주어진 식에서 무엇을 구해야 하는지 정리해 보자. "
+    "이차방정식의 두 근의 합은 근과 계수의 관계로 바로 구할 수도 있어. "
+    "$ax^2 + bx + c = 0$ 에서 두 근의 합은 $-\\frac{b}{a}$ 야. 한 번 계산해 볼래?"
+)
+
+VERDICT_CORRECT = "정답입니다! 근과 계수의 관계를 잘 활용했어.\n##TOPIC: 이차방정식"
+VERDICT_INCORRECT = "아쉽지만 정답이 아니야. 두 근을 다시 구해서 더해 보자.\n##TOPIC: 이차방정식"
+
+class StubConfig:
+    """스텁 동작 설정 (모든 요청 스레드가 공유, 통계는 잠금으로 보호)"""
+
+    def __init__(self, latency_ms=800.0, latency_dist='lognormal', jitter=0.5, tokens_per_second=80.0,
+                 error_rate=0.0, error_status=429, correct_rate=0.7, seed=None):
+        self.latency_ms = latency_ms
+        self.latency_dist = latency_dist
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.correct_rate = correct_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'streamed': 0, 'by_kind': {}}
+
+    def sample_latency(self):
+        """첫 토큰까지의 지연(초) 한 번 뽑기"""
+        mean = self.latency_ms / 1000
+        with self._lock:
+            if self.latency_dist == 'fixed':
+                return mean
+            if self.latency_dist == 'uniform':
+                return self._random.uniform(mean * (1 - self.jitter), mean * (1 + self.jitter))
+            if self.latency_dist == 'exponential':
+                return self._random.expovariate(1 / mean) if mean > 0 else 0
+            # lognormal: 중앙값이 latency_ms, jitter가 시그마 (꼬리가 긴 실제 API 지연과 비슷)
+            return self._random.lognormvariate(0, self.jitter) * mean
+
+    def roll(self, rate):
+        with self._lock:
+            return self._random.random() < rate
+
+    def count(self, kind, streamed=False, error=False):
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['by_kind'][kind] = self.stats['by_kind'].get(kind, 0) + 1
+            if streamed:
+                self.stats['streamed'] += 1
+            if error:
+                self.stats['errors'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return json.loads(json.dumps(self.stats))
+
+def _message_text(messages):
+    """메시지 목록의 텍스트 부분 (이미지는 개수만 셈)"""
+    texts = []
+    images = 0
+    for message in messages:
+        content = message.get('content')
+        if isinstance(content, str):
+            texts.append(content)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get('type') == 'text':
+                    texts.append(part.get('text', ''))
+                elif part.get('type') == 'image_url':
+                    images += 1
+    return "\n".join(texts), images
+
+def build_content(kind, config):
+    if kind == 'analysis':
+        return json.dumps(ANALYSIS_RESPONSE, ensure_ascii=False)
+    if kind == 'ladder':
+        return json.dumps(LADDER_RESPONSE, ensure_ascii=False)
+    if kind == 'answer':
+        return VERDICT_CORRECT if config.roll(config.correct_rate) else VERDICT_INCORRECT
+    return HINT_RESPONSE
+
+def estimate_usage(request, content):
+    """대략적인 토큰 수 (한글 기준 2글자 ≈ 1토큰, 이미지 1장 765토큰)"""
+    text, images = _message_text(request.get('messages', []))
+    prompt_tokens = len(text) // 2 + images * 765
+    completion_tokens = max(1, len(content) // 2)
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens,
+        'prompt_tokens_details': {'cached_tokens': 0}
+    }
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive (클라이언트 커넥션 풀 재사용)
+    config = None  # make_server에서 설정
+
+    def log_message(self, format, *args):
+        pass  # 요청마다 stderr에 찍으면 측정을 방해함
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok'})
+        elif self.path == '/stats':
+            self._send_json(200, self.config.snapshot())
+        else:
+            self._send_json(404, {'error': {'message': 'not found'}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {'error': {'message': 'invalid json', 'type': 'invalid_request_error'}})
+            return
+
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'not found'}})
+            return
+
+        config = self.config
+        kind = classify_request(request)
+        stream = bool(request.get('stream'))
+        latency = config.sample_latency()
+
+        if config.roll(config.error_rate):
+            config.count(kind, stream, error=True)
+            time.sleep(latency / 4)  # 오류도 바로 오지는 않음
+            status = config.error_status
+            headers = {'retry-after-ms': '100'} if status == 429 else None
+            self._send_json(status, {'error': {
+                'message': 'stub: simulated error',
+                'type': 'rate_limit_error' if status == 429 else 'server_error'
+            }}, headers)
+            return
+
+        config.count(kind, stream)
+        content = build_content(kind, config)
+        usage = estimate_usage(request, content)
+        model = request.get('model', 'stub')
+        created = int(time.time())
+        per_token = 1 / config.tokens_per_second if config.tokens_per_second > 0 else 0
+
+        if not stream:
+            time.sleep(latency + usage['completion_tokens'] * per_token)
+            self._send_json(200, {
+                'id': f"chatcmpl-stub-{created}",
+                'object': 'chat.completion',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                             'finish_reason': 'stop'}],
+                'usage': usage
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def event(payload):
+            self._write_chunk(b"data: " + json.dumps(payload, ensure_ascii=False).encode('utf-8') + b"\n\n")
+
+        base = {'id': f"chatcmpl-stub-{created}", 'object': 'chat.completion.chunk', 'created': created,
+                'model': model}
+        time.sleep(latency)
+        piece = 8  # 글자 수 (약 4토큰)
+        for start in range(0, len(content), piece):
+            event({**base, 'choices': [{'index': 0, 'delta': {'content': content[start:start + piece]},
+                                        'finish_reason': None}]})
+            time.sleep(piece / 2 * per_token)
+        event({**base, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})
+        if (request.get('stream_options') or {}).get('include_usage'):
+            event({**base, 'choices': [], 'usage': usage})
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+def make_server(host='127.0.0.1', port=0, config=None):
+    """스텁 서버 생성 (port=0이면 빈 포트 자동 선택, server.server_address로 확인)"""
+    handler = type('ConfiguredStubHandler', (StubHandler,), {'config': config or StubConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def add_stub_arguments(parser):
+    """스텁 동작 옵션 (부하 테스트 스크립트와 공유)"""
+    parser.add_argument('--latency-ms', type=float, default=800.0, help="첫 토큰까지 지연 (중앙값/평균, ms)")
+    parser.add_argument('--latency-dist', choices=LATENCY_DISTRIBUTIONS, default='lognormal')
+    parser.add_argument('--jitter', type=float, default=0.5, help="uniform: ±비율 / lognormal: 시그마")
+    parser.add_argument('--tokens-per-second', type=float, default=80.0, help="완성 토큰 생성 속도")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="오류 응답 비율 (0~1)")
+    parser.add_argument('--error-status', type=int, choices=[429, 500, 503], default=429)
+    parser.add_argument('--correct-rate', type=float, default=0.7, help="정답 판정 응답 중 '정답입니다' 비율")
+    parser.add_argument('--seed', type=int, default=None)
+
+def config_from_args(args):
+    return StubConfig(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        jitter=args.jitter,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        correct_rate=args.correct_rate,
+        seed=args.seed
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI 호환 로컬 스텁 서버")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, config_from_args(args))
+    host, port = server.server_address[:2]
+    print(f"스텁 서버: http://{host}:{port}/v1 (Ctrl+C로 종료)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# 텔레메트리 요약: logs/telemetry.jsonl(회전된 파일 포함)을 읽어 그룹별 요청 수, 오류, 재시도, 토큰, 비용,
+# 전체/구간별 p50/p95/p99 지연을 출력
+#
+# 사용법 (프로젝트 루트에서):
+#   python benchmarks/telemetry_report.py                       # 모드별
+#   python benchmarks/telemetry_report.py --group-by persona --since 2025-01-01
+#   python benchmarks/telemetry_report.py --json summary.json
+
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.telemetry import read_records, summarize_records, get_telemetry_path
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.0f}"
+
+def main():
+    parser = argparse.ArgumentParser(description="요청별 텔레메트리 백분위수 요약")
+    parser.add_argument('--path', default=None, help="기록 파일 (기본: logs_dir/telemetry.jsonl)")
+    parser.add_argument('--group-by', default='mode', choices=['mode', 'persona', 'model', 'streamed', 'cache_hit'])
+    parser.add_argument('--since', default=None, help="이 시각(ISO) 이후 기록만")
+    parser.add_argument('--json', dest='json_path', default=None, help="요약을 저장할 파일")
+    args = parser.parse_args()
+
+    summary = summarize_records(read_records(args.path, args.since), group_by=args.group_by)
+    if not summary:
+        print(f"기록이 없습니다: {args.path or get_telemetry_path()}")
+        return
+
+    print(f"{args.group_by:<16}{'요청':>6}{'오류':>6}{'재시도':>7}{'캐시':>6}{'프롬프트':>10}{'완성':>8}"
+          f"{'비용($)':>10}{'p50':>8}{'p95':>8}{'p99':>8}")
+    for group, entry in summary.items():
+        total = entry['total_ms']
+        print(f"{str(group):<16}{entry['count']:>6}{entry['errors']:>6}{entry['retries']:>7}{entry['cache_hits']:>6}"
+              f"{entry['prompt_tokens']:>10}{entry['completion_tokens']:>8}{entry['cost_usd']:>10.4f}"
+              f"{_fmt(total['p50']):>8}{_fmt(total['p95']):>8}{_fmt(total['p99']):>8}")
+        for name, spans in entry['spans'].items():
+            print(f"  └ {name:<14}{'':>49}{_fmt(spans['p50']):>8}{_fmt(spans['p95']):>8}{_fmt(spans['p99']):>8}")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2, default=str)
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,19 @@
 # 학습 분석 컴포넌트: 문제 해결 성과 및 정답률 중심 분석
 
-import os
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from openai import OpenAI
-from config.settings import get_config  # GRADE_LEVELS 가져오기
-
+from config.settings import get_config, ANALYTICS_CONFIG  # GRADE_LEVELS 가져오기
+from utils.solution_review import get_solution_review, REVIEW_PENDING, REVIEW_READY, REVIEW_FAILED
+from utils.daily_stats import get_daily_window
+from utils.analytics_engine import get_analytics
+from utils.profiler import profile_component
+from utils.rerun import request_rerun
+
+@profile_component("render_analytics")
 def render_analytics():
     """학습 분석 대시보드 렌더링"""
     
@@ -43,9 +48,9 @@ def render_analytics():
 def render_metric_cards():
     """주요 메트릭 카드 표시 (시간 -> 정답률 변경)"""
     
-    analytics = st.session_state.analytics_data
-    total_problems = st.session_state.get('total_problems', 0)
-    solved_problems = st.session_state.get('solved_problems', 0)
+    snapshot = get_analytics().snapshot()
+    total_problems = snapshot['total_problems']
+    solved_problems = snapshot['solved_problems']
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -59,7 +64,7 @@ def render_metric_cards():
         """.format(solved_problems, total_problems), unsafe_allow_html=True)
     
     with col2:
-        total_hints = analytics.get('total_hints', 0)
+        total_hints = snapshot['total_hints']
         st.markdown("""
         <div class='stat-card'>
             <h3 style='color: #48bb78;'>힌트 사용</h3>
@@ -70,10 +75,8 @@ def render_metric_cards():
     
     with col3:
         # 학습 시간 대신 정답률(해결률) 표시
-        solve_rate = 0
-        if total_problems > 0:
-            solve_rate = round((solved_problems / total_problems) * 100, 1)
-            
+        solve_rate = snapshot['solve_rate']
+        
         st.markdown("""
         <div class='stat-card'>
             <h3 style='color: #f6ad55;'>정답률</h3>
@@ -83,12 +86,7 @@ def render_metric_cards():
         """.format(solve_rate), unsafe_allow_html=True)
     
     with col4:
-        distribution = analytics.get('hint_distribution', [0, 0, 0])
-        if sum(distribution) > 0:
-            avg_level = sum((i+1) * v for i, v in enumerate(distribution)) / sum(distribution)
-            avg_level = round(avg_level, 1)
-        else:
-            avg_level = 0
+        avg_level = round(snapshot['average_hint_level'], 1)
         
         st.markdown("""
         <div class='stat-card'>
@@ -98,26 +96,37 @@ def render_metric_cards():
         </div>
         """.format(avg_level), unsafe_allow_html=True)
 
+def get_cached_figure(name, snapshot, build, *params):
+    """
+    차트 figure 메모이제이션
+    (학생, 차트 이름, 분석 데이터 version, 추가 인자)가 같으면 이전에 만든 figure를 그대로 재사용
+    세션마다 최근 ANALYTICS_CONFIG['figure_cache_size']개만 보관 (LRU)
+    """
+    cache = st.session_state.get('_figure_cache')
+    if cache is None:
+        cache = st.session_state._figure_cache = OrderedDict()
+    
+    key = (st.session_state.get('student_id'), name, snapshot['version']) + params
+    fig = cache.get(key)
+    if fig is not None:
+        cache.move_to_end(key)
+        return fig
+    
+    fig = build(snapshot, *params)
+    cache[key] = fig
+    while len(cache) > ANALYTICS_CONFIG.get('figure_cache_size', 12):
+        cache.popitem(last=False)
+    return fig
+
 def render_hint_distribution_chart():
     """힌트 분포 차트"""
     st.subheader("📊 힌트 사용 분포")
     
-    distribution = st.session_state.analytics_data.get('hint_distribution', [0, 0, 0])
+    snapshot = get_analytics().snapshot()
+    distribution = list(snapshot['hint_distribution'])
     
     if sum(distribution) > 0:
-        fig = go.Figure(data=[go.Pie(
-            labels=['1단계 힌트', '2단계 힌트', '3단계 힌트'],
-            values=distribution,
-            hole=.3,
-            marker=dict(colors=['#48bb78', '#f6ad55', '#fc8181'])
-        )])
-        
-        fig.update_layout(
-            height=300,
-            showlegend=True,
-            margin=dict(l=0, r=0, t=0, b=0)
-        )
-        
+        fig = get_cached_figure('hint_distribution', snapshot, _build_hint_distribution_figure)
         st.plotly_chart(fig, use_container_width=True)
         
         max_idx = distribution.index(max(distribution))
@@ -126,28 +135,69 @@ def render_hint_distribution_chart():
     else:
         st.info("아직 힌트를 사용하지 않았어요.")
 
+def _build_hint_distribution_figure(snapshot):
+    fig = go.Figure(data=[go.Pie(
+        labels=['1단계 힌트', '2단계 힌트', '3단계 힌트'],
+        values=list(snapshot['hint_distribution']),
+        hole=.3,
+        marker=dict(colors=['#48bb78', '#f6ad55', '#fc8181'])
+    )])
+    
+    fig.update_layout(
+        height=300,
+        showlegend=True,
+        margin=dict(l=0, r=0, t=0, b=0)
+    )
+    return fig
+
+# 진도 차트 기간 선택지 (라벨: 일수)
+PROGRESS_WINDOWS = {'7일': 7, '30일': 30, '90일': 90}
+
 def render_weekly_progress_chart():
-    """주간 문제 해결 진도 차트"""
-    st.subheader("📈 주간 학습 성과")
+    """기간별 문제 해결 진도 차트 (일별 지표 인덱스에서 기간 일수만큼만 읽음)"""
+    st.subheader("📈 기간별 학습 성과")
     
-    # 날짜 생성
-    dates = pd.date_range(end=datetime.now(), periods=7).tolist()
+    window_label = st.radio(
+        "기간",
+        list(PROGRESS_WINDOWS.keys()),
+        horizontal=True,
+        key='progress_window',
+        label_visibility='collapsed'
+    )
+    days = PROGRESS_WINDOWS[window_label]
+    snapshot = get_analytics().snapshot()
+    window = get_daily_window(snapshot, days)
     
-    current_solved = st.session_state.get('solved_problems', 0)
-    solved_counts = [0, 0, 0, 0, 0, 0, current_solved]
+    # 날짜가 바뀌면 같은 version이라도 창이 달라지므로 오늘 날짜도 키에 포함
+    fig = get_cached_figure(
+        'progress', snapshot, _build_progress_figure, days, datetime.now().strftime('%Y-%m-%d')
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    
+    total_solved = sum(entry['solved'] for _, entry in window)
+    if days == 7:
+        st.success(f"🔥 이번 주 총 **{total_solved}문제**를 해결했어요!")
+    else:
+        total_attempted = sum(entry['attempted'] for _, entry in window)
+        st.success(f"🔥 최근 {days}일 동안 총 **{total_solved}문제**를 해결했어요! (시도 {total_attempted}문제)")
+
+def _build_progress_figure(snapshot, days, today):
+    window = get_daily_window(snapshot, days, end=datetime.strptime(today, '%Y-%m-%d'))
     
     df = pd.DataFrame({
-        '날짜': [d.strftime('%m/%d') for d in dates],
-        '해결한 문제': solved_counts
+        '날짜': [d.strftime('%m/%d') for d, _ in window],
+        '해결한 문제': [entry['solved'] for _, entry in window],
+        '시도한 문제': [entry['attempted'] for _, entry in window]
     })
     
     fig = px.bar(
         df, 
         x='날짜', 
         y='해결한 문제',
-        text='해결한 문제',
+        text='해결한 문제' if days <= 30 else None,
         color='해결한 문제',
-        color_continuous_scale='Bluered'
+        color_continuous_scale='Bluered',
+        hover_data=['시도한 문제']
     )
     
     fig.update_layout(
@@ -156,18 +206,14 @@ def render_weekly_progress_chart():
         margin=dict(l=0, r=0, t=0, b=0),
         yaxis=dict(title='문제 수')
     )
-    
-    st.plotly_chart(fig, use_container_width=True)
-    
-    weekly_total = sum(solved_counts)
-    st.success(f"🔥 이번 주 총 **{weekly_total}문제**를 해결했어요!")
+    return fig
 
 def render_detailed_analysis():
     """상세 분석 섹션 (강점/약점 분석 + 최근 풀이 리뷰)"""
     st.subheader("🔍 상세 학습 분석")
 
     # 안내 문구 (전체 폭)
-    solved_count = st.session_state.get('solved_problems', 0)
+    solved_count = get_analytics().snapshot()['solved_problems']
     if solved_count < 3:
         st.info("📚 문제를 3개 이상 풀면 AI가 강점과 약점을 분석해드려요!")
 
@@ -210,26 +256,27 @@ def render_strengths_weaknesses():
     else:
         categories = ['지수와 로그', '수열', '미적분', '확률과 통계', '기하와 벡터']
 
-    # 🔹 2) topic_stats 기반으로 각 토픽별 점수 계산
-    topic_stats = st.session_state.analytics_data.get('topic_stats', {})
+    # 🔹 2) topic_stats 기반 레이더 차트 (데이터 version/토픽 목록이 같으면 재사용)
+    fig = get_cached_figure(
+        'strengths', get_analytics().snapshot(), _build_strengths_figure, tuple(categories)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+def _build_strengths_figure(snapshot, categories):
+    topic_accuracy = snapshot['topic_accuracy']  # 집계기가 미리 계산한 정답률 0~1
 
     values = []
     for topic in categories:
-        stat = topic_stats.get(topic, {'attempted': 0, 'solved': 0})
-        attempted = stat.get('attempted', 0)
-        solved = stat.get('solved', 0)
-
-        if attempted == 0:
+        if topic not in topic_accuracy:
             score = 20  # 아직 안 풀어본 단원은 기본값
         else:
-            acc = solved / attempted  # 정답률 0~1
-            score = 20 + acc * 80     # 20~100 범위로 스케일링
+            score = 20 + topic_accuracy[topic] * 80  # 20~100 범위로 스케일링
 
         values.append(score)
 
     fig = go.Figure(data=go.Scatterpolar(
         r=values,
-        theta=categories,
+        theta=list(categories),
         fill='toself',
         marker=dict(color='#667eea')
     ))
@@ -240,106 +287,33 @@ def render_strengths_weaknesses():
         height=300,
         margin=dict(t=20, b=20)
     )
-
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
 def render_solution_review():
     """
     최근에 맞힌 한 문제에 대해
     - 풀이 흐름을 정리하고
     - 잘한 점 / 개선하면 좋을 점을 피드백하는 섹션
+    리뷰는 정답 판정 직후 백그라운드에서 만들어져 저장되므로 여기서는 저장된 것만 읽음
     """
     st.markdown("#### 📝 최근 풀이 정리 & 피드백")
     
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        st.info("⚠️ 풀이 리뷰 생성을 위해 OpenAI API 키가 필요합니다.")
-        return
-
-    chat_history = st.session_state.get("chat_history", [])
-    if not chat_history:
-        st.info("아직 대화 기록이 없어요. 먼저 문제를 풀어보면 풀이 리뷰를 보여줄게요 😊")
+    student_id = st.session_state.get('student_id')
+    problem_id = st.session_state.get('last_solved_problem_id')
+    status, review = get_solution_review(student_id, problem_id)
+    
+    if status == REVIEW_PENDING:
+        st.info("⏳ 풀이 리뷰를 만드는 중이에요... 잠시 후 다시 확인해 주세요!")
+        if st.button("🔄 새로고침", key='refresh_solution_review'):
+            request_rerun(scope="app")
         return
-
-    # 1️⃣ 가장 최근에 '정답입니다' 로 시작하는 assistant 메시지를 찾기
-    last_correct_idx = None
-    for i in range(len(chat_history) - 1, -1, -1):
-        role, content, ts = chat_history[i]
-        if role == "assistant" and isinstance(content, str) and content.strip().startswith("정답입니다"):
-            last_correct_idx = i
-            break
-
-    if last_correct_idx is None:
-        st.info("아직 정답으로 마무리된 문제가 없어요. 정답을 맞히면 풀이 리뷰가 생성됩니다! ✨")
+    
+    if status == REVIEW_READY:
+        st.markdown(review['review'])
         return
-
-    # 2️⃣ 해당 문제 주변 대화들을 모아서 컨텍스트 생성
-    start_idx = max(0, last_correct_idx - 10)  # 최근 10개 정도 포함
-    relevant_history = chat_history[start_idx:last_correct_idx + 1]
-
-    convo_lines = []
-    for role, content, ts in relevant_history:
-        speaker = "학생" if role == "user" else "선생님"
-        convo_lines.append(f"{speaker}: {content}")
-    conversation_text = "\n".join(convo_lines)
-
-    # 3️⃣ 캐시 키 (같은 문제에 대해 반복 호출 방지)
-    cache_key = (len(chat_history), last_correct_idx)
-    if st.session_state.get("solution_review_cache_key") == cache_key:
-        cached = st.session_state.get("solution_review_text", "")
-        if cached:
-            st.markdown(cached)
-            return
-
-    client = OpenAI(api_key=api_key)
-
-    system_prompt = f"""
-    너는 학생의 사고 과정을 정리해주는 수학 과외 선생님이야.
-    아래는 한 문제를 풀면서 학생과 주고받은 실제 대화 기록이야.
-
-    [대화 기록]
-    {conversation_text}
-
-    이 기록을 바탕으로, 학생이 푼 "최근 문제 한 개"에 대해 다음 내용을 마크다운으로 정리해줘.
-
-    출력 형식(반드시 지켜줘):
-
-    ### 🧮 최근 푼 문제 풀이 흐름
-    - 1단계: ...
-    - 2단계: ...
-    - 3단계: ...
-    (필요하다면 4~5단계까지, 핵심 과정만 간단히 요약)
-
-    ### ✨ 잘한 점
-    - 학생이 스스로 잘 해낸 점 2~3가지
-
-    ### 🔍 더 연습하면 좋을 점
-    - 개념 이해나 풀이 습관 측면에서 보완하면 좋을 점 2~3가지
-
-    추가 규칙:
-    - 정답이 맞았다는 가정하에, 굳이 최종 '숫자 답'을 다시 적지 않아도 돼.
-    - 학생이 어떤 생각을 통해 정답에 도달했는지 "흐름"을 중심으로 정리해줘.
-    - 말투는 한국어, 부드럽고 응원하는 톤으로.
-    - 너무 긴 이론 강의 대신, 이 문제를 풀면서 드러난 특징 위주로 이야기해줘.
-    """
-
-    try:
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": "위 형식에 맞춰서 풀이 흐름과 피드백을 정리해줘."}
-            ],
-            temperature=0.7,
-            max_tokens=500
-        )
-        review_text = resp.choices[0].message.content.strip()
-    except Exception as e:
-        st.warning(f"풀이 리뷰 생성 중 오류가 발생했어요: {e}")
+    
+    if status == REVIEW_FAILED:
+        st.warning("풀이 리뷰를 만들지 못했어요. (OpenAI API 키나 네트워크 상태를 확인해 주세요)")
         return
-
-    # 캐시에 저장
-    st.session_state.solution_review_cache_key = cache_key
-    st.session_state.solution_review_text = review_text
-
-    st.markdown(review_text)
+    
+    st.info("아직 정답으로 마무리된 문제가 없어요. 정답을 맞히면 풀이 리뷰가 생성됩니다! ✨")
@@ -3,6 +3,7 @@
 import streamlit as st
 from datetime import datetime
 import base64
+from utils.analytics_engine import get_analytics
 
 class ChatInterface:
     """채팅 인터페이스 클래스"""
@@ -96,7 +97,7 @@ class ChatInterface:
             'messages': self.messages,
             'statistics': {
                 'total_messages': len(self.messages),
-                'hints_used': st.session_state.analytics_data.get('total_hints', 0)
+                'hints_used': get_analytics().snapshot()['total_hints']
             }
         }
         return export_data
@@ -1,7 +1,18 @@
 # Hint 버튼 컴포넌트 : 단계별 힌트 버튼을 관리하고 렌더링
 
 import streamlit as st
+from config.settings import HINT_CONFIG
+from utils.analytics_engine import EVENT_HINT_USED
+from utils.profiler import profile_component
 
+# 힌트 버튼을 눌렀을 때 학생 메시지로 남는 문구
+HINT_REQUEST_MESSAGES = {
+    1: "어떻게 접근해야 할지 모르겠어요! (1단계 힌트)",
+    2: "핵심 개념이 궁금해요! (2단계 힌트)",
+    3: "마지막 힌트가 필요해요! (3단계 힌트)"
+}
+
+@profile_component("render_hint_buttons")
 def render_hint_buttons():
     """힌트 버튼 렌더링"""
     
@@ -62,25 +73,58 @@ def render_hint_buttons():
 
 def handle_hint_click(level):
     """힌트 버튼 클릭 처리"""
-    st.session_state.hint_level = level
-    
-    # 통계 업데이트
-    st.session_state.analytics_data['total_hints'] += 1
-    st.session_state.analytics_data['hint_distribution'][level - 1] += 1
+    # 힌트 사다리 모드면 저장된 사다리에서 바로 꺼냄 (모델 호출 없음)
+    ladder_hint = get_ladder_hint(level) if HINT_CONFIG.get('ladder_mode') else None
+    if ladder_hint is None:
+        st.session_state.hint_level = level
     
     # 로그 메시지 추가
     from datetime import datetime
     timestamp = datetime.now().strftime("%H:%M")
     
-    hint_messages = {
-        1: "어떻게 접근해야 할지 모르겠어요! (1단계 힌트)",
-        2: "핵심 개념이 궁금해요! (2단계 힌트)",
-        3: "마지막 힌트가 필요해요! (3단계 힌트)"
-    }
-    
     st.session_state.chat_history.append(
-        ("user", hint_messages[level], timestamp)
+        ("user", HINT_REQUEST_MESSAGES[level], timestamp)
     )
+    
+    if ladder_hint is not None:
+        st.session_state.chat_history.append(
+            ("assistant", ladder_hint, timestamp)
+        )
+        # 통계는 힌트가 실제로 전달될 때 한 번만 기록 (생성 경로는 handle_user_input에서 기록)
+        problem_id = (st.session_state.get('current_problem') or {}).get('problem_id')
+        st.session_state.session_manager.update_analytics(
+            EVENT_HINT_USED, {'level': level, 'problem_id': problem_id}
+        )
+
+def get_ladder_hint(level):
+    """
+    현재 문제/선생님의 힌트 사다리에서 level 단계 힌트 반환
+    사다리가 없으면 한 번 생성해서 저장, 실패하거나 문제가 없으면 None (단계별 생성으로 대체)
+    """
+    from utils.ai_handler import get_hint_ladder
+    from utils.problem_analyzer import get_problem_analysis
+    
+    problem_id = (st.session_state.get('current_problem') or {}).get('problem_id')
+    if not problem_id:
+        return None
+    
+    persona = st.session_state.get('selected_persona', 'friendly')
+    ladders = st.session_state.setdefault('hint_ladders', {})
+    ladder_key = f"{problem_id}:{persona}"
+    
+    if ladder_key not in ladders:
+        with st.spinner("선생님이 힌트를 준비하고 있어요..."):
+            ladder = get_hint_ladder(
+                persona=persona,
+                uploaded_image=st.session_state.get('uploaded_image'),
+                chat_history=st.session_state.chat_history,
+                problem_analysis=get_problem_analysis(problem_id)
+            )
+        if not ladder:
+            return None
+        ladders[ladder_key] = ladder
+    
+    return ladders[ladder_key].get(level)
 
 def display_hint_level_indicator():
     """현재 힌트 레벨 인디케이터 표시"""
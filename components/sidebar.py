@@ -1,7 +1,20 @@
 import streamlit as st
+from config.settings import DEBUG_CONFIG
+from utils.response_cache import get_response_cache
+from utils.hint_prefetcher import get_prefetch_stats
+from utils.usage_tracker import get_usage_stats
+from utils.telemetry import get_recent_records, summarize_records
+from utils.analytics_engine import get_analytics
+from utils.rerun import request_rerun
+from utils.profiler import profile_component, summarize_profile
 
+@profile_component("render_sidebar")
 def render_sidebar():
-    """사이드바 렌더링"""
+    """
+    사이드바 렌더링
+    학습 진도 + 빠른 통계는 자리(컨테이너)만 만들어 반환 → 통계를 바꾸는 대화 패널 프래그먼트가
+    그 안을 그려서, 판정/힌트 뒤에 앱 전체가 아니라 대화 패널 rerun만으로 사이드바 통계가 갱신됨
+    """
     
     with st.sidebar:
         # 🔹 상단 로고 영역
@@ -20,18 +33,15 @@ def render_sidebar():
         
         st.divider()
         
-        # 학습 진도
-        render_progress()
-        
-        st.divider()
-        
-        # 빠른 통계
-        render_quick_stats()
+        # 학습 진도 + 빠른 통계 (내용은 app.py가 render_live_stats로 채움)
+        stats_slot = st.container()
         
         st.divider()
         
         # 설정
         render_settings()
+    
+    return stats_slot
 
 def render_student_info():
     """학생 정보 표시"""
@@ -56,12 +66,25 @@ def render_student_info():
     )
     st.session_state.grade = grade
 
+@profile_component("render_live_stats")
+def render_live_stats():
+    """
+    학습 진도 + 빠른 통계 (render_sidebar가 만든 자리 안에서 호출)
+    학습 화면에서는 대화 패널 프래그먼트가 매 실행 끝에 다시 그리므로 판정/힌트 결과가 바로 반영됨
+    """
+    render_progress()
+    
+    st.divider()
+    
+    render_quick_stats()
+
 def render_progress():
     """학습 진도 표시 (문제 수 중심)"""
     st.subheader("📈 나의 성장")
     
-    total = st.session_state.get('total_problems', 0)
-    solved = st.session_state.get('solved_problems', 0)
+    snapshot = get_analytics().snapshot()
+    total = snapshot['total_problems']
+    solved = snapshot['solved_problems']
     
     if total > 0:
         progress = min(solved / total, 1.0)
@@ -81,24 +104,23 @@ def render_quick_stats():
     """빠른 통계 표시"""
     st.subheader("📊 빠른 통계")
     
-    analytics = st.session_state.analytics_data
+    snapshot = get_analytics().snapshot()
+    distribution = snapshot['hint_distribution']
     
     col1, col2 = st.columns(2)
     
     with col1:
         st.metric(
             label="총 힌트 사용",
-            value=analytics.get('total_hints', 0),
+            value=snapshot['total_hints'],
             help="지금까지 사용한 힌트 횟수"
         )
     
     with col2:
-        distribution = analytics.get('hint_distribution', [0, 0, 0])
-        if sum(distribution) > 0:
-            max_level = distribution.index(max(distribution)) + 1
+        if snapshot['most_used_hint_level']:
             st.metric(
                 label="주로 사용 힌트",
-                value=f"{max_level}단계",
+                value=f"{snapshot['most_used_hint_level']}단계",
                 help="가장 많이 사용한 힌트 레벨"
             )
         else:
@@ -107,7 +129,7 @@ def render_quick_stats():
                 value="없음"
             )
     
-    if sum(distribution) > 0:
+    if snapshot['total_hints'] > 0:
         st.caption("힌트 사용 분포")
         chart_data = {
             '1단계': distribution[0],
@@ -142,12 +164,56 @@ def render_settings():
         'auto_save': auto_save
     }
     
+    # 디버그 모드에서만 성능 지표 표시
+    if DEBUG_CONFIG.get('debug_mode'):
+        render_performance_stats()
+        render_rerun_profile()
+    
     st.divider()
     
     if st.button("🗑️ 대화 기록 초기화", type="secondary", use_container_width=True):
         if st.button("정말 초기화하시겠습니까?", type="primary"):
-            st.session_state.chat_history = []
-            st.session_state.total_problems = 0
-            st.session_state.solved_problems = 0
+            st.session_state.session_manager.reset_chat(clear_archive=True)
+            get_analytics().reset_problem_counts()
             st.success("대화 기록이 초기화되었습니다!")
-            st.rerun()
+            request_rerun(scope="app")
+
+def render_performance_stats():
+    """응답 캐시 / 힌트 선생성 / 토큰 사용량 / 컨텍스트 토큰 지표 (디버그용)"""
+    with st.expander("🔬 성능 지표", expanded=False):
+        st.caption("응답 캐시")
+        st.json(get_response_cache().stats())
+        st.caption("힌트 선생성")
+        st.json(get_prefetch_stats())
+        st.caption("토큰 사용량 (모드별, cached_rate = 프롬프트 캐시 적중률)")
+        st.json(get_usage_stats())
+        if st.session_state.get('last_context_report'):
+            st.caption("최근 요청 토큰 (섹션별)")
+            st.json(st.session_state.last_context_report)
+        records = get_recent_records()
+        if records:
+            st.caption(f"요청 구간별 지연 (최근 {len(records)}건, 모드별 p50/p95/p99 ms)")
+            st.json(summarize_records(records))
+
+def render_rerun_profile():
+    """rerun 프로파일 (디버그용): 컴포넌트별 시간, rerun 원인, 느린 실행"""
+    profile = summarize_profile()
+    with st.expander("⏱️ rerun 프로파일", expanded=False):
+        st.caption(f"앱 전체 실행 {profile['reruns']}회 · 프래그먼트 단독 실행 {profile['fragment_runs']}회 "
+                   f"(사이드바가 먼저 그려지므로 지금 실행은 다음 rerun에 반영)")
+        last = profile['last']
+        if last:
+            st.caption(f"마지막 실행: {last['name']} {last['total_ms']:.0f}ms · 원인: {last['trigger']}")
+        if profile['components']:
+            st.dataframe(profile['components'], hide_index=True, use_container_width=True)
+        if profile['triggers']:
+            st.caption("rerun 원인 (호출 위치)")
+            st.dataframe(
+                [{'원인': trigger, '횟수': count} for trigger, count in profile['triggers']],
+                hide_index=True, use_container_width=True
+            )
+        if profile['slow']:
+            st.caption("느린 실행")
+            for run in profile['slow'][-5:]:
+                dump = f" · `{run['dump']}`" if run['dump'] else ""
+                st.caption(f"{run['started_at']} {run['name']} {run['total_ms']:.0f}ms ({run['trigger']}){dump}")
@@ -1,9 +1,16 @@
 # components/teacher_selection.py
 
 import streamlit as st
+from utils.rerun import fragment, request_rerun
+from utils.profiler import profile_component
 
+@profile_component("render_teacher_selection")
+@fragment
 def render_teacher_selection():
-    """선생님 페르소나 선택 UI"""
+    """
+    선생님 페르소나 선택 UI (프래그먼트)
+    같은 선생님을 다시 누르면 카드만 다시 그리고, 다른 선생님을 고르면 대화 화면도 바뀌므로 앱 전체 rerun
+    """
 
     st.markdown("""
     <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
@@ -62,8 +69,12 @@ def render_teacher_selection():
 
             # 선택 버튼
             if st.button(f"{info['title']} 선택", key=f"select_{key}", use_container_width=True):
-                st.session_state.selected_persona = key
-                st.rerun()
+                if key != current:
+                    if 'hint_prefetcher' in st.session_state:
+                        # 다른 선생님 말투로 미리 만들어 둔 힌트는 쓸 수 없음
+                        st.session_state.hint_prefetcher.discard()
+                    st.session_state.selected_persona = key
+                    request_rerun(scope="app")
 
     # 선택된 선생님 정보 표시 (하단)
     selected = st.session_state.get("selected_persona", "friendly")
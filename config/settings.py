@@ -16,7 +16,18 @@ API_CONFIG = {
     'openai_api_key': os.getenv('OPENAI_API_KEY'),
     'model_name': 'gpt-4o-mini',
     'max_tokens': 1024,
-    'temperature': 0.7
+    'temperature': 0.7,
+    'stream': True,  # 힌트/정답 판정 응답을 토큰 단위로 스트리밍
+
+    # 공유 HTTP 클라이언트 (utils/openai_client.py)
+    'base_url': os.getenv('OPENAI_BASE_URL'),
+    'connect_timeout': 5.0,  # 초
+    'read_timeout': 60.0,  # 초
+    'max_retries': 3,  # 429/5xx 지수 백오프 재시도 횟수
+    'max_connections': 100,
+    'max_keepalive_connections': 20,
+    'keepalive_expiry': 30.0,  # 초
+    'background_workers': 4  # 백그라운드 모델 호출 스레드 수 (utils/background.py)
 }
 
 # UI 설정
@@ -29,17 +40,116 @@ UI_CONFIG = {
         'font': 'sans serif'
     },
     'layout': 'wide',
-    'sidebar_state': 'expanded'
+    'sidebar_state': 'expanded',
+    # 'radio': 선택한 화면만 실행 (채팅 중에는 분석 탭 계산 없음), 'tabs': 기존 st.tabs (모든 탭을 매번 실행)
+    'navigation': os.getenv('UI_NAVIGATION', 'radio'),
+    # 학습 화면을 프래그먼트(대화·힌트 패널, 선생님 선택)로 나눠 상호작용한 부분만 다시 실행
+    'fragments': os.getenv('UI_FRAGMENTS', 'true').lower() == 'true'
 }
 
 # 학습 설정
 LEARNING_CONFIG = {
     'hint_levels': 3,
-    'max_chat_history': 50,
+    'max_chat_history': 50,  # 세션에 남겨 두는 최근 메시지 수 (넘치면 저장소로 보관)
+    'chat_page_size': 20,  # 대화 화면에 한 번에 그리는 메시지 수 ('이전 대화 더 보기'로 늘림)
     'auto_save_interval': 5,  # 분
     'session_timeout': 30,  # 분
 }
 
+# 프롬프트 레지스트리 설정 (utils/prompt_registry.py)
+PROMPT_CONFIG = {
+    'reload_check_seconds': 2  # 이 간격마다 prompts/*.yaml 변경 여부 확인 (핫 리로드)
+}
+
+# 컨텍스트(토큰 예산) 설정 (utils/context_builder.py)
+CONTEXT_CONFIG = {
+    'budgets': {  # 요청 모드별 입력 토큰 예산 (시스템 + 대화 기록 + 현재 입력 + 이미지)
+        'hint': 4000,
+        'answer': 4000,
+        'ladder': 4500
+    },
+    'default_budget': 4000,
+    'max_history_turns': 8,  # 예산과 상관없이 보낼 최대 대화 턴 수
+    'keep_full_turns': 2,  # 최근 N턴은 압축하지 않음
+    'compressed_chars': 200,  # 압축 시 남길 앞부분 글자 수
+    'image_fallback_tokens': 765  # 크기를 모르는 이미지의 토큰 추정치
+}
+
+# 힌트 설정
+HINT_CONFIG = {
+    'ladder_mode': False,  # 1~3단계 힌트를 한 번에 생성해 두고 버튼별로 꺼내 씀
+    'prefetch_enabled': False,  # N단계 힌트 후 N+1단계를 미리 생성 (utils/hint_prefetcher.py)
+    'prefetch_wait_seconds': 30  # 진행 중인 선생성 결과를 기다리는 최대 시간
+}
+
+# 응답 캐시 설정 (utils/response_cache.py)
+CACHE_CONFIG = {
+    'enabled': True,
+    'max_entries': 512,  # 메모리 LRU 최대 항목 수
+    'ttl_seconds': 24 * 3600,
+    'disk_enabled': False,  # True면 data_dir 아래에도 저장
+    'disk_subdir': 'response_cache',
+    'max_disk_entries': 5000
+}
+
+# 모델 호출 녹화/재생 설정 (utils/cassette.py, benchmarks/prompt_regression.py)
+CASSETTE_CONFIG = {
+    # off: 그대로 호출 / record: 실제 호출 후 녹화 / replay: 녹화본만 사용 (네트워크·API 키 불필요)
+    # auto: 녹화본이 있으면 재생, 없으면 호출 후 녹화
+    'mode': os.getenv('OPENAI_CASSETTE_MODE', 'off'),
+    'dir': os.getenv('OPENAI_CASSETTE_DIR', os.path.join('benchmarks', 'cassettes')),  # 저장소에 커밋 가능한 위치
+    'replay_chunk_chars': 24  # 스트리밍 재생 시 조각 크기 (글자 수)
+}
+
+# 문제 분석(전사) 설정 (utils/problem_analyzer.py)
+ANALYSIS_CONFIG = {
+    'enabled': True,  # 업로드 시 한 번 전사하고, 이후 요청은 이미지 대신 전사본 사용
+    'wait_seconds': 3,  # 힌트 요청 시 진행 중인 분석을 기다리는 최대 시간
+    'max_tokens': 800,
+    'memo_size': 128  # 분석 결과를 보관할 문제 수
+}
+
+# 풀이 리뷰 설정 (utils/solution_review.py)
+REVIEW_CONFIG = {
+    'enabled': True,  # 정답 판정 직후 백그라운드로 풀이 리뷰 생성 후 저장
+    'history_messages': 11,  # 리뷰에 넣을 정답 판정 직전까지의 대화 수
+    'max_tokens': 500
+}
+
+# 이미지 전처리 설정 (utils/image_processor.py)
+IMAGE_CONFIG = {
+    'max_dimension': 1568,  # 긴 변 최대 픽셀
+    'jpeg_quality': 85,
+    'png_max_colors': 256,  # 색 수가 이 이하이면 PNG(스크린샷/도형)로 저장
+    'grayscale_saturation': 12,  # 평균 채도가 이 이하이면 흑백 변환
+    'detail': 'auto',  # auto / low / high
+    'low_detail_max_side': 512,
+    'memo_size': 64  # 전처리 결과를 재사용할 업로드 수
+}
+
+# 저장소 설정 (utils/storage.py)
+STORAGE_CONFIG = {
+    'backend': os.getenv('STORAGE_BACKEND', 'sqlite'),  # sqlite (학생별 레코드) / json (1인용 단일 파일)
+    'sqlite_file': 'tutor.db',  # data_dir 기준
+    'json_file': 'session_data.json',  # data_dir 기준
+    'sqlite_busy_timeout': 5.0,  # 초
+    # 학생 주소(?student=<ID>.<서명>) 서명 키, 없으면 data_dir에 만들어 둔 키 파일 사용
+    'student_link_secret': os.getenv('STUDENT_LINK_SECRET'),
+    'student_secret_file': '.student_secret'  # data_dir 기준
+}
+
+# 이벤트 로그 설정 (utils/event_log.py, JSON 저장소에서 사용)
+EVENT_LOG_CONFIG = {
+    'subdir': 'events',  # data_dir 기준
+    'max_segment_bytes': 5 * 1024 * 1024  # 세그먼트 회전 크기 (날짜가 바뀌어도 회전)
+}
+
+# 모델별 100만 토큰당 가격 (USD: 입력, 캐시 적중 입력, 출력) - 예상 비용 계산용 (utils/usage_tracker.py)
+MODEL_PRICES = {
+    'gpt-4o-mini': (0.15, 0.075, 0.60),
+    'gpt-4o': (2.50, 1.25, 10.00),
+}
+
 # 파일 경로
 PATHS = {
     'data_dir': 'data',
@@ -101,7 +211,9 @@ ANALYTICS_CONFIG = {
     'track_time': True,
     'track_problems': True,
     'export_format': 'json',  # json, csv, excel
-    'retention_days': 90
+    'retention_days': 90,  # 이보다 오래된 원본 이벤트는 일별 롤업으로 합치고 삭제
+    'compaction_interval_days': 1,  # 세션 로드 시 압축 작업을 이 간격 이상일 때만 실행
+    'figure_cache_size': 12  # 분석 탭 차트 figure를 세션당 이 개수만큼 재사용 (LRU)
 }
 
 # 보안 설정
@@ -120,6 +232,26 @@ DEBUG_CONFIG = {
     'save_logs': True
 }
 
+# rerun 프로파일러 설정 (utils/profiler.py, DEBUG_CONFIG['debug_mode']일 때만 동작)
+PROFILER_CONFIG = {
+    'enabled': True,
+    'always': False,  # 디버그 모드가 아니어도 기록 (benchmarks/rerun_benchmark.py용, 사이드바 표는 디버그 모드에서만)
+    'history_size': 50,  # 세션별로 보관하는 최근 실행 기록 수
+    'slow_rerun_ms': 500,  # 이보다 오래 걸린 실행은 느린 실행으로 표시 (cProfile 덤프 대상)
+    'cprofile': os.getenv('PROFILE_CPROFILE', 'false').lower() == 'true',  # 느린 실행의 cProfile 덤프 저장
+    'dump_subdir': 'profiles',  # logs_dir 기준 (.prof, python -m pstats 또는 snakeviz로 확인)
+    'max_dumps': 20  # 이보다 많으면 오래된 덤프부터 삭제
+}
+
+# 요청별 텔레메트리 설정 (utils/telemetry.py, DEBUG_CONFIG['save_logs']가 꺼져 있으면 기록 안 함)
+TELEMETRY_CONFIG = {
+    'enabled': os.getenv('TELEMETRY_ENABLED', 'true').lower() == 'true',
+    'file': 'telemetry.jsonl',  # logs_dir 기준
+    'max_bytes': 5 * 1024 * 1024,  # 이 크기를 넘으면 회전 (telemetry.jsonl.1, .2, ...)
+    'backup_count': 5,
+    'recent_size': 500  # 사이드바 성능 지표용으로 메모리에 남기는 최근 기록 수
+}
+
 def get_config(section=None):
     """설정 값 반환"""
     configs = {
@@ -127,13 +259,26 @@ def get_config(section=None):
         'api': API_CONFIG,
         'ui': UI_CONFIG,
         'learning': LEARNING_CONFIG,
+        'prompts': PROMPT_CONFIG,
+        'context': CONTEXT_CONFIG,
+        'hints': HINT_CONFIG,
+        'cache': CACHE_CONFIG,
+        'prices': MODEL_PRICES,
+        'cassette': CASSETTE_CONFIG,
+        'image': IMAGE_CONFIG,
+        'analysis': ANALYSIS_CONFIG,
+        'review': REVIEW_CONFIG,
+        'storage': STORAGE_CONFIG,
+        'event_log': EVENT_LOG_CONFIG,
         'paths': PATHS,
         'formats': SUPPORTED_FORMATS,
         'personas': PERSONAS,
         'grades': GRADE_LEVELS,
         'analytics': ANALYTICS_CONFIG,
         'security': SECURITY_CONFIG,
-        'debug': DEBUG_CONFIG
+        'debug': DEBUG_CONFIG,
+        'profiler': PROFILER_CONFIG,
+        'telemetry': TELEMETRY_CONFIG
     }
     
     if section:
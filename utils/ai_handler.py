@@ -1,31 +1,41 @@
-import os
-import base64
-from openai import OpenAI
+import json
 import streamlit as st
-from utils.prompt_manager import PromptManager
+from utils.image_processor import prepare_image
+from utils.problem_analyzer import format_problem_analysis
+from utils.prompt_manager import get_prompt_manager
+from utils.openai_client import get_openai_client
+from utils.response_cache import get_response_cache, normalize_text, make_cache_key
+from utils.background import submit_background
+from utils.context_builder import build_context_messages, estimate_image_tokens
+from utils.usage_tracker import record_usage
+from utils.telemetry import request_trace, span
+from config.settings import API_CONFIG, CACHE_CONFIG
 
 def encode_image_to_base64(image_file):
-    try:
-        return base64.b64encode(image_file.getvalue()).decode('utf-8')
-    except Exception:
+    """전처리(축소/재압축)된 이미지의 base64 문자열 반환"""
+    prepared = prepare_image(image_file)
+    if not prepared:
         return None
+    return prepared['data_url'].split(',', 1)[1]
 
-def get_ai_response(user_input, hint_level, persona, uploaded_image=None, chat_history=None, mode: str = "hint"):
+def _build_messages(user_input, hint_level, persona, uploaded_image=None, chat_history=None, mode: str = "hint",
+                    problem_analysis=None, record_report=True):
     """
-    OpenAI API를 통해 답변 생성
-    mode: "hint" (기본) / "answer" (최종 정답 판정)
+    모드에 맞는 시스템 프롬프트 + 대화 기록 + 현재 입력으로 메시지 목록 구성
+    - 대화 기록은 context_builder가 모드별 토큰 예산 안에서 잘라 넣음
+    - problem_analysis가 있으면 이미지 대신 전사된 문제 텍스트를 보냄
+    - record_report=False면 사이드바의 최근 요청 토큰을 덮어쓰지 않음 (다음 단계 힌트 선생성)
     """
-    
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        return "⚠️ OpenAI API 키가 설정되지 않았습니다. .env 파일을 확인해주세요."
+    with span('prompt_build'):
+        return _compose_messages(user_input, hint_level, persona, uploaded_image, chat_history, mode,
+                                 problem_analysis, record_report)
 
-    client = OpenAI(api_key=api_key)
-    prompt_manager = PromptManager()
+def _compose_messages(user_input, hint_level, persona, uploaded_image, chat_history, mode, problem_analysis,
+                      record_report=True):
+    prompt_manager = get_prompt_manager()
 
-    # 공통 컨텍스트
+    # 공통 컨텍스트 (대화 기록은 시스템 프롬프트가 아니라 메시지로만 보냄)
     context = {
-        'chat_history': chat_history if chat_history else [],
         'student_name': st.session_state.get('user_name', '학생'),
         'grade': st.session_state.get('grade', '중학생')
     }
@@ -37,6 +47,11 @@ def get_ai_response(user_input, hint_level, persona, uploaded_image=None, chat_h
             student_answer=user_input or "",
             context=context
         )
+    elif mode == "ladder":
+        system_prompt = prompt_manager.get_hint_ladder_prompt(
+            persona=persona,
+            context=context
+        )
     else:
         system_prompt = prompt_manager.get_prompt(
             persona=persona,
@@ -44,41 +59,284 @@ def get_ai_response(user_input, hint_level, persona, uploaded_image=None, chat_h
             context=context
         )
 
-    messages = [
-        {"role": "system", "content": system_prompt}
-    ]
-
-    # 최근 대화 4개만
-    if chat_history:
-        recent_history = chat_history[-4:]
-        for role, content, _ in recent_history:
-            messages.append({"role": role, "content": content})
-
-    # 현재 사용자 입력(텍스트+이미지)
+    # 현재 사용자 입력(텍스트+문제 이미지 또는 전사본)
     user_content = []
+    image_tokens = 0
     if user_input:
         user_content.append({"type": "text", "text": user_input})
 
-    if uploaded_image is not None:
-        img_base64 = encode_image_to_base64(uploaded_image)
-        if img_base64:
+    if problem_analysis:
+        user_content.append({"type": "text", "text": format_problem_analysis(problem_analysis)})
+    elif uploaded_image is not None:
+        with span('image_encoding'):
+            prepared = prepare_image(uploaded_image)
+        if prepared:
             user_content.append({
                 "type": "image_url",
                 "image_url": {
-                    "url": f"data:image/png;base64,{img_base64}"
+                    "url": prepared['data_url'],
+                    "detail": prepared['detail']
                 }
             })
+            image_tokens = estimate_image_tokens(prepared['width'], prepared['height'], prepared['detail'])
+
+    messages, report = build_context_messages(
+        system_prompt, chat_history, user_content, mode=mode, image_tokens=image_tokens, user_text=user_input
+    )
+
+    # 요청 섹션별 토큰 수 (사이드바 성능 지표에서 확인)
+    if record_report:
+        st.session_state.last_context_report = report
+
+    return messages
+
+def mark_context_reused(mode, source):
+    """
+    저장해 둔 응답을 그대로 쓴 요청 표시 (source: 'response_cache' / 'prefetch')
+    새로 보낸 토큰이 없으므로 이전 요청의 섹션별 토큰이 사이드바에 남지 않도록 교체
+    """
+    st.session_state.last_context_report = {'mode': mode, 'cache_hit': True, 'source': source, 'total': 0}
+
+def _get_cache_key(user_input, hint_level, persona, uploaded_image=None, mode: str = "hint", problem_analysis=None):
+    """
+    캐시 가능한 요청이면 캐시 키, 아니면 None
+    - 힌트 버튼 요청(hint_level > 0), 힌트 사다리, 정답 판정만 캐시
+    - 자유 질문은 앞선 대화에 따라 답이 달라지므로 캐시하지 않음
+    """
+    if not CACHE_CONFIG.get('enabled', True):
+        return None
+    if mode == "hint" and not hint_level:
+        return None
+
+    image_digest = None
+    if problem_analysis:
+        image_digest = problem_analysis['problem_id']
+    elif uploaded_image is not None:
+        with span('image_encoding'):
+            prepared = prepare_image(uploaded_image)
+        if prepared is None:
+            return None
+        image_digest = prepared['digest']
+
+    return make_cache_key(
+        image=image_digest,
+        persona=persona,
+        hint_level=hint_level,
+        grade=st.session_state.get('grade', '중학생'),
+        mode=mode,
+        user_input=normalize_text(user_input),
+        model=API_CONFIG['model_name']
+    )
+
+def get_ai_response(user_input, hint_level, persona, uploaded_image=None, chat_history=None, mode: str = "hint",
+                    problem_analysis=None):
+    """
+    OpenAI API를 통해 답변 생성
+    mode: "hint" (기본) / "answer" (최종 정답 판정)
+    problem_analysis: 문제 전사본 (있으면 이미지 대신 사용)
+    """
+    
+    client = get_openai_client()
+    if client is None:
+        return "⚠️ OpenAI API 키가 설정되지 않았습니다. .env 파일을 확인해주세요."
+
+    with request_trace(mode, persona=persona, hint_level=hint_level) as trace:
+        cache = get_response_cache()
+        cache_key = _get_cache_key(user_input, hint_level, persona, uploaded_image, mode, problem_analysis)
+        if cache_key:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                trace.set(cache_hit=True)
+                mark_context_reused(mode, 'response_cache')
+                return cached
 
-    if user_content:
-        messages.append({"role": "user", "content": user_content})
+        messages = _build_messages(user_input, hint_level, persona, uploaded_image, chat_history, mode,
+                                   problem_analysis)
 
+        try:
+            with trace.span('network'):
+                response = client.chat.completions.create(
+                    model=API_CONFIG['model_name'],
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=1000
+                )
+            record_usage(mode, response.usage)
+            content = response.choices[0].message.content
+            if cache_key and content:
+                cache.set(cache_key, content)
+            return content
+        except Exception as e:
+            trace.fail(e)
+            return f"죄송합니다. 답변을 생성하는 중에 오류가 발생했습니다.\n오류 내용: {str(e)}"
+
+def stream_ai_response(user_input, hint_level, persona, uploaded_image=None, chat_history=None, mode: str = "hint",
+                       problem_analysis=None):
+    """
+    get_ai_response의 스트리밍 버전
+    응답 텍스트 조각(delta)을 생성되는 즉시 yield 한다.
+    (호출 측에서 조각을 이어 붙이면 get_ai_response 결과와 같은 전체 텍스트가 됨)
+    """
+    client = get_openai_client()
+    if client is None:
+        yield "⚠️ OpenAI API 키가 설정되지 않았습니다. .env 파일을 확인해주세요."
+        return
+
+    with request_trace(mode, persona=persona, hint_level=hint_level) as trace:
+        trace.set(streamed=True)
+        cache = get_response_cache()
+        cache_key = _get_cache_key(user_input, hint_level, persona, uploaded_image, mode, problem_analysis)
+        if cache_key:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                trace.set(cache_hit=True)
+                mark_context_reused(mode, 'response_cache')
+                yield cached
+                return
+
+        messages = _build_messages(user_input, hint_level, persona, uploaded_image, chat_history, mode,
+                                   problem_analysis)
+
+        parts = []
+        try:
+            with trace.span('network'):
+                stream = iter(client.chat.completions.create(
+                    model=API_CONFIG['model_name'],
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=1000,
+                    stream=True,
+                    stream_options={"include_usage": True}
+                ))
+            while True:
+                # 조각을 기다린 시간은 network, yield 뒤 호출 측이 화면에 그린 시간은 rendering
+                with trace.span('network'):
+                    chunk = next(stream, None)
+                if chunk is None:
+                    break
+                # 마지막 청크에만 usage가 실려 옴 (choices는 비어 있음)
+                if chunk.usage is not None:
+                    record_usage(mode, chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    trace.mark('ttft')
+                    parts.append(delta)
+                    with trace.span('rendering'):
+                        yield delta
+        except Exception as e:
+            trace.fail(e)
+            yield f"죄송합니다. 답변을 생성하는 중에 오류가 발생했습니다.\n오류 내용: {str(e)}"
+            return
+
+        # 끝까지 정상 수신한 응답만 캐시
+        if cache_key and parts:
+            cache.set(cache_key, "".join(parts))
+
+HINT_LADDER_KEYS = ("hint_1", "hint_2", "hint_3")
+
+def get_hint_ladder(persona, uploaded_image=None, chat_history=None, problem_analysis=None):
+    """
+    1~3단계 힌트를 한 번의 호출로 생성 (힌트 사다리 모드)
+    반환: {1: 힌트, 2: 힌트, 3: 힌트} 또는 None (호출 측은 단계별 생성으로 대체)
+    """
+    client = get_openai_client()
+    if client is None:
+        return None
+
+    with request_trace("ladder", persona=persona) as trace:
+        cache = get_response_cache()
+        cache_key = _get_cache_key(None, 0, persona, uploaded_image, "ladder", problem_analysis)
+        if cache_key:
+            cached = parse_hint_ladder(cache.get(cache_key))
+            if cached:
+                trace.set(cache_hit=True)
+                mark_context_reused("ladder", 'response_cache')
+                return cached
+
+        messages = _build_messages(None, 0, persona, uploaded_image, chat_history, "ladder",
+                                   problem_analysis)
+
+        try:
+            with trace.span('network'):
+                response = client.chat.completions.create(
+                    model=API_CONFIG['model_name'],
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=1500,
+                    response_format={"type": "json_object"}
+                )
+            record_usage("ladder", response.usage)
+            content = response.choices[0].message.content
+        except Exception as e:
+            trace.fail(e)
+            print(f"힌트 사다리 생성 실패: {str(e)}")
+            return None
+
+        with trace.span('parsing'):
+            ladder = parse_hint_ladder(content)
+        if ladder is None:
+            trace.fail("힌트 사다리 JSON 검증 실패")
+        elif cache_key:
+            cache.set(cache_key, content)
+        return ladder
+
+def parse_hint_ladder(raw_text):
+    """힌트 사다리 JSON 검증 (세 단계가 모두 비어있지 않은 문자열이어야 함)"""
+    if not raw_text:
+        return None
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=1000
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"죄송합니다. 답변을 생성하는 중에 오류가 발생했습니다.\n오류 내용: {str(e)}"
+        data = json.loads(raw_text)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    ladder = {}
+    for level, key in enumerate(HINT_LADDER_KEYS, start=1):
+        hint = data.get(key)
+        if not isinstance(hint, str) or not hint.strip():
+            return None
+        ladder[level] = hint.strip()
+    return ladder
+
+def prefetch_ai_response(user_input, hint_level, persona, uploaded_image=None, chat_history=None, mode: str = "hint",
+                         problem_analysis=None):
+    """
+    응답을 백그라운드에서 미리 생성하고 Future 반환 (API 키가 없으면 None)
+    메시지 구성은 세션 상태를 읽어야 하므로 현재(스크립트) 스레드에서 하고, 네트워크 호출만 넘김
+    Future 결과: {'text': 응답 텍스트 또는 None, 'usage': {'prompt_tokens', 'cached_tokens', 'completion_tokens'}}
+    """
+    client = get_openai_client()
+    if client is None:
+        return None
+
+    messages = _build_messages(user_input, hint_level, persona, uploaded_image, chat_history, mode,
+                               problem_analysis, record_report=False)
+    return submit_background(_complete_in_background, client, messages, f"{mode}_prefetch", persona, hint_level)
+
+def _complete_in_background(client, messages, usage_mode, persona=None, hint_level=None):
+    """(백그라운드) 비스트리밍 호출 후 텍스트와 토큰 사용량 반환"""
+    with request_trace(usage_mode, persona=persona, hint_level=hint_level) as trace:
+        try:
+            with trace.span('network'):
+                response = client.chat.completions.create(
+                    model=API_CONFIG['model_name'],
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=1000
+                )
+        except Exception as e:
+            trace.fail(e)
+            print(f"응답 선생성 실패: {str(e)}")
+            return {'text': None, 'usage': {'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0}}
+
+        return {
+            'text': response.choices[0].message.content,
+            'usage': record_usage(usage_mode, response.usage)
+        }
+
+def is_streaming_enabled():
+    """스트리밍 응답 사용 여부 (config/settings.API_CONFIG['stream'])"""
+    return bool(API_CONFIG.get('stream', False))
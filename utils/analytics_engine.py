@@ -0,0 +1,145 @@
+# 학습 분석 집계 엔진: 모든 학습 통계를 이벤트 하나당 O(1)로 갱신하는 단일 집계기
+# 힌트/문제/토픽 카운터는 여기서만 바뀌고, 사이드바와 분석 탭은 읽기 전용 스냅샷만 읽음
+
+import itertools
+from types import MappingProxyType
+from datetime import datetime
+import streamlit as st
+from utils.daily_stats import record_attempt, record_hint
+
+# 이벤트 타입 (data 필드)
+EVENT_HINT_USED = 'hint_used'              # {'level': 1~3, 'problem_id'}
+EVENT_PROBLEM_STARTED = 'problem_started'  # {'problem_id'} - 문제당 첫 답안 제출 시 한 번
+EVENT_PROBLEM_SOLVED = 'problem_solved'    # {'topic', 'problem_id'} - 정답 판정
+EVENT_ANSWER_INCORRECT = 'answer_incorrect'  # {'topic', 'problem_id'} - 오답 판정
+
+EVENT_TYPES = (EVENT_HINT_USED, EVENT_PROBLEM_STARTED, EVENT_PROBLEM_SOLVED, EVENT_ANSWER_INCORRECT)
+
+# 프로세스 전체에서 겹치지 않는 버전 번호 (집계기를 새로 만들어도 이전 버전과 헷갈리지 않게)
+_versions = itertools.count(1)
+
+def empty_analytics_state():
+    """집계 상태 기본값 (st.session_state.analytics_data에 그대로 저장/복원됨)"""
+    return {
+        'total_hints': 0,
+        'hint_distribution': [0, 0, 0],
+        'problem_types': {},
+        'total_problems': 0,
+        'solved_problems': 0,
+        'topic_stats': {},
+        'daily_stats': {},
+        'last_study_date': None
+    }
+
+class AnalyticsAggregator:
+    """
+    이벤트를 받아 파생 지표를 점진적으로 유지하는 집계기
+    - apply(event): 이벤트 하나 반영, O(1) (해당 토픽/날짜 칸만 갱신)
+    - snapshot(): 읽기 전용 지표 묶음 + version (이벤트가 반영될 때마다 새 번호, 차트 메모이제이션 키로 사용)
+    state는 평범한 dict라서 세션 저장 경로가 그대로 직렬화함
+    """
+
+    def __init__(self, state=None):
+        self.state = state if state is not None else empty_analytics_state()
+        for key, value in empty_analytics_state().items():
+            self.state.setdefault(key, value)
+        self.version = next(_versions)
+        self._snapshot = None
+        self._snapshot_version = -1
+
+    def apply(self, event):
+        """이벤트 하나 반영 ({'type', 'timestamp', 'data'})"""
+        event_type = event.get('type')
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"알 수 없는 분석 이벤트: {event_type}")
+
+        state = self.state
+        data = event.get('data') or {}
+        day = (event.get('timestamp') or '')[:10] or None
+
+        if event_type == EVENT_HINT_USED:
+            level = int(data.get('level') or 0)
+            state['total_hints'] += 1
+            if 1 <= level <= 3:
+                state['hint_distribution'][level - 1] += 1
+                record_hint(state, level, day)
+
+        elif event_type == EVENT_PROBLEM_STARTED:
+            state['total_problems'] += 1
+
+        elif event_type in (EVENT_PROBLEM_SOLVED, EVENT_ANSWER_INCORRECT):
+            is_correct = event_type == EVENT_PROBLEM_SOLVED
+            if is_correct:
+                state['solved_problems'] += 1
+            topic = data.get('topic')
+            if topic:
+                stat = state['topic_stats'].setdefault(topic, {'attempted': 0, 'solved': 0})
+                stat['attempted'] += 1
+                if is_correct:
+                    stat['solved'] += 1
+            record_attempt(state, is_correct, day)
+
+        timestamp = event.get('timestamp') or datetime.now().isoformat()
+        if timestamp > (state['last_study_date'] or ''):
+            state['last_study_date'] = timestamp
+        self.version = next(_versions)
+
+    def reset_problem_counts(self):
+        """해결/시도 문제 수 초기화 (대화 기록 초기화 시)"""
+        self.state['total_problems'] = 0
+        self.state['solved_problems'] = 0
+        self.version = next(_versions)
+
+    def snapshot(self):
+        """읽기 전용 지표 (같은 version이면 같은 객체를 재사용)"""
+        if self._snapshot_version != self.version:
+            self._snapshot = self._build_snapshot()
+            self._snapshot_version = self.version
+        return self._snapshot
+
+    def _build_snapshot(self):
+        state = self.state
+        distribution = tuple(state['hint_distribution'])
+        hint_count = sum(distribution)
+        total = state['total_problems']
+        solved = state['solved_problems']
+
+        topic_stats = MappingProxyType({
+            topic: MappingProxyType(dict(stat)) for topic, stat in state['topic_stats'].items()
+        })
+        topic_accuracy = MappingProxyType({
+            topic: round(stat['solved'] / stat['attempted'], 3) if stat['attempted'] else 0.0
+            for topic, stat in state['topic_stats'].items()
+        })
+
+        return MappingProxyType({
+            'version': self.version,
+            'total_hints': state['total_hints'],
+            'hint_distribution': distribution,
+            'average_hint_level': round(
+                sum((i + 1) * count for i, count in enumerate(distribution)) / hint_count, 2
+            ) if hint_count else 0,
+            'most_used_hint_level': distribution.index(max(distribution)) + 1 if hint_count else None,
+            'total_problems': total,
+            'solved_problems': solved,
+            'solve_rate': round(min(solved / total, 1.0) * 100, 1) if total else 0,
+            'topic_stats': topic_stats,
+            'topic_accuracy': topic_accuracy,
+            'daily_stats': MappingProxyType(state['daily_stats']),
+            'last_study_date': state['last_study_date']
+        })
+
+def get_analytics():
+    """
+    현재 세션의 집계기 반환
+    st.session_state.analytics_data가 (세션 로드 등으로) 새 dict로 바뀌었으면 그 dict에 다시 연결
+    """
+    state = st.session_state.get('analytics_data')
+    if state is None:
+        state = st.session_state.analytics_data = empty_analytics_state()
+
+    aggregator = st.session_state.get('analytics_aggregator')
+    if aggregator is None or aggregator.state is not state:
+        aggregator = AnalyticsAggregator(state)
+        st.session_state.analytics_aggregator = aggregator
+    return aggregator
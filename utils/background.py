@@ -0,0 +1,28 @@
+# 백그라운드 작업 실행기: 모델 호출처럼 화면을 막으면 안 되는 작업을 공용 스레드 풀에서 실행
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import API_CONFIG
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    """프로세스 공용 스레드 풀 반환 (크기는 API_CONFIG['background_workers'])"""
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=API_CONFIG.get('background_workers', 4),
+                    thread_name_prefix='tutor-bg'
+                )
+    return _executor
+
+def submit_background(fn, *args, **kwargs):
+    """
+    작업을 백그라운드로 제출하고 Future 반환
+    주의: 작업 함수 안에서는 st.session_state에 접근하지 말 것 (필요한 값은 인자로 전달)
+    """
+    return get_executor().submit(fn, *args, **kwargs)
@@ -0,0 +1,230 @@
+# 모델 호출 녹화/재생(카세트): chat.completions.create 요청을 해시 키로 디스크에 녹화하고 그대로 다시 재생
+# 프롬프트를 바꿨을 때 토큰/지연/판정 변화를 네트워크 없이 비교하기 위한 장치 (benchmarks/prompt_regression.py)
+# 녹화본 하나 = JSON 파일 하나: <dir>/<키 앞 2글자>/<키>.json
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from types import SimpleNamespace
+from datetime import datetime
+from config.settings import CASSETTE_CONFIG
+from utils.usage_tracker import usage_to_dict
+
+CASSETTE_MODES = ('off', 'record', 'replay', 'auto')
+
+# 응답 내용과 무관한 전송 옵션 (스트리밍 여부가 달라도 같은 녹화본을 씀)
+_TRANSPORT_KEYS = ('stream', 'stream_options', 'timeout', 'extra_headers')
+
+class CassetteMissError(LookupError):
+    """재생 모드에서 요청에 맞는 녹화본이 없음"""
+
+def classify_request(request):
+    """
+    요청 종류: analysis / ladder / answer / review / hint (시스템 프롬프트와 응답 형식으로 구분)
+    녹화본에 'kind'로 남기고, 대역 응답(benchmarks/stub_server.py, prompt_regression.py --mode synthetic)에서도 사용
+    """
+    system = ""
+    for message in request.get('messages', []):
+        if message.get('role') == 'system' and isinstance(message.get('content'), str):
+            system += message['content']
+    json_mode = (request.get('response_format') or {}).get('type') == 'json_object'
+
+    if json_mode and 'hint_1' in system:
+        return 'ladder'
+    if json_mode:
+        return 'analysis'
+    if '##TOPIC' in system:
+        return 'answer'
+    if '풀이 흐름' in system:
+        return 'review'
+    return 'hint'
+
+def request_key(request):
+    """요청 파라미터(모델, 메시지, 온도, 토큰 한도, 응답 형식 등)의 sha256 해시"""
+    payload = {k: v for k, v in request.items() if k not in _TRANSPORT_KEYS}
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def _summarize_request(request):
+    """녹화 파일에 남길 요청 (이미지 data URL은 해시로 바꿔 파일 크기를 줄임)"""
+    payload = json.loads(json.dumps(
+        {k: v for k, v in request.items() if k not in _TRANSPORT_KEYS}, ensure_ascii=False, default=str
+    ))
+    for message in payload.get('messages', []):
+        content = message.get('content')
+        if not isinstance(content, list):
+            continue
+        for part in content:
+            url = (part.get('image_url') or {}).get('url', '') if isinstance(part, dict) else ''
+            if url.startswith('data:'):
+                part['image_url']['url'] = 'sha256:' + hashlib.sha256(url.encode('utf-8')).hexdigest()
+    return payload
+
+class CassetteStore:
+    """녹화본 읽기/쓰기 (원자적 쓰기: 임시 파일 → os.replace)"""
+
+    def __init__(self, directory=None):
+        self.directory = directory or CASSETTE_CONFIG.get('dir', os.path.join('benchmarks', 'cassettes'))
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"카세트 읽기 실패 ({key[:12]}): {str(e)}")
+            return None
+
+    def put(self, key, record):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(record, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+def _usage_namespace(usage):
+    """usage_to_dict 결과 → SDK usage 객체와 같은 모양"""
+    prompt = usage.get('prompt_tokens', 0)
+    completion = usage.get('completion_tokens', 0)
+    return SimpleNamespace(
+        prompt_tokens=prompt,
+        completion_tokens=completion,
+        total_tokens=prompt + completion,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=usage.get('cached_tokens', 0))
+    )
+
+def _replay_response(key, record):
+    """녹화본 → 비스트리밍 응답 객체 (choices[0].message.content, usage)"""
+    return SimpleNamespace(
+        id=f"cassette-{key[:12]}",
+        model=record.get('model'),
+        choices=[SimpleNamespace(
+            index=0,
+            message=SimpleNamespace(role='assistant', content=record.get('content')),
+            finish_reason=record.get('finish_reason', 'stop')
+        )],
+        usage=_usage_namespace(record.get('usage') or {})
+    )
+
+def _replay_stream(key, record, include_usage):
+    """녹화본 → 스트리밍 청크 (조각별 delta, 마지막에 choices가 빈 usage 청크)"""
+    content = record.get('content') or ""
+    size = max(1, CASSETTE_CONFIG.get('replay_chunk_chars', 24))
+    for start in range(0, len(content), size):
+        yield SimpleNamespace(
+            id=f"cassette-{key[:12]}",
+            choices=[SimpleNamespace(index=0, delta=SimpleNamespace(content=content[start:start + size]),
+                                     finish_reason=None)],
+            usage=None
+        )
+    if include_usage:
+        yield SimpleNamespace(id=f"cassette-{key[:12]}", choices=[],
+                              usage=_usage_namespace(record.get('usage') or {}))
+
+class CassetteClient:
+    """
+    OpenAI 클라이언트 대역: client.chat.completions.create(**kwargs)만 가로챔
+    - record: 실제 호출 후 녹화 (스트리밍은 끝까지 받은 뒤 녹화)
+    - replay: 녹화본만 재생, 없으면 CassetteMissError (실제 클라이언트가 없어도 동작)
+    - auto: 녹화본이 있으면 재생, 없으면 record와 같음
+    last_entry: 현재 스레드가 마지막으로 쓴 녹화본 정보 {'key', 'replayed', 'latency_ms'}
+    """
+
+    def __init__(self, mode, client=None, store=None):
+        if mode not in CASSETTE_MODES or mode == 'off':
+            raise ValueError(f"알 수 없는 카세트 모드: {mode}")
+        self.mode = mode
+        self._client = client
+        self.store = store or CassetteStore()
+        self._local = threading.local()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    @property
+    def last_entry(self):
+        return getattr(self._local, 'entry', None)
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+
+    def _create(self, **kwargs):
+        key = request_key(kwargs)
+        stream = bool(kwargs.get('stream'))
+
+        if self.mode in ('replay', 'auto'):
+            record = self.store.get(key)
+            if record is not None:
+                self._local.entry = {'key': key, 'replayed': True, 'latency_ms': record.get('latency_ms')}
+                if stream:
+                    include_usage = bool((kwargs.get('stream_options') or {}).get('include_usage'))
+                    return _replay_stream(key, record, include_usage)
+                return _replay_response(key, record)
+            if self.mode == 'replay':
+                raise CassetteMissError(f"녹화본 없음: {key[:12]} (OPENAI_CASSETTE_MODE=record로 먼저 녹화)")
+
+        if self._client is None:
+            raise CassetteMissError(f"녹화할 실제 클라이언트가 없음 (API 키 확인): {key[:12]}")
+
+        started = time.perf_counter()
+        response = self._client.chat.completions.create(**kwargs)
+        if stream:
+            return self._record_stream(key, kwargs, response, started)
+
+        choice = response.choices[0]
+        self._save(key, kwargs, started, choice.message.content, choice.finish_reason,
+                   usage_to_dict(response.usage), getattr(response, 'model', None))
+        return response
+
+    def _record_stream(self, key, request, stream, started):
+        """청크를 그대로 넘겨주면서 모아 두었다가, 끝까지 받으면 녹화"""
+        parts = []
+        usage = None
+        finish_reason = None
+        model = None
+        for chunk in stream:
+            model = getattr(chunk, 'model', None) or model
+            if chunk.usage is not None:
+                usage = usage_to_dict(chunk.usage)
+            if chunk.choices:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                finish_reason = chunk.choices[0].finish_reason or finish_reason
+            yield chunk
+        self._save(key, request, started, "".join(parts), finish_reason, usage or usage_to_dict(None), model)
+
+    def _save(self, key, request, started, content, finish_reason, usage, model):
+        latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        self._local.entry = {'key': key, 'replayed': False, 'latency_ms': latency_ms}
+        try:
+            self.store.put(key, {
+                'key': key,
+                'recorded_at': datetime.now().isoformat(),
+                'model': model or request.get('model'),
+                'kind': classify_request(request),
+                'request': _summarize_request(request),
+                'content': content,
+                'finish_reason': finish_reason,
+                'usage': usage,
+                'latency_ms': latency_ms
+            })
+        except Exception as e:
+            print(f"카세트 저장 실패 ({key[:12]}): {str(e)}")
+
+def get_cassette_mode():
+    """설정된 카세트 모드 (알 수 없는 값이면 off)"""
+    mode = (CASSETTE_CONFIG.get('mode') or 'off').lower()
+    return mode if mode in CASSETTE_MODES else 'off'
@@ -0,0 +1,136 @@
+# 컨텍스트 빌더: 토큰 예산 안에서 시스템 프롬프트 + 대화 기록 + 현재 입력을 조립
+
+import re
+import math
+from config.settings import CONTEXT_CONFIG
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken이 없거나 인코딩 파일을 받을 수 없으면 추정치 사용
+    _encoding = None
+
+_HANGUL = re.compile(r"[가-힣ㄱ-ㆎ]")
+_ASCII = re.compile(r"[\x00-\x7f]")
+
+MESSAGE_OVERHEAD_TOKENS = 4  # 메시지마다 붙는 role/구분자 토큰
+
+def estimate_tokens(text):
+    """
+    텍스트 토큰 수
+    tiktoken이 있으면 정확히 세고, 없으면 o200k 기준으로 보정한 추정치 사용
+    (한글 음절 ≈ 0.8토큰, 영문/숫자/기호 ≈ 4글자당 1토큰, 그 외 문자 ≈ 1토큰)
+    """
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+
+    hangul = len(_HANGUL.findall(text))
+    ascii_chars = len(_ASCII.findall(text))
+    other = len(text) - hangul - ascii_chars
+    return math.ceil(hangul * 0.8 + ascii_chars / 4 + other)
+
+def estimate_image_tokens(width, height, detail):
+    """비전 입력 토큰 수 (OpenAI 타일 계산 방식: low=85, high=85+170×512px 타일 수)"""
+    if detail == 'low':
+        return 85
+    if not width or not height:
+        return CONTEXT_CONFIG.get('image_fallback_tokens', 765)
+
+    # 2048 안으로 맞춘 뒤 짧은 변을 768로 축소
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+
+    tiles = math.ceil(width / 512) * math.ceil(height / 512)
+    return 85 + 170 * tiles
+
+def _content_text(content):
+    """메시지 content(문자열 또는 파트 목록)에서 텍스트만 추출"""
+    if isinstance(content, str):
+        return content
+    return "\n".join(part.get('text', '') for part in content if part.get('type') == 'text')
+
+def build_context_messages(system_prompt, chat_history, user_content, mode="hint", image_tokens=0, user_text=None):
+    """
+    토큰 예산(CONTEXT_CONFIG['budgets'][mode]) 안에서 메시지 목록 조립
+    - 시스템 프롬프트와 현재 입력은 항상 포함
+    - user_text: 학생이 이번에 입력한 원문 (대화 기록 마지막 턴과 같으면 기록 쪽을 뺌)
+    - 대화 기록은 중복을 제거하고 최신 턴부터 채우며,
+      오래된 턴은 예산이 부족하면 앞부분만 남기고(압축) 그래도 안 되면 버림
+    반환: (messages, report)  report = 섹션별 토큰 수
+    """
+    budget = CONTEXT_CONFIG.get('budgets', {}).get(mode, CONTEXT_CONFIG.get('default_budget', 4000))
+
+    system_tokens = estimate_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+    user_tokens = 0
+    if user_content:
+        user_tokens = estimate_tokens(_content_text(user_content)) + MESSAGE_OVERHEAD_TOKENS
+
+    turns = _dedupe_history(chat_history or [], user_text)
+    max_turns = CONTEXT_CONFIG.get('max_history_turns', 8)
+    dropped = max(0, len(turns) - max_turns)
+    turns = turns[dropped:]
+
+    remaining = budget - system_tokens - user_tokens - image_tokens
+    keep_full = CONTEXT_CONFIG.get('keep_full_turns', 2)
+    compressed_chars = CONTEXT_CONFIG.get('compressed_chars', 200)
+
+    selected = []
+    history_tokens = 0
+    compressed = 0
+    for age, (role, content) in enumerate(reversed(turns)):
+        cost = estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+        if cost > remaining and age >= keep_full and len(content) > compressed_chars:
+            content = content[:compressed_chars].rstrip() + " …(생략)"
+            cost = estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+            compressed += 1
+        if cost > remaining:
+            dropped += len(turns) - age
+            break
+        selected.append({"role": role, "content": content})
+        remaining -= cost
+        history_tokens += cost
+    selected.reverse()
+
+    messages = [{"role": "system", "content": system_prompt}]
+    messages.extend(selected)
+    if user_content:
+        messages.append({"role": "user", "content": user_content})
+
+    report = {
+        'mode': mode,
+        'budget': budget,
+        'system': system_tokens,
+        'history': history_tokens,
+        'history_turns': len(selected),
+        'compressed_turns': compressed,
+        'dropped_turns': dropped,
+        'user_text': user_tokens,
+        'image': image_tokens,
+        'total': system_tokens + history_tokens + user_tokens + image_tokens,
+        'estimated': _encoding is None
+    }
+    return messages, report
+
+def _dedupe_history(chat_history, user_text):
+    """
+    대화 기록 정리
+    - 같은 역할·같은 내용이 연달아 있으면 하나만 남김
+    - 마지막 학생 메시지가 이번에 따로 보내는 입력 원문과 같으면 제외 (두 번 보내지 않도록)
+      문제 전사본 등 함께 붙는 텍스트 파트는 비교하지 않음
+    """
+    turns = []
+    for role, content, _ in chat_history:
+        if not content:
+            continue
+        if turns and turns[-1] == (role, content):
+            continue
+        turns.append((role, content))
+
+    current_text = (user_text or "").strip()
+    if turns and current_text and turns[-1][0] == "user" and turns[-1][1].strip() == current_text:
+        turns.pop()
+    return turns
@@ -0,0 +1,47 @@
+# 일별 학습 지표 인덱스: analytics_data['daily_stats'][YYYY-MM-DD] = {'solved', 'attempted', 'hints': [1단계, 2단계, 3단계]}
+# 판정/힌트가 생길 때마다 해당 날짜 칸만 갱신하므로, 차트는 이벤트를 훑지 않고 기간 일수만큼만 읽으면 됨
+
+from datetime import datetime, timedelta
+from config.settings import ANALYTICS_CONFIG
+
+def _empty_day():
+    return {'solved': 0, 'attempted': 0, 'hints': [0, 0, 0]}
+
+def _day_entry(analytics, day=None):
+    """오늘(또는 day) 칸 반환, 새 날짜 칸을 만들 때 보존 기간이 지난 칸 정리"""
+    day = day or datetime.now().strftime('%Y-%m-%d')
+    index = analytics.setdefault('daily_stats', {})
+
+    if day not in index:
+        cutoff = (datetime.now() - timedelta(days=ANALYTICS_CONFIG.get('retention_days', 90))).strftime('%Y-%m-%d')
+        for old_day in [d for d in index if d < cutoff]:
+            del index[old_day]
+        if day < cutoff:
+            return _empty_day()  # 보존 기간 밖 (과거 이벤트 재생 등): 집계만 하고 버림
+        index[day] = _empty_day()
+    return index[day]
+
+def record_attempt(analytics, is_correct, day=None):
+    """정답 판정 한 번 기록 (시도 +1, 정답이면 해결 +1)"""
+    entry = _day_entry(analytics, day)
+    entry['attempted'] += 1
+    if is_correct:
+        entry['solved'] += 1
+
+def record_hint(analytics, level, day=None):
+    """힌트 사용 기록 (level: 1~3)"""
+    if 1 <= level <= 3:
+        _day_entry(analytics, day)['hints'][level - 1] += 1
+
+def get_daily_window(analytics, days=7, end=None):
+    """
+    최근 days일(오늘 포함)의 날짜별 지표를 오래된 순으로 반환
+    [(datetime, {'solved', 'attempted', 'hints'}), ...], 기록이 없는 날은 0
+    """
+    index = analytics.get('daily_stats', {})
+    end = end or datetime.now()
+    window = []
+    for offset in range(days - 1, -1, -1):
+        date = end - timedelta(days=offset)
+        window.append((date, index.get(date.strftime('%Y-%m-%d')) or _empty_day()))
+    return window
@@ -0,0 +1,200 @@
+# 이벤트 로그: 분석 이벤트를 JSONL 세그먼트 파일에 추가만 하는 로그 (기록 비용 O(1))
+# 보존 기간이 지난 세그먼트는 일별 롤업(rollups.json)으로 합치고 삭제
+
+import os
+import json
+import glob
+import threading
+from datetime import datetime
+from config.settings import EVENT_LOG_CONFIG
+
+def rollup_key(event):
+    """롤업 묶음 기준: (날짜, 이벤트 타입, 토픽, 힌트 단계)"""
+    data = event.get('data') or {}
+    if not isinstance(data, dict):
+        data = {}
+    return (
+        event.get('timestamp', '')[:10],
+        event.get('type', ''),
+        data.get('topic') or '',
+        int(data.get('level') or 0)
+    )
+
+class EventLog:
+    """
+    추가 전용 JSONL 이벤트 로그
+    - 한 줄 = 이벤트 하나 ({'student_id', 'type', 'timestamp', 'data'})
+    - 날짜가 바뀌거나 세그먼트가 max_segment_bytes를 넘으면 새 세그먼트로 회전
+      (파일 이름: events-YYYYMMDD-NNNN.jsonl, 이름순 = 시간순)
+    """
+    
+    def __init__(self, log_dir, max_segment_bytes=None):
+        self.log_dir = log_dir
+        self.max_segment_bytes = max_segment_bytes or EVENT_LOG_CONFIG.get('max_segment_bytes', 5 * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._current = None
+        self.rollup_path = os.path.join(log_dir, 'rollups.json')
+        os.makedirs(log_dir, exist_ok=True)
+        self._compacted = set(self._load_rollup_state()['compacted_segments'])
+    
+    def append(self, student_id, events):
+        """이벤트 추가 (파일 끝에 줄만 덧붙임)"""
+        if not events:
+            return
+        lines = "".join(
+            json.dumps({'student_id': student_id, **event}, ensure_ascii=False) + "\n"
+            for event in events
+        )
+        with self._lock:
+            path = self._segment_for_write()
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+    
+    def iter_events(self, student_id=None, event_type=None, since=None, until=None):
+        """
+        조건에 맞는 이벤트를 시간순으로 하나씩 반환 (전체를 메모리에 올리지 않음)
+        since/until: ISO 시각 문자열 (since 이상, until 미만)
+        """
+        since_day = since[:10].replace('-', '') if since else None
+        until_day = until[:10].replace('-', '') if until else None
+        
+        # 세그먼트 목록은 잠금 안에서 한 번만 찍어 둠 (백그라운드 압축과 동시에 읽을 수 있음)
+        with self._lock:
+            paths = [p for p in self.segments() if os.path.basename(p) not in self._compacted]
+        
+        for path in paths:
+            day = self._segment_day(path)
+            if since_day and day < since_day:
+                continue
+            if until_day and day > until_day:
+                break
+            try:
+                f = open(path, 'r', encoding='utf-8')
+            except FileNotFoundError:
+                continue  # 목록을 찍은 뒤 압축되어 삭제됨 (이벤트는 롤업에 반영됨)
+            with f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # 기록 도중 종료되어 잘린 줄
+                    if student_id is not None and record.get('student_id') != student_id:
+                        continue
+                    if event_type is not None and record.get('type') != event_type:
+                        continue
+                    timestamp = record.get('timestamp', '')
+                    if since and timestamp < since:
+                        continue
+                    if until and timestamp >= until:
+                        continue
+                    record.pop('student_id', None)
+                    yield record
+    
+    def compact(self, before):
+        """
+        before(YYYY-MM-DD) 이전 날짜의 세그먼트를 롤업에 합치고 삭제, 합친 이벤트 수 반환
+        롤업 파일을 먼저 원자적으로 저장한 뒤 세그먼트를 지우므로 중간에 죽어도 중복 집계되지 않음
+        """
+        before_day = before[:10].replace('-', '')
+        compacted = 0
+        
+        with self._lock:
+            state = self._load_rollup_state()
+            counts = {
+                (r['student_id'], r['day'], r['type'], r['topic'], r['hint_level']): r['count']
+                for r in state['rollups']
+            }
+            done = set(state['compacted_segments'])
+            targets = [p for p in self.segments() if self._segment_day(p) < before_day]
+            
+            for path in targets:
+                name = os.path.basename(path)
+                if name in done:
+                    continue
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue
+                        key = (record.get('student_id'),) + rollup_key(record)
+                        counts[key] = counts.get(key, 0) + 1
+                        compacted += 1
+                done.add(name)
+            
+            state['rollups'] = [
+                {'student_id': k[0], 'day': k[1], 'type': k[2], 'topic': k[3], 'hint_level': k[4], 'count': c}
+                for k, c in sorted(counts.items(), key=lambda item: tuple(str(v) for v in item[0]))
+            ]
+            state['compacted_segments'] = sorted(done)
+            self._write_rollup_state(state)
+            self._compacted = set(done)
+            
+            for path in targets:
+                if os.path.exists(path):
+                    os.remove(path)
+            # 다 지웠으면 목록 정리
+            state['compacted_segments'] = [
+                name for name in state['compacted_segments']
+                if os.path.exists(os.path.join(self.log_dir, name))
+            ]
+            self._write_rollup_state(state)
+            self._compacted = set(state['compacted_segments'])
+        
+        return compacted
+    
+    def iter_rollups(self, student_id=None, since=None):
+        """롤업 레코드 반환 ({'day', 'type', 'topic', 'hint_level', 'count'})"""
+        since_day = since[:10] if since else None
+        with self._lock:
+            rollups = self._load_rollup_state()['rollups']
+        for record in rollups:
+            if student_id is not None and record.get('student_id') != student_id:
+                continue
+            if since_day and record['day'] < since_day:
+                continue
+            record = dict(record)
+            record.pop('student_id', None)
+            yield record
+    
+    def _load_rollup_state(self):
+        if os.path.exists(self.rollup_path):
+            with open(self.rollup_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {'rollups': [], 'compacted_segments': []}
+    
+    def _write_rollup_state(self, state):
+        tmp_path = f"{self.rollup_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.rollup_path)
+    
+    def segments(self):
+        """세그먼트 파일 경로 목록 (오래된 순)"""
+        return sorted(glob.glob(os.path.join(self.log_dir, 'events-*.jsonl')))
+    
+    def _segment_day(self, path):
+        return os.path.basename(path).split('-')[1]
+    
+    def _segment_for_write(self):
+        """쓰기용 세그먼트 선택 (필요하면 회전)"""
+        today = datetime.now().strftime('%Y%m%d')
+        
+        if self._current is None:
+            existing = [p for p in self.segments() if self._segment_day(p) == today]
+            self._current = existing[-1] if existing else self._segment_path(today, 0)
+        
+        path = self._current
+        if self._segment_day(path) != today:
+            path = self._segment_path(today, 0)
+        elif os.path.exists(path) and os.path.getsize(path) >= self.max_segment_bytes:
+            seq = int(os.path.basename(path).split('-')[2].split('.')[0])
+            path = self._segment_path(today, seq + 1)
+        
+        self._current = path
+        return path
+    
+    def _segment_path(self, day, seq):
+        return os.path.join(self.log_dir, f"events-{day}-{seq:04d}.jsonl")
@@ -0,0 +1,100 @@
+# 힌트 선생성(prefetch): N단계 힌트를 준 직후 N+1단계 힌트를 미리 만들어 두는 세션별 슬롯
+
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from config.settings import HINT_CONFIG
+
+_stats = {
+    'issued': 0,  # 선생성 요청 수
+    'hits': 0,  # 다음 힌트 클릭 시 선생성 결과를 사용한 횟수
+    'misses': 0,  # 선생성 결과가 없거나 실패해서 새로 호출한 횟수
+    'discarded': 0,  # 페르소나 변경/새 문제/자유 질문으로 버린 횟수
+    'wasted_prompt_tokens': 0,
+    'wasted_completion_tokens': 0
+}
+_stats_lock = threading.Lock()
+
+def _count(key, amount=1):
+    with _stats_lock:
+        _stats[key] += amount
+
+def get_prefetch_stats():
+    """프로세스 전체 선생성 지표 (적중률, 낭비 토큰)"""
+    with _stats_lock:
+        stats = dict(_stats)
+    issued = stats['issued']
+    stats['hit_rate'] = round(stats['hits'] / issued * 100, 1) if issued else 0
+    return stats
+
+def is_prefetch_enabled():
+    """힌트 선생성 사용 여부 (HINT_CONFIG['prefetch_enabled'])"""
+    return bool(HINT_CONFIG.get('prefetch_enabled', False))
+
+class HintPrefetcher:
+    """세션(학생) 하나의 선생성 슬롯 - 문제/페르소나/단계가 모두 같을 때만 결과를 꺼내 씀"""
+    
+    def __init__(self):
+        self.slot_key = None  # (problem_id, persona, hint_level)
+        self.future = None
+    
+    def schedule(self, problem_id, persona, hint_level, future):
+        """선생성 Future를 슬롯에 보관 (기존 슬롯은 버림)"""
+        if future is None:
+            return
+        self.discard()
+        self.slot_key = (problem_id, persona, hint_level)
+        self.future = future
+        _count('issued')
+    
+    def take(self, problem_id, persona, hint_level):
+        """
+        슬롯이 요청과 일치하면 선생성된 힌트 텍스트 반환 (진행 중이면 완료까지 대기)
+        일치하지 않거나 실패했으면 None → 호출 측에서 평소처럼 생성
+        """
+        if self.future is None:
+            return None
+        
+        if self.slot_key != (problem_id, persona, hint_level):
+            self.discard()
+            _count('misses')
+            return None
+        
+        future = self.future
+        self.slot_key = None
+        self.future = None
+        
+        try:
+            result = future.result(timeout=HINT_CONFIG.get('prefetch_wait_seconds', 30))
+        except FutureTimeoutError:
+            future.add_done_callback(_count_wasted)
+            _count('misses')
+            return None
+        
+        if not result or not result.get('text'):
+            _count('misses')
+            return None
+        
+        _count('hits')
+        return result['text']
+    
+    def discard(self):
+        """선생성 결과 폐기 (이미 쓴 토큰은 낭비 토큰으로 집계)"""
+        if self.future is None:
+            return
+        future = self.future
+        self.slot_key = None
+        self.future = None
+        _count('discarded')
+        future.add_done_callback(_count_wasted)
+
+def _count_wasted(future):
+    """폐기된 선생성 호출의 토큰을 낭비 토큰으로 집계 (완료 시점에 호출)"""
+    try:
+        result = future.result()
+    except Exception:
+        return
+    if not result:
+        return
+    usage = result.get('usage') or {}
+    _count('wasted_prompt_tokens', usage.get('prompt_tokens', 0))
+    _count('wasted_completion_tokens', usage.get('completion_tokens', 0))
@@ -0,0 +1,129 @@
+# 이미지 전처리: 업로드된 문제 이미지를 모델 전송용으로 축소/재압축하고 결과를 재사용
+
+import io
+import base64
+import threading
+from collections import OrderedDict
+from PIL import Image, ImageOps, ImageStat
+from config.settings import IMAGE_CONFIG
+from utils.response_cache import hash_bytes
+
+_prepared_images = OrderedDict()  # 업로드 해시 -> 전처리 결과
+_prepared_lock = threading.Lock()
+
+def prepare_image(image_file):
+    """
+    업로드 이미지를 전송용 payload로 변환 (같은 업로드는 해시 기준으로 재사용)
+    반환: {'digest', 'mime', 'data_url', 'detail', 'width', 'height', 'size'} 또는 None
+    """
+    try:
+        raw = image_file.getvalue()
+    except Exception:
+        return None
+    if not raw:
+        return None
+
+    digest = hash_bytes(raw)
+    with _prepared_lock:
+        prepared = _prepared_images.get(digest)
+        if prepared is not None:
+            _prepared_images.move_to_end(digest)
+            return prepared
+
+    try:
+        prepared = _process_image(raw)
+    except Exception:
+        # Pillow가 읽지 못하는 파일이면 원본 그대로 전송
+        mime = getattr(image_file, 'type', None) or 'image/png'
+        prepared = {
+            'mime': mime,
+            'data': raw,
+            'detail': 'auto',
+            'width': None,
+            'height': None
+        }
+
+    encoded = base64.b64encode(prepared.pop('data')).decode('utf-8')
+    prepared['digest'] = digest
+    prepared['data_url'] = f"data:{prepared['mime']};base64,{encoded}"
+    prepared['size'] = len(encoded)
+
+    with _prepared_lock:
+        _prepared_images[digest] = prepared
+        while len(_prepared_images) > IMAGE_CONFIG.get('memo_size', 64):
+            _prepared_images.popitem(last=False)
+    return prepared
+
+def _process_image(raw):
+    """축소 → (필요 시) 흑백 변환 → PNG/JPEG 중 알맞은 형식으로 재압축"""
+    max_dim = IMAGE_CONFIG.get('max_dimension', 1568)
+
+    img = Image.open(io.BytesIO(raw))
+    original_format = (img.format or '').upper()
+    original_mode = img.mode
+    rotated = img.getexif().get(0x0112, 1) != 1  # EXIF Orientation 태그
+    img = ImageOps.exif_transpose(img)
+
+    # 투명 배경은 흰색으로 채움 (JPEG 변환 대비)
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        rgba = img.convert('RGBA')
+        background = Image.new('RGB', rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.split()[-1])
+        img = background
+    elif img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+
+    resized = max(img.size) > max_dim
+    if resized:
+        img.thumbnail((max_dim, max_dim), Image.LANCZOS)
+
+    # 종이에 인쇄된 문제처럼 채도가 거의 없으면 흑백으로
+    if img.mode == 'RGB' and _is_near_grayscale(img):
+        img = img.convert('L')
+
+    # 색 수가 적은 스크린샷/도형은 PNG, 사진은 JPEG
+    flat_graphic = img.getcolors(maxcolors=IMAGE_CONFIG.get('png_max_colors', 256)) is not None
+
+    buffer = io.BytesIO()
+    if flat_graphic:
+        img.save(buffer, format='PNG', optimize=True)
+        mime = 'image/png'
+    else:
+        img.save(buffer, format='JPEG', quality=IMAGE_CONFIG.get('jpeg_quality', 85), optimize=True)
+        mime = 'image/jpeg'
+    data = buffer.getvalue()
+
+    # 재압축이 오히려 커지면(이미 최적화된 작은 원본) 원본을 올바른 MIME으로 전송
+    # 단, 회전/흑백·배경 변환을 거친 경우 원본은 모델에 다르게 보이므로 재압축본 사용
+    unchanged = not resized and not rotated and img.mode == original_mode
+    if unchanged and original_format in ('PNG', 'JPEG') and len(raw) <= len(data):
+        data = raw
+        mime = f"image/{original_format.lower()}"
+
+    return {
+        'mime': mime,
+        'data': data,
+        'detail': _choose_detail(img),
+        'width': img.size[0],
+        'height': img.size[1]
+    }
+
+def _is_near_grayscale(img):
+    """HSV 채도 평균이 임계값 이하이면 흑백 이미지로 간주"""
+    small = img.copy()
+    small.thumbnail((256, 256))
+    saturation = small.convert('HSV').split()[1]
+    return ImageStat.Stat(saturation).mean[0] <= IMAGE_CONFIG.get('grayscale_saturation', 12)
+
+def _choose_detail(img):
+    """
+    비전 detail 레벨 선택
+    - 설정값이 low/high면 그대로
+    - auto: 작은 이미지(짧은 문제, 도형 하나)는 low, 글자가 많은 큰 이미지는 high
+    """
+    detail = IMAGE_CONFIG.get('detail', 'auto')
+    if detail in ('low', 'high'):
+        return detail
+    if max(img.size) <= IMAGE_CONFIG.get('low_detail_max_side', 512):
+        return 'low'
+    return 'high'
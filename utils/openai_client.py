@@ -0,0 +1,76 @@
+# OpenAI 클라이언트 팩토리: 프로세스 전체에서 하나의 커넥션 풀을 공유
+
+import os
+import threading
+import httpx
+from openai import OpenAI
+from config.settings import API_CONFIG
+from utils.cassette import CassetteClient, get_cassette_mode
+from utils.telemetry import count_http_request
+
+_client = None
+_client_lock = threading.Lock()
+
+def _build_http_client():
+    """
+    keep-alive 커넥션 풀 + 타임아웃이 설정된 httpx 클라이언트 생성
+    요청이 나갈 때마다 텔레메트리 추적의 시도 횟수를 셈 (SDK 재시도 횟수 확인용)
+    """
+    timeout = httpx.Timeout(
+        API_CONFIG.get('read_timeout', 60.0),
+        connect=API_CONFIG.get('connect_timeout', 5.0)
+    )
+    limits = httpx.Limits(
+        max_connections=API_CONFIG.get('max_connections', 100),
+        max_keepalive_connections=API_CONFIG.get('max_keepalive_connections', 20),
+        keepalive_expiry=API_CONFIG.get('keepalive_expiry', 30.0)
+    )
+    return httpx.Client(timeout=timeout, limits=limits, event_hooks={'request': [count_http_request]})
+
+def get_openai_client():
+    """
+    공유 OpenAI 클라이언트 반환 (없으면 생성, 스레드 안전)
+    - 429 / 5xx / 연결 오류는 SDK가 지수 백오프로 max_retries 회까지 재시도
+    - API 키가 없으면 None (카세트 재생 모드는 키 없이 녹화본만으로 동작)
+    - 카세트 모드(CASSETTE_CONFIG['mode'])가 off가 아니면 녹화/재생 클라이언트로 감쌈
+    """
+    global _client
+
+    if _client is not None:
+        return _client
+
+    mode = get_cassette_mode()
+    api_key = API_CONFIG.get('openai_api_key') or os.getenv("OPENAI_API_KEY")
+    if not api_key and mode != 'replay':
+        return None
+
+    with _client_lock:
+        if _client is None:
+            client = None
+            if api_key:
+                client = OpenAI(
+                    api_key=api_key,
+                    base_url=API_CONFIG.get('base_url') or None,
+                    max_retries=API_CONFIG.get('max_retries', 2),
+                    http_client=_build_http_client()
+                )
+            _client = client if mode == 'off' else CassetteClient(mode, client)
+    return _client
+
+def set_openai_client(client):
+    """공유 클라이언트 교체 (벤치마크에서 대역 클라이언트를 녹화할 때)"""
+    global _client
+
+    with _client_lock:
+        if _client is not None and _client is not client:
+            _client.close()
+        _client = client
+
+def reset_openai_client():
+    """공유 클라이언트 닫기 (설정 변경 후 재생성이 필요할 때)"""
+    global _client
+
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
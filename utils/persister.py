@@ -0,0 +1,128 @@
+# 지연 저장(write-behind): 스크립트 실행 중에는 변경분만 표시해 두고, 실제 디스크 쓰기는 백그라운드 스레드가 모아서 처리
+
+import atexit
+import threading
+from config.settings import LEARNING_CONFIG
+from utils.storage import get_storage_backend
+
+class WriteBehindPersister:
+    """
+    학생별 변경분을 모아 두었다가 한 번에 저장
+    - mark_dirty: 스크립트 스레드에서 만든 스냅샷을 등록 (디스크 I/O 없음)
+      프로필/토픽 통계는 마지막 값만 남기고, 새 대화 메시지는 이어 붙임
+    - 백그라운드 스레드가 interval_seconds마다 flush
+    - flush_now: 문제 해결 같은 중요한 시점에 바로 저장 요청
+    - 프로세스 종료 시(atexit) 남은 변경분 저장
+    """
+
+    def __init__(self, backend=None, interval_seconds=None):
+        self.backend = backend or get_storage_backend()
+        if interval_seconds is None:
+            interval_seconds = LEARNING_CONFIG.get('auto_save_interval', 5) * 60
+        self.interval_seconds = interval_seconds
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def mark_dirty(self, student_id, profile=None, messages=None, problem_id=None, topic_stats=None):
+        """변경분 등록 (같은 학생의 이전 변경분과 합침)"""
+        with self._lock:
+            entry = self._pending.setdefault(student_id, {'profile': None, 'messages': [], 'topic_stats': None})
+            if profile is not None:
+                entry['profile'] = profile
+            if messages:
+                entry['messages'].append((list(messages), problem_id))
+            if topic_stats:
+                entry['topic_stats'] = topic_stats
+        self._ensure_thread()
+
+    def has_pending(self):
+        with self._lock:
+            return bool(self._pending)
+
+    def flush_now(self, wait=False):
+        """
+        즉시 저장 요청
+        - wait=False: 백그라운드 스레드를 깨우기만 함 (화면을 막지 않음)
+        - wait=True: 호출한 스레드에서 바로 저장
+        """
+        if wait:
+            return self.flush()
+        self._ensure_thread()
+        self._wake.set()
+        return True
+
+    def flush(self):
+        """대기 중인 변경분을 모두 저장, 실패한 학생의 변경분은 다음 flush 때 다시 시도"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+
+            ok = True
+            for student_id, entry in pending.items():
+                try:
+                    self._write_entry(student_id, entry)
+                except Exception as e:
+                    print(f"세션 저장 실패 ({student_id}): {str(e)}")
+                    self._requeue(student_id, entry)
+                    ok = False
+            return ok
+
+    def _write_entry(self, student_id, entry):
+        if entry['profile'] is not None:
+            self.backend.save_profile(student_id, entry['profile'])
+            entry['profile'] = None
+        while entry['messages']:
+            messages, problem_id = entry['messages'][0]
+            self.backend.append_messages(student_id, messages, problem_id)
+            entry['messages'].pop(0)
+        if entry['topic_stats']:
+            self.backend.save_topic_stats(student_id, entry['topic_stats'])
+            entry['topic_stats'] = None
+
+    def _requeue(self, student_id, entry):
+        """저장 못 한 부분을 그 사이 새로 들어온 변경분 앞에 다시 넣음 (메시지 순서 유지)"""
+        with self._lock:
+            newer = self._pending.get(student_id)
+            if newer:
+                entry['profile'] = newer['profile'] or entry['profile']
+                entry['messages'].extend(newer['messages'])
+                entry['topic_stats'] = newer['topic_stats'] or entry['topic_stats']
+            self._pending[student_id] = entry
+
+    def _ensure_thread(self):
+        if self._thread is not None or self._stopped:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='tutor-persister', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.interval_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def shutdown(self):
+        """백그라운드 스레드를 멈추고 남은 변경분 저장"""
+        self._stopped = True
+        self._wake.set()
+        self.flush()
+
+_persister = None
+_persister_lock = threading.Lock()
+
+def get_persister():
+    """프로세스 공용 지연 저장기 반환 (종료 시 자동 flush)"""
+    global _persister
+
+    if _persister is None:
+        with _persister_lock:
+            if _persister is None:
+                _persister = WriteBehindPersister()
+                atexit.register(_persister.shutdown)
+    return _persister
@@ -0,0 +1,147 @@
+# 문제 분석기: 업로드된 문제 이미지를 한 번만 텍스트로 전사하고, 이후 요청은 전사본을 사용
+
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from config.settings import API_CONFIG, ANALYSIS_CONFIG
+from utils.background import submit_background
+from utils.image_processor import prepare_image
+from utils.openai_client import get_openai_client
+from utils.prompt_manager import get_prompt_manager
+from utils.usage_tracker import record_usage
+from utils.telemetry import request_trace
+
+_analyses = OrderedDict()  # 문제 이미지 해시 -> Future(분석 결과 dict 또는 None)
+_analyses_lock = threading.Lock()
+
+def start_problem_analysis(uploaded_image):
+    """
+    문제 분석을 백그라운드로 시작하고 문제 ID(이미지 해시)를 반환
+    같은 이미지는 이미 진행 중/완료된 분석을 재사용
+    """
+    prepared = prepare_image(uploaded_image)
+    if not prepared:
+        return None
+
+    problem_id = prepared['digest']
+    if not ANALYSIS_CONFIG.get('enabled', True):
+        return problem_id
+
+    with _analyses_lock:
+        if problem_id in _analyses:
+            _analyses.move_to_end(problem_id)
+            return problem_id
+        _analyses[problem_id] = submit_background(_analyze_problem, prepared)
+        while len(_analyses) > ANALYSIS_CONFIG.get('memo_size', 128):
+            _analyses.popitem(last=False)
+    return problem_id
+
+def get_problem_analysis(problem_id, wait_seconds=None):
+    """
+    분석 결과 반환
+    - 아직 진행 중이면 최대 wait_seconds 만큼만 기다리고, 그래도 안 끝나면 None
+    - 분석 실패 / 그림이 꼭 필요한 문제도 None (호출 측은 이미지를 그대로 전송)
+    """
+    if not problem_id:
+        return None
+
+    with _analyses_lock:
+        future = _analyses.get(problem_id)
+    if future is None:
+        return None
+
+    if wait_seconds is None:
+        wait_seconds = ANALYSIS_CONFIG.get('wait_seconds', 3)
+
+    try:
+        analysis = future.result(timeout=wait_seconds)
+    except FutureTimeoutError:
+        return None
+    except Exception:
+        return None
+
+    if not analysis or analysis.get('figure_required'):
+        return None
+    return analysis
+
+def format_problem_analysis(analysis):
+    """전사 결과를 모델에 보낼 문제 설명 텍스트로 변환"""
+    lines = ["[문제 (이미지에서 옮겨 적은 내용)]", analysis['problem_text']]
+
+    if analysis.get('latex'):
+        lines.append("\n[주요 수식]")
+        lines.extend(f"- {expr}" for expr in analysis['latex'])
+
+    if analysis.get('conditions'):
+        lines.append("\n[주어진 조건]")
+        lines.extend(f"- {cond}" for cond in analysis['conditions'])
+
+    if analysis.get('choices'):
+        lines.append("\n[보기]")
+        lines.extend(analysis['choices'])
+
+    return "\n".join(lines)
+
+def _analyze_problem(prepared):
+    """(백그라운드) 이미지 → 구조화된 문제 전사본"""
+    client = get_openai_client()
+    if client is None:
+        return None
+
+    with request_trace("analysis") as trace:
+        try:
+            with trace.span('network'):
+                response = client.chat.completions.create(
+                    model=API_CONFIG['model_name'],
+                    messages=[
+                        {"role": "system", "content": get_prompt_manager().get_problem_analysis_prompt()},
+                        {"role": "user", "content": [{
+                            "type": "image_url",
+                            "image_url": {"url": prepared['data_url'], "detail": "high"}
+                        }]}
+                    ],
+                    temperature=0,
+                    max_tokens=ANALYSIS_CONFIG.get('max_tokens', 800),
+                    response_format={"type": "json_object"}
+                )
+            record_usage("analysis", response.usage)
+            with trace.span('parsing'):
+                analysis = parse_problem_analysis(response.choices[0].message.content)
+        except Exception as e:
+            trace.fail(e)
+            print(f"문제 분석 실패: {str(e)}")
+            return None
+
+    if analysis:
+        analysis['problem_id'] = prepared['digest']
+    return analysis
+
+def parse_problem_analysis(raw_text):
+    """모델 JSON 응답 검증 및 정리 (필수 항목이 없으면 None)"""
+    try:
+        data = json.loads(raw_text or "")
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    problem_text = str(data.get('problem_text') or "").strip()
+    if not problem_text:
+        return None
+
+    def _as_list(value):
+        if isinstance(value, list):
+            return [str(v).strip() for v in value if str(v).strip()]
+        if value:
+            return [str(value).strip()]
+        return []
+
+    return {
+        'problem_text': problem_text,
+        'latex': _as_list(data.get('latex')),
+        'conditions': _as_list(data.get('conditions')),
+        'choices': _as_list(data.get('choices')),
+        'topic': str(data.get('topic') or "").strip() or None,
+        'figure_required': bool(data.get('figure_required', False))
+    }
@@ -0,0 +1,192 @@
+# rerun 프로파일러 (디버그 모드 전용): 실행마다 주요 화면 컴포넌트별 시간, rerun 횟수와 원인(호출 위치)을 기록
+# - 앱 전체 실행: app.main()을 profile_rerun()으로 감쌈
+# - 프래그먼트 단독 실행: utils/rerun.fragment가 profile_fragment()로 감쌈
+# - 컴포넌트: @profile_component("이름")
+# 기록은 세션별로 st.session_state.rerun_profile에 남고, 사이드바 디버그 영역에 표로 표시됨
+
+import os
+import sys
+import time
+import cProfile
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+import streamlit as st
+from config.settings import DEBUG_CONFIG, PATHS, PROFILER_CONFIG
+
+TRIGGER_SESSION_START = "세션 시작"
+TRIGGER_WIDGET = "위젯 입력"
+
+_local = threading.local()  # 스크립트 스레드에서 진행 중인 실행
+
+def is_profiling_enabled():
+    return bool(PROFILER_CONFIG.get('enabled', True)
+                and (DEBUG_CONFIG.get('debug_mode') or PROFILER_CONFIG.get('always')))
+
+def get_profile_state():
+    """세션별 프로파일 기록 {'reruns', 'fragment_runs', 'triggers', 'pending_trigger', 'history'}"""
+    state = st.session_state.get('rerun_profile')
+    if state is None:
+        state = st.session_state.rerun_profile = {
+            'reruns': 0,
+            'fragment_runs': 0,
+            'triggers': {},
+            'pending_trigger': None,
+            'history': deque(maxlen=PROFILER_CONFIG.get('history_size', 50))
+        }
+    return state
+
+def note_rerun_trigger(scope, depth=2):
+    """
+    (utils/rerun.request_rerun에서 호출) rerun을 요청한 위치를 기록 → 다음 실행의 원인으로 표시
+    depth: 호출 위치까지의 프레임 수 (request_rerun을 부른 쪽)
+    """
+    if not is_profiling_enabled():
+        return
+    frame = sys._getframe(depth)
+    code = frame.f_code
+    get_profile_state()['pending_trigger'] = (
+        f"{os.path.basename(code.co_filename)}:{frame.f_lineno} {code.co_name} ({scope})"
+    )
+
+def _start_cprofile():
+    if not PROFILER_CONFIG.get('cprofile'):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return None  # 다른 프로파일러가 이미 동작 중
+    return profiler
+
+def _dump_cprofile(profiler, run):
+    """느린 실행의 cProfile 결과를 logs_dir/profiles/에 저장, 오래된 덤프 정리"""
+    dump_dir = os.path.join(PATHS['logs_dir'], PROFILER_CONFIG.get('dump_subdir', 'profiles'))
+    try:
+        os.makedirs(dump_dir, exist_ok=True)
+        path = os.path.join(dump_dir, f"rerun-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{run['kind']}.prof")
+        profiler.dump_stats(path)
+        dumps = sorted(os.path.join(dump_dir, name) for name in os.listdir(dump_dir) if name.endswith('.prof'))
+        for old_path in dumps[:-PROFILER_CONFIG.get('max_dumps', 20)]:
+            os.remove(old_path)
+        return path
+    except OSError as e:
+        print(f"cProfile 덤프 저장 실패: {str(e)}")
+        return None
+
+@contextmanager
+def _profiled_run(kind, name):
+    """실행 1회 측정 (st.rerun()의 제어 흐름 예외로 중간에 끝나도 기록)"""
+    state = get_profile_state()
+    trigger = state['pending_trigger']
+    if trigger is None:
+        trigger = TRIGGER_SESSION_START if not state['history'] and not state['reruns'] else TRIGGER_WIDGET
+    state['pending_trigger'] = None
+
+    run = {
+        'kind': kind,
+        'name': name,
+        'started_at': datetime.now().strftime('%H:%M:%S'),
+        'trigger': trigger,
+        'components': {},
+        'total_ms': None,
+        'slow': False,
+        'dump': None
+    }
+    profiler = _start_cprofile()
+    _local.run = run
+    start = time.perf_counter()
+    try:
+        yield run
+    finally:
+        run['total_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        _local.run = None
+        run['slow'] = run['total_ms'] >= PROFILER_CONFIG.get('slow_rerun_ms', 500)
+        if profiler is not None:
+            profiler.disable()
+            if run['slow']:
+                run['dump'] = _dump_cprofile(profiler, run)
+
+        state['reruns' if kind == 'app' else 'fragment_runs'] += 1
+        state['triggers'][trigger] = state['triggers'].get(trigger, 0) + 1
+        state['history'].append(run)
+
+@contextmanager
+def profile_rerun():
+    """앱 전체 실행 1회 측정 (디버그 모드가 아니면 아무것도 안 함)"""
+    if not is_profiling_enabled():
+        yield None
+        return
+    with _profiled_run('app', 'main') as run:
+        yield run
+
+def profile_fragment(func):
+    """
+    프래그먼트 함수 래퍼: 프래그먼트만 단독으로 다시 실행될 때 그 실행을 따로 기록
+    (앱 전체 실행 중에 호출되면 컴포넌트 시간으로만 기록)
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not is_profiling_enabled():
+            return func(*args, **kwargs)
+        if getattr(_local, 'run', None) is not None:
+            return _timed_component(func.__name__, func, *args, **kwargs)
+        with _profiled_run('fragment', func.__name__):
+            return _timed_component(func.__name__, func, *args, **kwargs)
+    return wrapper
+
+def _timed_component(name, func, *args, **kwargs):
+    run = getattr(_local, 'run', None)
+    if run is None:
+        return func(*args, **kwargs)
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        run['components'][name] = round(run['components'].get(name, 0.0) + elapsed, 1)
+
+def profile_component(name):
+    """컴포넌트 함수 데코레이터: 진행 중인 실행이 있으면 걸린 시간을 이름별로 합산"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return _timed_component(name, func, *args, **kwargs)
+        return wrapper
+    return decorate
+
+def summarize_profile(state=None):
+    """
+    사이드바 표용 요약
+    반환: {'reruns', 'fragment_runs', 'last': 마지막 실행 또는 None,
+           'components': [{'컴포넌트', '마지막(ms)', '평균(ms)', '최대(ms)', '실행 수'}],
+           'triggers': [(원인, 횟수), ...], 'slow': [느린 실행, ...]}
+    """
+    state = state or get_profile_state()
+    history = list(state['history'])
+
+    timings = {}
+    for run in history:
+        for name, ms in run['components'].items():
+            timings.setdefault(name, []).append(ms)
+
+    last = history[-1] if history else None
+    components = [{
+        '컴포넌트': name,
+        '마지막(ms)': (last or {}).get('components', {}).get(name),
+        '평균(ms)': round(sum(values) / len(values), 1),
+        '최대(ms)': max(values),
+        '실행 수': len(values)
+    } for name, values in timings.items()]
+    components.sort(key=lambda row: row['평균(ms)'], reverse=True)
+
+    return {
+        'reruns': state['reruns'],
+        'fragment_runs': state['fragment_runs'],
+        'last': last,
+        'components': components,
+        'triggers': sorted(state['triggers'].items(), key=lambda item: item[1], reverse=True),
+        'slow': [run for run in history if run['slow']]
+    }
@@ -2,172 +2,77 @@
 
 import yaml
 import os
+import threading
 from typing import Dict, Any
-from config.settings import get_config
+from config.settings import get_config, PATHS
+from utils.prompt_registry import get_prompt_registry
 
 class PromptManager:
-    """프롬프트 관리 클래스"""
+    """프롬프트 관리 클래스 (템플릿은 prompts/*.yaml, 레지스트리가 캐시/핫 리로드 담당)"""
     
     def __init__(self):
-        self.prompts_dir = "prompts"
-        self.base_prompt = self._load_base_prompt()
-        self.persona_prompts = self._load_persona_prompts()
+        self.prompts_dir = PATHS['prompts_dir']
+        self.registry = get_prompt_registry()
     
-    def _load_base_prompt(self):
-        """기본 프롬프트 로드 (수식 렌더링 규칙 추가됨)"""
-        base_prompt = """
-        너는 "학생의 사고력을 도와주는 AI 수학 과외 선생님"이야.
-        학생이 업로드한 이미지와 입력한 텍스트, 그리고 힌트 단계(hint_step)에 맞춰서
-        **해당 단계에 해당하는 힌트 하나만** 제공해줘.
-        
-        ❗ 중요한 규칙:
-        - 절대로 정답을 직접 알려주지 마.
-        - 1단계면 1단계 힌트만, 2단계면 2단계 힌트만, 3단계면 3단계 힌트만 제공해.
-        - 여러 단계를 동시에 설명하지 마.
-        - 학생이 어려워하는 부분을 공감해주면서 대화하듯이 알려줘.
-        
-        🔢 수식 표기 규칙 (매우 중요!):
-        - 모든 수학 공식, 변수, 숫자 수식은 반드시 **LaTeX 포맷**을 사용해라.
-        - 줄글 중간에 나오는 수식(인라인)은 달러 기호 한 개($)로 감싸라. 
-          (예: $y = ax + b$, $x^2$ 등)
-        - 독립된 줄에 쓰는 복잡한 수식은 달러 기호 두 개($$)로 감싸라.
-          (예: $$ \frac{-b \pm \sqrt{b^2 - 4ac}}{2a} $$)
-        - 곱셈 기호는 x 대신 $\times$ 또는 $\cdot$을 사용해라.
-        - 텍스트로 '루트'라고 쓰지 말고 $\sqrt{x}$ 처럼 표기해라.
-        
-        📘 힌트 단계별 가이드라인:
-        - 1단계: 문제 접근법, 그림/조건에서 무엇을 먼저 보면 좋을지 가벼운 방향 제시
-        - 2단계: 핵심 개념·정의·특징 등 문제에서 중요한 논리 요소만 콕 짚기
-        - 3단계: 식 세우는 방식, 조건을 활용하는 방법 등 실제 풀이 직전 단계까지 안내
-        """
-        
-        return base_prompt
+    @property
+    def base_prompt(self):
+        """기본 프롬프트 (prompts/base_tutor.yaml, 수식 렌더링 규칙 포함)"""
+        return self.registry.render('base_tutor')
     
-    def _load_persona_prompts(self):
-        """페르소나별 프롬프트 로드"""
-        personas = {
-            'friendly': self._get_friendly_prompt(),
-            'strict': self._get_strict_prompt(),
-            'neutral': self._get_neutral_prompt()
-        }
-        return personas
-    
-    def _get_friendly_prompt(self):
-        """친근한 선생님 프롬프트 - 따뜻/격려 반말 버전"""
-        return """
-        [페르소나: 친근한 선생님(따뜻한 멘토 스타일)]
-        - 말투는 존댓말! 부드럽고 친근하게.
-        - 항상 따뜻하게 다독여줌: "괜찮아~", "실수해도 돼!", "천천히 해보자 😊"
-        - 학생이 헤매면: 부담 없이 방향만 잡아주는 힌트 제공.
-        - 대답할 때 긍정 리액션 적극 사용: "오!!", "우와 잘했다!!", "좋은데?", "센스있어 👍"
-        - 이모지는 편안한 분위기 위해 자연스럽게 사용 (😊✨👍💡💪)
-        - 틀린 경우: 부드럽게 격려 + “어디서 헷갈렸는지 같이 보자”
-        - 맞춘 경우: "봐봐! 역시 너라니까 😄 최고야!!"
-
-        [대화 스타일 규칙]
-        1) 부드러운 존댓말 + 따뜻한 공감
-        2) 학생 실수 = 성장 과정으로 인정 → 절대 비판 X
-        3) 힌트는 부담스럽지 않게 ‘한 단계씩’ 제공
-        4) 학생의 시도를 항상 먼저 칭찬하고 시작
-        5) 정답에 가까워질수록 리액션이 커짐 (자신감 상승 유도)
-
-        [예시 톤]
-        - "오~ 진짜 좋은 생각이야! 👍 조금만 다르게 보면 더 쉬울 거야 ✨"
-        - "괜찮아, 여기서 많이들 헷갈려 😊 우리가 같이 천천히 보자~"
-        - "맞았어!! 와 너무 잘한다 😄💪"
-        - "흠… 여기서 살짝 놓친 부분이 있는데, 그것만 잡으면 완벽해!"
-        """
-        
-    def _get_strict_prompt(self):
-        """대치동 호랭이 스타일의 엄격한 선생님 프롬프트 (반말 버전)"""
-        return """
-        [페르소나: 대치동 호랭이 강사]
-    - 말투는 무조건 반말. 빠른 템포 + 단호함 필수.
-    - 문장은 짧게, 직설적으로. 불필요한 말 금지.
-    - 끊어 말하기. (예: "잠깐!", "다시 봐!", "여기 집중!", "아니!", "거기 아냐!")
-    - 학생이 틀리면 → 바로 지적 + 근거 제시 + 다시 생각하게 만들기.
-    - 학생이 헤매면 → 핵심만 딱 짚고, 절대 정답은 주지 않음.
-    - 학생이 맞추면 → "거봐! 내가 뭐랬어!" + 강한 칭찬.
-    - 항상 ‘왜 이게 중요한지’를 논리적으로 요약해서 말함.
-    - 절대 존댓말 금지.
-    - 느낌 강조할 때만 이모지 1개 사용 가능. (🔥, 👊, 💥 정도)
-
-    [대화 톤 규칙]
-    1) 호통치지만 무례하진 않음. 카리스마 + 전문성 유지.
-    2) 문장 첫 단어 강하게 시작: "잠깐!", "봐봐.", "아니.", "그게 아니야.", "이 부분 중요해."
-    3) 학생이 틀렸을 때:  
-        - "내가 뭐라 했어?"  
-        - "여기서부터 다시 봐."  
-        - "이 기준 놓치면 답 안 나와."
-    4) 학생이 헤매면:  
-        - "지금 너가 놓친 게 뭐냐면…"  
-        - "핵심은 여기야. 이거 제대로 못 보면 계속 틀린다."
-    5) 학생이 맞추면:  
-        - "거봐! 하니까 되잖아! 👊"  
-        - "좋아. 이 감각 유지해."
-
-    [출력 스타일]
-    - 항상 1~2문장씩 끊어서 말해.  
-    - 과한 수식 없이 핵심 메시지 중심.  
-    - ‘결론 → 이유 → 다음 행동 지시’ 구조 유지.
-    """
-    
-    def _get_neutral_prompt(self):
-        """중립적·분석형 선생님 프롬프트"""
-        return """
-        [페르소나: 중립적 선생님(논리형 분석가 스타일)]
-        - 말투는 차분한 반말 또는 반존대 느낌. 감정 기복 없음.
-        - 설명은 최대한 간결하고 논리적. 불필요한 감정 표현 금지.
-        - 문제를 구조적으로 분해하여 단계적 접근 방식 제공.
-        - '핵심 정보 → 조건 분석 → 해결 방향' 순으로 정리해줌.
-        - 사실 기반 설명만 제공. 개인 감정, 칭찬, 비유 등은 최소화.
-        - 힌트는 명확한 방향 제시만 하고 정답 직접 언급 금지.
-
-        [대화 스타일 규칙]
-        1) 감정 없는 중립 톤 유지 ("좋아요", "대단해요" 등 감정 표현 금지)
-        2) 문제를 논리적으로 해석하고 핵심 정보만 전달
-        3) 모든 설명은 구조화: 요약 → 단계적 힌트 → 핵심 개념
-        4) 학생이 틀려도 감정적 반응 없이 '원인 분석 → 수정 방향' 제시
-        5) 이모지 사용 금지
-
-        [예시 톤]
-        - "이 문제는 조건을 먼저 정리하면 해결 가능해. 핵심은 함수의 증가 여부야."
-        - "현재 단계에서 놓친 부분은 여기. 정의를 다시 적용해보면 방향이 보일 거야."
-        - "불필요한 정보가 포함되어 있으니 조건을 최소 단위로 압축하자."
-        - "다음 단계로 진행하기 전에, 이 개념을 정확히 이해했는지 확인해봐."
-        """
+    @property
+    def persona_prompts(self):
+        """페르소나별 프롬프트 (prompts/persona_*.yaml)"""
+        return self.registry.get_persona_prompts()
     
     def get_prompt(self, persona='friendly', hint_level=1, context=None):
         """완성된 프롬프트 반환"""
         
-        # 기본 프롬프트
-        prompt = self.base_prompt
+        # 기본 + 페르소나 + 힌트 레벨 강조 (미리 조립된 고정 부분)
+        prompt = self.registry.get_prefix('hint', persona, hint_level)
         
-        # 페르소나 프롬프트 추가
-        if persona in self.persona_prompts:
-            prompt += "\n\n" + self.persona_prompts[persona]
+        # 컨텍스트 추가
+        prompt += self._format_context(context)
         
-        # 힌트 레벨 강조
-        prompt += f"\n\n현재 요청된 힌트 레벨: {hint_level}단계"
-        prompt += f"\n**반드시 {hint_level}단계 힌트만 제공하세요!**"
+        return prompt
+    
+    def get_hint_ladder_prompt(self, persona='friendly', context=None):
+        """1~3단계 힌트를 한 번의 호출로 만드는 프롬프트 (JSON 출력)"""
         
-        # 컨텍스트 추가
-        if context:
-            prompt += "\n\n[대화 컨텍스트]"
-            if 'chat_history' in context:
-                recent_messages = context['chat_history'][-5:]  # 최근 5개 메시지
-                for msg in recent_messages:
-                    role, content, _ = msg
-                    prompt += f"\n{role}: {content}"
-            
-            if 'student_name' in context:
-                prompt += f"\n\n학생 이름: {context['student_name']}"
-            
-            if 'grade' in context:
-                prompt += f"\n학년: {context['grade']}"
+        prompt = self.registry.get_prefix('ladder', persona)
+        
+        prompt += self._format_context(context)
         
         return prompt
     
+    def _format_context(self, context):
+        """
+        학생 정보(이름, 학년) 블록
+        대화 기록은 여기 넣지 않고 ai_handler가 메시지로 보냄 (같은 턴을 두 번 보내지 않도록)
+        """
+        if not context:
+            return ""
+        
+        block = "\n\n[학생 정보]"
+        if 'student_name' in context:
+            block += f"\n학생 이름: {context['student_name']}"
+        
+        if 'grade' in context:
+            block += f"\n학년: {context['grade']}"
+        
+        return block
+    
+    def get_problem_analysis_prompt(self):
+        """문제 이미지 전사 프롬프트 (문제당 한 번만 사용)"""
+        return self.registry.render('problem_analysis')
+    
+    def get_solution_review_prompt(self):
+        """풀이 리뷰 시스템 프롬프트 (고정 부분)"""
+        return self.registry.render('solution_review')
+    
+    def get_solution_review_request(self, conversation):
+        """풀이 리뷰 요청 (대화 기록)"""
+        return self.registry.render('solution_review_request', conversation=conversation)
+    
     def get_concept_explanation_prompt(self, concept):
         """개념 설명 프롬프트"""
         return f"""
@@ -226,47 +131,14 @@ class PromptManager:
 
         topics_str = ", ".join(topics_list) if topics_list else ""
 
-        base = f"""
-        너는 '학생의 사고력을 도와주는 AI 수학 과외 선생님'이야.
-        지금 학생이 문제를 충분히 생각한 뒤 **최종 정답**으로 `{student_answer}` 를 입력했어.
-
-        1. 업로드된 문제(이미지)와 지금까지의 대화를 바탕으로, 너 스스로 이 문제의 정답을 계산해.
-        2. 학생이 입력한 값 `{student_answer}` 이 네가 구한 정답과 같은지 비교해.
-        3. 이 문제가 어떤 단원인지도 분류해.
+        # 고정 부분(판정 규칙 + 페르소나)을 앞에, 요청마다 바뀌는 값(토픽 후보, 학생 답, 학생 정보)은 뒤에
+        base = self.registry.get_prefix('answer', persona)
+        base += "\n\n" + self.registry.render(
+            'final_answer_request', topics=topics_str, student_answer=student_answer
+        )
 
-        출력 규칙 (아주 중요):
-
-        [정답 판정]
-        - 학생의 답이 완전히 맞으면, **첫 문장을 반드시 정확히 `정답입니다.` 로 시작**해.
-        - 학생의 답이 틀렸으면, **첫 문장을 반드시 정확히 `아쉽지만 아직 정답은 아닙니다.` 로 시작**해.
-        - 그 뒤에는 2~3문장 정도로 왜 그런지, 어떤 부분을 다시 생각하면 좋을지 힌트만 줘.
-        - **정답 숫자 자체는 말하지 마.** (학생이 스스로 다시 생각해보도록 유도)
-
-        [단원(topic) 분류]
-        - 이 문제는 아래 토픽 중 하나에 속한다고 가정하자:
-          {topics_str}
-        - 위 목록 중에서 **가장 알맞은 토픽 이름 1개만** 선택해.
-        - 그리고 답변 맨 마지막 줄에 아래 형식으로 정확히 한 줄만 추가해:
-          ##TOPIC:선택한토픽이름
-        - 이 줄은 시스템이 내부적으로만 사용할 거라, 학생에게 따로 설명할 필요는 없어.
-        """
-
-        # 페르소나 스타일 추가
-        if persona in self.persona_prompts:
-            base += "\n\n" + self.persona_prompts[persona]
-
-        # 컨텍스트(대화, 학년, 이름) 추가
-        if context:
-            base += "\n\n[대화 컨텍스트]"
-            if 'chat_history' in context:
-                recent_messages = context['chat_history'][-5:]
-                for msg in recent_messages:
-                    role, content, _ = msg
-                    base += f"\n{role}: {content}"
-            if 'student_name' in context:
-                base += f"\n\n학생 이름: {context['student_name']}"
-            if 'grade' in context:
-                base += f"\n학년: {context['grade']}"
+        # 컨텍스트(학년, 이름) 추가
+        base += self._format_context(context)
 
         return base
 
@@ -319,7 +191,29 @@ class PromptManager:
             with open(file_path, 'w', encoding='utf-8') as f:
                 yaml.dump(prompt_data, f, allow_unicode=True)
             
+            # 저장한 프롬프트를 바로 읽을 수 있도록 레지스트리 갱신
+            self.registry.refresh(force=True)
             return True
         except Exception as e:
             print(f"프롬프트 저장 실패: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+    
+    def get_custom_prompt(self, name):
+        """save_custom_prompt로 저장한 프롬프트 반환 (없으면 None)"""
+        data = self.registry.get(name)
+        if not data or data.get('type') != 'custom':
+            return None
+        return data['template']
+
+_prompt_manager = None
+_prompt_manager_lock = threading.Lock()
+
+def get_prompt_manager():
+    """프로세스 공용 PromptManager 반환 (요청마다 새로 만들지 않음)"""
+    global _prompt_manager
+    
+    if _prompt_manager is None:
+        with _prompt_manager_lock:
+            if _prompt_manager is None:
+                _prompt_manager = PromptManager()
+    return _prompt_manager
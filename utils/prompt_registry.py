@@ -0,0 +1,174 @@
+# 프롬프트 레지스트리: prompts/*.yaml 템플릿을 한 번 읽어 캐시하고, 파일이 바뀌었을 때만 다시 읽음
+
+import os
+import glob
+import time
+import threading
+import yaml
+from config.settings import PATHS, PROMPT_CONFIG
+
+HINT_LEVELS = (1, 2, 3)
+
+class PromptRegistry:
+    """
+    파일 기반 프롬프트 레지스트리 (프로세스당 하나, 스레드 안전)
+    - 템플릿 이름은 YAML의 name 필드 (없으면 파일 이름)
+    - reload_check_seconds 마다 폴더를 훑어서 mtime이 바뀐 파일만 다시 읽음
+    - 페르소나 × 힌트 단계 × 모드별 고정 프롬프트(prefix)를 미리 조립해 둠
+    """
+    
+    def __init__(self, prompts_dir):
+        self.prompts_dir = prompts_dir
+        self.version = 0  # 템플릿이 바뀔 때마다 증가
+        
+        self._templates = {}  # name -> YAML 데이터
+        self._mtimes = {}  # 파일 경로 -> (mtime, name)
+        self._prefixes = {}  # (mode, persona, hint_level) -> 미리 조립한 프롬프트
+        self._lock = threading.RLock()
+        self._last_check = 0.0
+        
+        self.refresh(force=True)
+    
+    def refresh(self, force=False):
+        """변경된 파일만 다시 읽기 (변경이 있으면 True)"""
+        now = time.monotonic()
+        if not force and now - self._last_check < PROMPT_CONFIG.get('reload_check_seconds', 2):
+            return False
+        
+        with self._lock:
+            self._last_check = now
+            changed = False
+            
+            paths = set(glob.glob(os.path.join(self.prompts_dir, '*.yaml')))
+            
+            # 삭제된 파일
+            for path in list(self._mtimes):
+                if path not in paths:
+                    _, name = self._mtimes.pop(path)
+                    self._templates.pop(name, None)
+                    changed = True
+            
+            # 새로 생기거나 수정된 파일
+            for path in paths:
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    continue
+                known = self._mtimes.get(path)
+                if known and known[0] == mtime:
+                    continue
+                
+                data = self._read_file(path)
+                if data is None:
+                    continue
+                name = data.get('name') or os.path.splitext(os.path.basename(path))[0]
+                if known and known[1] != name:
+                    self._templates.pop(known[1], None)
+                self._templates[name] = data
+                self._mtimes[path] = (mtime, name)
+                changed = True
+            
+            if changed:
+                self.version += 1
+                self._prerender()
+            return changed
+    
+    def _read_file(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = yaml.safe_load(f)
+        except (OSError, yaml.YAMLError) as e:
+            print(f"프롬프트 로드 실패 ({path}): {str(e)}")
+            return None
+        if not isinstance(data, dict) or not isinstance(data.get('template'), str):
+            return None
+        return data
+    
+    def get(self, name):
+        """템플릿 YAML 데이터 반환 (없으면 None)"""
+        self.refresh()
+        with self._lock:
+            return self._templates.get(name)
+    
+    def render(self, name, **variables):
+        """
+        템플릿 문자열 반환
+        input_variables가 선언된 템플릿만 format으로 채움 (JSON 예시의 중괄호 보호)
+        """
+        data = self.get(name)
+        if data is None:
+            return ""
+        template = data['template'].rstrip()
+        if data.get('input_variables'):
+            return template.format(**variables)
+        return template
+    
+    def get_persona_prompts(self):
+        """{persona: 페르소나 프롬프트}"""
+        self.refresh()
+        with self._lock:
+            return {
+                data['persona']: data['template'].rstrip()
+                for data in self._templates.values()
+                if data.get('type') == 'persona' and data.get('persona')
+            }
+    
+    def get_templates(self, template_type):
+        """type이 일치하는 템플릿들 {name: YAML 데이터}"""
+        self.refresh()
+        with self._lock:
+            return {
+                name: data for name, data in self._templates.items()
+                if data.get('type') == template_type
+            }
+    
+    def get_prefix(self, mode, persona, hint_level=None):
+        """미리 조립된 고정 프롬프트 반환 (요청마다 바뀌는 부분은 호출 측에서 뒤에 붙임)"""
+        self.refresh()
+        key = (mode, persona, hint_level)
+        with self._lock:
+            prefix = self._prefixes.get(key)
+            if prefix is None:
+                # 미리 조립하지 않은 조합 (예: 4단계 요청)
+                prefix = self._build_prefix(mode, persona, hint_level)
+                self._prefixes[key] = prefix
+            return prefix
+    
+    def _prerender(self):
+        """페르소나 × 힌트 단계 × 모드 조합을 전부 미리 조립"""
+        self._prefixes = {}
+        personas = [None] + list(self.get_persona_prompts())
+        for persona in personas:
+            for level in HINT_LEVELS:
+                self._prefixes[('hint', persona, level)] = self._build_prefix('hint', persona, level)
+            self._prefixes[('ladder', persona, None)] = self._build_prefix('ladder', persona, None)
+            self._prefixes[('answer', persona, None)] = self._build_prefix('answer', persona, None)
+    
+    def _build_prefix(self, mode, persona, hint_level):
+        """
+        고정 프롬프트 조립: [공통 지시문 + 페르소나] 가 모든 요청에서 바이트 단위로 같은 맨 앞부분이 되도록
+        (OpenAI 프롬프트 프리픽스 캐시 적중용, 요청마다 바뀌는 값은 절대 이 안에 넣지 않음)
+        """
+        with self._lock:
+            persona_prompt = self.get_persona_prompts().get(persona)
+            prompt = self.render('final_answer' if mode == 'answer' else 'base_tutor')
+            if persona_prompt:
+                prompt += "\n\n" + persona_prompt
+            if mode == 'ladder':
+                prompt += "\n\n" + self.render('hint_ladder')
+            elif mode == 'hint':
+                prompt += "\n\n" + self.render('hint_level', hint_level=hint_level)
+            return prompt
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_prompt_registry():
+    """프로세스 공용 프롬프트 레지스트리 반환"""
+    global _registry
+    
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = PromptRegistry(PATHS['prompts_dir'])
+    return _registry
@@ -0,0 +1,44 @@
+# rerun 도우미: 화면 일부(프래그먼트)만 다시 실행할 수 있으면 그 부분만, 아니면 앱 전체를 다시 실행
+
+import functools
+import streamlit as st
+from streamlit.errors import StreamlitAPIException
+from config.settings import UI_CONFIG
+from utils.profiler import note_rerun_trigger, profile_fragment
+
+def fragment(func=None):
+    """
+    st.fragment 래퍼: UI_CONFIG['fragments']가 꺼져 있으면 일반 함수처럼 실행 (성능 비교용)
+    설정은 호출할 때마다 확인하므로 실행 중에 바꿔도 반영됨
+    (디버그 모드에서는 프래그먼트 단독 실행도 rerun 프로파일러에 기록)
+    """
+    def decorate(f):
+        fragment_func = st.fragment(profile_fragment(f))
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            if UI_CONFIG.get('fragments', True):
+                return fragment_func(*args, **kwargs)
+            return f(*args, **kwargs)
+        return wrapper
+
+    if func is not None:
+        return decorate(func)
+    return decorate
+
+def request_rerun(scope="fragment"):
+    """
+    rerun 요청
+    - scope="fragment": 프래그먼트 단독 실행 중이면 그 프래그먼트만 다시 실행
+      (앱 전체 실행 중이거나 프래그먼트 밖이면 Streamlit이 거부하므로 앱 전체로 대체)
+    - scope="app": 앱 전체
+    디버그 모드에서는 호출 위치를 다음 실행의 원인으로 기록 (utils/profiler.py)
+    """
+    if scope == "fragment":
+        try:
+            note_rerun_trigger("fragment")
+            st.rerun(scope="fragment")
+        except StreamlitAPIException:
+            pass
+    note_rerun_trigger("app")
+    st.rerun()
@@ -0,0 +1,191 @@
+# 응답 캐시: 같은 문제/설정으로 들어온 튜터링 요청의 응답을 재사용
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from config.settings import CACHE_CONFIG, PATHS
+
+def hash_bytes(data):
+    """바이트 데이터의 sha256 해시 (문제 이미지 식별용)"""
+    if not data:
+        return None
+    return hashlib.sha256(data).hexdigest()
+
+def normalize_text(text):
+    """공백 차이로 캐시가 갈리지 않도록 입력 텍스트 정규화"""
+    if not text:
+        return ""
+    return re.sub(r"\s+", " ", str(text)).strip()
+
+def make_cache_key(**inputs):
+    """정규화된 요청 입력값들로 content-addressed 캐시 키 생성"""
+    payload = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """
+    2단 응답 캐시
+    - 메모리: LRU (max_entries 초과 시 가장 오래 안 쓴 항목 제거)
+    - 디스크(선택): data_dir 아래 키별 JSON 파일 (max_disk_entries 초과 시 오래된 파일부터 제거)
+    두 계층 모두 ttl_seconds 가 지난 항목은 만료 처리
+    """
+    
+    def __init__(self, max_entries=512, ttl_seconds=86400, disk_dir=None, max_disk_entries=5000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        
+        self._entries = OrderedDict()  # key -> (created_at, value)
+        self._lock = threading.Lock()
+        self._disk_count = None
+        
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key):
+        """캐시 조회 (없거나 만료되면 None)"""
+        now = time.time()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+        
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._put_memory(key, entry[0], entry[1])
+            return entry[1]
+    
+    def set(self, key, value):
+        """캐시 저장"""
+        created_at = time.time()
+        with self._lock:
+            self._put_memory(key, created_at, value)
+        self._write_disk(key, created_at, value)
+    
+    def clear(self):
+        """메모리 캐시 비우기 (디스크 계층은 TTL로 자연 만료)"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        """적중/실패 카운터 반환"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups * 100, 1) if lookups else 0
+            }
+    
+    def _put_memory(self, key, created_at, value):
+        self._entries[key] = (created_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+    
+    def _read_disk(self, key, now):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if now - record.get('created_at', 0) > self.ttl_seconds:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return record['created_at'], record['value']
+    
+    def _write_disk(self, key, created_at, value):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            is_new = not os.path.exists(path)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'created_at': created_at, 'value': value}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"응답 캐시 저장 실패: {str(e)}")
+            return
+        
+        if is_new:
+            self._enforce_disk_limit()
+    
+    def _enforce_disk_limit(self):
+        """디스크 항목 수가 한도를 넘으면 오래된 파일부터 10%씩 정리"""
+        with self._lock:
+            if self._disk_count is None:
+                self._disk_count = len(self._list_disk_files())
+            else:
+                self._disk_count += 1
+            if self._disk_count <= self.max_disk_entries:
+                return
+            
+            files = sorted(self._list_disk_files(), key=lambda p: os.path.getmtime(p))
+            excess = len(files) - self.max_disk_entries + max(1, self.max_disk_entries // 10)
+            for path in files[:excess]:
+                try:
+                    os.remove(path)
+                    self.evictions += 1
+                except OSError:
+                    pass
+            self._disk_count = len(files) - excess
+    
+    def _list_disk_files(self):
+        paths = []
+        for root, _, names in os.walk(self.disk_dir):
+            paths.extend(os.path.join(root, n) for n in names if n.endswith('.json'))
+        return paths
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """프로세스 전체에서 공유하는 응답 캐시 반환"""
+    global _cache
+    
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                disk_dir = None
+                if CACHE_CONFIG.get('disk_enabled'):
+                    disk_dir = os.path.join(PATHS['data_dir'], CACHE_CONFIG.get('disk_subdir', 'response_cache'))
+                _cache = ResponseCache(
+                    max_entries=CACHE_CONFIG.get('max_entries', 512),
+                    ttl_seconds=CACHE_CONFIG.get('ttl_seconds', 86400),
+                    disk_dir=disk_dir,
+                    max_disk_entries=CACHE_CONFIG.get('max_disk_entries', 5000)
+                )
+    return _cache
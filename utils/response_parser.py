@@ -0,0 +1,31 @@
+# 모델 응답 후처리: 토픽 태그(##TOPIC:) 분리, 정답 판정 문구 확인
+# 화면(app.py)과 오프라인 프롬프트 회귀 벤치마크가 같은 규칙을 쓰도록 한 곳에 둠
+
+VERDICT_CORRECT_PREFIX = "정답입니다"
+
+def extract_topic_from_response(response_text: str):
+    """
+    LLM 응답에서 '##TOPIC:...' 줄을 찾아서
+    (깨끗해진_응답_텍스트, 토픽명 또는 None)을 반환
+    """
+    if not response_text:
+        return response_text, None
+
+    lines = response_text.splitlines()
+    topic = None
+    cleaned_lines = []
+
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith("##TOPIC:"):
+            # ##TOPIC: 뒤에 오는 부분만 토픽명으로 사용
+            topic = stripped.split(":", 1)[1].strip()
+        else:
+            cleaned_lines.append(line)
+
+    cleaned_text = "\n".join(cleaned_lines).strip()
+    return cleaned_text, topic
+
+def is_correct_verdict(response_text):
+    """정답 판정 응답이 '정답입니다'로 시작하면 True (토픽 줄을 뺀 텍스트 기준)"""
+    return (response_text or "").strip().startswith(VERDICT_CORRECT_PREFIX)
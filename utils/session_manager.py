@@ -1,124 +1,300 @@
-import streamlit as st
-import json
-from datetime import datetime
 import os
+import hmac
+import uuid
+import hashlib
+import secrets
+import threading
+import streamlit as st
+from datetime import datetime, timedelta
+from config.settings import LEARNING_CONFIG, ANALYTICS_CONFIG, STORAGE_CONFIG, PATHS
+from utils.storage import get_storage_backend
+from utils.persister import get_persister
+from utils.background import submit_background
+from utils.analytics_engine import AnalyticsAggregator, EVENT_TYPES, get_analytics
+
+# 프로필로 저장/복원하는 세션 키 (해결/시도 문제 수는 analytics_data 안으로 옮김)
+PROFILE_KEYS = ('user_name', 'grade', 'selected_persona', 'last_compacted')
+
+_link_secret = None
+_link_secret_lock = threading.Lock()
+
+def _get_link_secret():
+    """학생 주소 서명 키 (STUDENT_LINK_SECRET, 없으면 data_dir의 키 파일을 처음 한 번 만들어 재사용)"""
+    global _link_secret
+    
+    if _link_secret is None:
+        with _link_secret_lock:
+            if _link_secret is None:
+                secret = STORAGE_CONFIG.get('student_link_secret')
+                if not secret:
+                    path = os.path.join(PATHS['data_dir'], STORAGE_CONFIG.get('student_secret_file', '.student_secret'))
+                    try:
+                        with open(path, 'r', encoding='utf-8') as f:
+                            secret = f.read().strip()
+                    except FileNotFoundError:
+                        secret = None
+                    if not secret:
+                        secret = secrets.token_hex(32)
+                        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                            f.write(secret)
+                _link_secret = secret.encode('utf-8')
+    return _link_secret
+
+def sign_student_id(student_id):
+    """학생 ID를 서버만 만들 수 있는 주소용 토큰(<ID>.<서명>)으로 변환"""
+    signature = hmac.new(_get_link_secret(), student_id.encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+    return f"{student_id}.{signature}"
+
+def verify_student_token(token):
+    """sign_student_id로 만든 토큰이면 학생 ID, 서명이 없거나 맞지 않으면 None"""
+    student_id, _, signature = (token or '').rpartition('.')
+    if not student_id or not signature:
+        return None
+    if not hmac.compare_digest(sign_student_id(student_id), token):
+        return None
+    return student_id
 
 class SessionManager:
     """세션 상태 관리 클래스"""
     
-    def __init__(self):
-        self.session_file = "data/session_data.json"
+    def __init__(self, backend=None, persister=None):
+        self.backend = backend or get_storage_backend()
+        self.persister = persister or get_persister()
+        self.student_id = self._resolve_student_id()
         self.initialize_session()
     
+    def _resolve_student_id(self):
+        """
+        학생 식별자: 세션에 이미 있는 ID > 서버가 서명한 ?student=<ID>.<서명> 토큰 > 새 ID
+        서명이 맞지 않는 값(다른 학생 ID를 직접 적은 주소 등)은 무시하고 새 ID를 만듦
+        주소에는 서명한 토큰을 다시 써 둠 (그 주소로 다시 열면 같은 기록으로 이어서 학습)
+        """
+        student_id = (st.session_state.get('student_id')
+                      or verify_student_token(st.query_params.get('student'))
+                      or uuid.uuid4().hex)
+        token = sign_student_id(student_id)
+        if st.query_params.get('student') != token:
+            st.query_params['student'] = token
+        st.session_state.student_id = student_id
+        return student_id
+    
     def initialize_session(self):
         """세션 초기화"""
         if 'initialized' not in st.session_state:
             st.session_state.initialized = True
             self.load_session_data()
     
-    def save_session_data(self):
-        """세션 데이터 저장"""
+    def save_session_data(self, milestone=False):
+        """
+        세션 데이터 저장 예약 (실제 쓰기는 WriteBehindPersister가 백그라운드에서 처리)
+        - 스냅샷은 여기서(스크립트 스레드) 만들고, 대화는 지난 저장 이후 새로 생긴 것만 넘김
+        - milestone=True(문제 해결 등)면 주기를 기다리지 않고 바로 저장 요청
+        """
         try:
-            session_data = {
+            analytics = dict(st.session_state.get('analytics_data', {}))
+            analytics.pop('events', None)
+            topic_stats = analytics.pop('topic_stats', {})
+            
+            profile = {
                 'user_name': st.session_state.get('user_name', '학생'),
                 'grade': st.session_state.get('grade', '중학교 3학년'),
                 'selected_persona': st.session_state.get('selected_persona', 'friendly'),
-                'chat_history': st.session_state.get('chat_history', []),
-                'analytics_data': st.session_state.get('analytics_data', {}),
-                'total_problems': st.session_state.get('total_problems', 0),
-                'solved_problems': st.session_state.get('solved_problems', 0),
+                'analytics_data': analytics,
+                'last_compacted': st.session_state.get('last_compacted'),
                 'last_saved': datetime.now().isoformat()
             }
+            problem_id = (st.session_state.get('current_problem') or {}).get('problem_id')
             
-            os.makedirs(os.path.dirname(self.session_file), exist_ok=True)
-            with open(self.session_file, 'w', encoding='utf-8') as f:
-                json.dump(session_data, f, ensure_ascii=False, indent=2)
+            self.persister.mark_dirty(
+                self.student_id,
+                profile=profile,
+                messages=self._take_unsaved('chat_history'),
+                problem_id=problem_id,
+                topic_stats=dict(topic_stats)
+            )
+            if milestone:
+                self.persister.flush_now()
             return True
         except Exception as e:
             st.error(f"세션 저장 실패: {str(e)}")
             return False
     
+    def _take_unsaved(self, key):
+        """
+        세션 리스트에서 아직 저장하지 않은 뒷부분 반환
+        (새 문제 업로드 등으로 리스트가 새로 만들어졌으면 처음부터)
+        """
+        items = st.session_state.get(key, [])
+        marker_key = f'_persisted_{key}'
+        list_id, count = st.session_state.get(marker_key, (None, 0))
+        if list_id != id(items) or count > len(items):
+            count = 0
+        st.session_state[marker_key] = (id(items), len(items))
+        return items[count:]
+    
+    def archive_chat_overflow(self):
+        """
+        세션 대화가 max_chat_history를 넘으면 오래된 메시지를 저장소로 넘기고 세션에서는 제거
+        (아직 저장 안 한 메시지는 지연 저장 큐에 먼저 넣으므로 디스크 쓰기는 백그라운드에서)
+        보관된 메시지 목록 반환
+        """
+        history = st.session_state.get('chat_history', [])
+        overflow = len(history) - LEARNING_CONFIG.get('max_chat_history', 50)
+        if overflow <= 0:
+            return []
+        
+        self.save_session_data()
+        archived, live = history[:overflow], history[overflow:]
+        st.session_state.chat_history = live
+        _, count = st.session_state.get('_persisted_chat_history', (None, 0))
+        st.session_state._persisted_chat_history = (id(live), max(count - overflow, 0))
+        return archived
+    
+    def reset_chat(self, clear_archive=False):
+        """
+        새 대화 시작 (새 문제 업로드 / 대화 기록 초기화)
+        - 지금까지의 대화는 저장 큐에 넣어 보관 (clear_archive=True면 저장소의 대화까지 삭제)
+        - 대화 화면의 페이지/보관 대화 상태도 초기화
+        """
+        had_messages = bool(st.session_state.get('chat_history'))
+        self.save_session_data()
+        if clear_archive:
+            self.persister.flush_now(wait=True)
+            self.backend.clear_messages(self.student_id)
+        
+        chat_history = st.session_state.chat_history = []
+        st.session_state._persisted_chat_history = (id(chat_history), 0)
+        st.session_state.chat_window = LEARNING_CONFIG.get('chat_page_size', 20)
+        st.session_state.chat_archive_view = []
+        st.session_state.chat_has_archive = (
+            not clear_archive and (had_messages or st.session_state.get('chat_has_archive', False))
+        )
+    
+    def load_archived_messages(self, offset, limit):
+        """
+        세션에 없는 이전 대화를 저장소에서 읽기 ('보관된 이전 대화 불러오기' 클릭 시)
+        offset: 최근 메시지부터 건너뛸 개수 (세션 대화 + 이미 불러온 보관 대화)
+        """
+        self.save_session_data()
+        self.persister.flush_now(wait=True)
+        return self.backend.load_messages(self.student_id, limit=limit, offset=offset)
+    
     def load_session_data(self):
-        """세션 데이터 로드"""
+        """세션 데이터 로드 (현재 학생의 레코드만)"""
         try:
-            if os.path.exists(self.session_file):
-                with open(self.session_file, 'r', encoding='utf-8') as f:
-                    session_data = json.load(f)
-                
-                for key, value in session_data.items():
-                    if key != 'last_saved':
-                        st.session_state[key] = value
-                return True
-            return False
+            profile = self.backend.load_profile(self.student_id)
+            if not profile:
+                return False
+            
+            for key in PROFILE_KEYS:
+                if key in profile:
+                    st.session_state[key] = profile[key]
+            
+            analytics = dict(profile.get('analytics_data') or {})
+            analytics['topic_stats'] = self.backend.load_topic_stats(self.student_id)
+            # 예전 프로필은 해결/시도 문제 수를 최상위 키로 저장했음
+            for key in ('total_problems', 'solved_problems'):
+                if key not in analytics and key in profile:
+                    analytics[key] = profile[key]
+            st.session_state.analytics_data = analytics
+            
+            chat_history = self.backend.load_messages(
+                self.student_id, limit=LEARNING_CONFIG.get('max_chat_history', 50)
+            )
+            st.session_state.chat_history = chat_history
+            # 불러온 대화는 이미 저장돼 있으므로 다시 저장하지 않음
+            st.session_state._persisted_chat_history = (id(chat_history), len(chat_history))
+            # 한 페이지를 꽉 채워 불러왔으면 저장소에 더 오래된 대화가 있을 수 있음
+            st.session_state.chat_has_archive = len(chat_history) >= LEARNING_CONFIG.get('max_chat_history', 50)
+            
+            self.compact_old_events()
+            return True
         except Exception as e:
             st.error(f"세션 로드 실패: {str(e)}")
             return False
     
-    def update_analytics(self, event_type, data=None):
-        """분석 데이터 업데이트 (시간 관련 로직 제거)"""
-        if 'analytics_data' not in st.session_state:
-            st.session_state.analytics_data = {
-                'total_hints': 0,
-                'hint_distribution': [0, 0, 0],
-                'problem_types': {},
-                'last_study_date': None,
-                'events': []
-            }
+    def compact_old_events(self):
+        """
+        보존 기간(retention_days)이 지난 원본 이벤트를 일별 롤업으로 압축
+        compaction_interval_days에 한 번만, 백그라운드에서 실행
+        """
+        today = datetime.now().date()
+        last = st.session_state.get('last_compacted')
+        interval = ANALYTICS_CONFIG.get('compaction_interval_days', 1)
+        if last and (today - datetime.fromisoformat(last).date()).days < interval:
+            return None
         
-        analytics = st.session_state.analytics_data
-        
-        # 이벤트 기록
+        st.session_state.last_compacted = today.isoformat()
+        cutoff = (today - timedelta(days=ANALYTICS_CONFIG.get('retention_days', 90))).isoformat()
+        return submit_background(self._compact_events, self.student_id, cutoff)
+    
+    def _compact_events(self, student_id, cutoff):
+        """백그라운드 작업 (st.session_state 접근 금지)"""
+        try:
+            return self.backend.compact_events(student_id, cutoff)
+        except Exception as e:
+            print(f"이벤트 압축 실패: {str(e)}")
+            return 0
+    
+    def update_analytics(self, event_type, data=None):
+        """
+        분석 이벤트 기록 (학습 통계를 바꾸는 유일한 입구)
+        - 원본 이벤트는 저장소의 추가 전용 로그로 바로 보냄 (세션 전체를 다시 저장하지 않음)
+        - 집계값은 AnalyticsAggregator가 O(1)로 갱신
+        """
         event = {
             'type': event_type,
             'timestamp': datetime.now().isoformat(),
             'data': data
         }
         
-        if 'events' not in analytics:
-            analytics['events'] = []
-        analytics['events'].append(event)
-        
-        # 이벤트 타입별 처리
-        if event_type == 'hint_used':
-            analytics['total_hints'] += 1
-            if data and 'level' in data:
-                level = data['level'] - 1
-                if 0 <= level < 3:
-                    analytics['hint_distribution'][level] += 1
-        
-        elif event_type == 'problem_solved':
-            st.session_state.solved_problems = st.session_state.get('solved_problems', 0) + 1
+        analytics = get_analytics()
+        analytics.apply(event)
         
-        elif event_type == 'problem_started':
-            st.session_state.total_problems = st.session_state.get('total_problems', 0) + 1
+        try:
+            self.backend.append_events(self.student_id, [event])
+        except Exception as e:
+            st.error(f"이벤트 기록 실패: {str(e)}")
+        return analytics.snapshot()
+    
+    def iter_events(self, event_type=None, since=None):
+        """현재 학생의 원본 이벤트를 시간순으로 하나씩 읽기 (분석/재생용)"""
+        return self.backend.iter_events(self.student_id, event_type, since)
+    
+    def replay_analytics(self):
+        """롤업 + 이벤트 로그를 처음부터 재생해서 집계값을 다시 계산"""
+        aggregator = AnalyticsAggregator()
         
-        analytics['last_study_date'] = datetime.now().isoformat()
+        # 압축된 과거 이벤트는 롤업 개수만큼 다시 반영
+        for rollup in self.backend.iter_rollups(self.student_id):
+            if rollup['type'] not in EVENT_TYPES:
+                continue
+            event = {
+                'type': rollup['type'],
+                'timestamp': rollup['day'],
+                'data': {'topic': rollup['topic'] or None, 'level': rollup['hint_level'] or None}
+            }
+            for _ in range(rollup['count']):
+                aggregator.apply(event)
+        for event in self.iter_events():
+            if event.get('type') in EVENT_TYPES:  # 예전 버전이 남긴 알 수 없는 이벤트는 건너뜀
+                aggregator.apply(event)
         
-        if st.session_state.get('settings', {}).get('auto_save', True):
-            self.save_session_data()
+        st.session_state.analytics_data = aggregator.state
+        st.session_state.analytics_aggregator = aggregator
+        return aggregator.snapshot()
     
     def get_study_statistics(self):
         """학습 통계 반환"""
-        analytics = st.session_state.get('analytics_data', {})
+        snapshot = get_analytics().snapshot()
         
         stats = {
-            'total_hints': analytics.get('total_hints', 0),
-            'average_hint_level': self._calculate_average_hint_level(),
-            'solve_rate': self._calculate_solve_rate(),
-            'last_study': analytics.get('last_study_date', None)
+            'total_hints': snapshot['total_hints'],
+            'average_hint_level': snapshot['average_hint_level'],
+            'solve_rate': snapshot['solve_rate'],
+            'last_study': snapshot['last_study_date']
         }
         
         return stats
-    
-    def _calculate_average_hint_level(self):
-        distribution = st.session_state.get('analytics_data', {}).get('hint_distribution', [0, 0, 0])
-        total = sum(distribution)
-        if total == 0: return 0
-        weighted_sum = sum((i + 1) * count for i, count in enumerate(distribution))
-        return round(weighted_sum / total, 2)
-    
-    def _calculate_solve_rate(self):
-        total = st.session_state.get('total_problems', 0)
-        solved = st.session_state.get('solved_problems', 0)
-        if total == 0: return 0
-        return round(solved / total * 100, 1)
\ No newline at end of file
@@ -0,0 +1,101 @@
+# 풀이 리뷰: 정답 판정 직후 백그라운드에서 풀이 흐름 정리 & 피드백을 만들어 저장소에 문제별로 저장
+# 분석 탭은 저장된 리뷰만 읽으므로 화면을 열 때 네트워크를 기다리지 않음
+
+import threading
+from collections import OrderedDict
+from config.settings import API_CONFIG, REVIEW_CONFIG
+from utils.background import submit_background
+from utils.openai_client import get_openai_client
+from utils.prompt_manager import get_prompt_manager
+from utils.storage import get_storage_backend
+from utils.usage_tracker import record_usage
+from utils.telemetry import request_trace
+
+# 리뷰 상태
+REVIEW_READY = 'ready'
+REVIEW_PENDING = 'pending'
+REVIEW_FAILED = 'failed'
+REVIEW_MISSING = 'missing'
+
+_reviews = OrderedDict()  # (student_id, problem_id) -> 진행 중/끝난 Future
+_reviews_lock = threading.Lock()
+
+def build_review_conversation(chat_history):
+    """정답 판정 메시지까지의 최근 대화를 리뷰용 텍스트로 (스크립트 스레드에서 호출)"""
+    recent = chat_history[-REVIEW_CONFIG.get('history_messages', 11):]
+    lines = []
+    for role, content, ts in recent:
+        speaker = "학생" if role == "user" else "선생님"
+        lines.append(f"{speaker}: {content}")
+    return "\n".join(lines)
+
+def start_solution_review(student_id, problem_id, chat_history):
+    """
+    풀이 리뷰 생성을 백그라운드로 시작
+    대화 텍스트는 여기서 만들어 넘김 (작업 스레드는 st.session_state에 접근하지 않음)
+    """
+    if not REVIEW_CONFIG.get('enabled', True) or not problem_id:
+        return None
+
+    conversation = build_review_conversation(chat_history)
+    key = (student_id, problem_id)
+    with _reviews_lock:
+        future = _reviews.get(key)
+        if future is not None and not future.done():
+            return future
+        future = _reviews[key] = submit_background(generate_solution_review, student_id, problem_id, conversation)
+        while len(_reviews) > 64:
+            _reviews.popitem(last=False)
+    return future
+
+def get_solution_review(student_id, problem_id=None):
+    """
+    (상태, 리뷰 dict 또는 None) 반환 - 네트워크 호출 없음
+    problem_id가 없으면 저장된 리뷰 중 가장 최근 것
+    """
+    future = None
+    if problem_id is not None:
+        with _reviews_lock:
+            future = _reviews.get((student_id, problem_id))
+        if future is not None and not future.done():
+            return REVIEW_PENDING, None
+
+    stored = get_storage_backend().load_solution_review(student_id, problem_id)
+    if stored:
+        return REVIEW_READY, stored
+    if problem_id is not None and future is not None:
+        return REVIEW_FAILED, None
+    return REVIEW_MISSING, None
+
+def generate_solution_review(student_id, problem_id, conversation):
+    """
+    대화 텍스트(build_review_conversation) → 풀이 리뷰 생성 후 저장, 리뷰 문자열 반환 (실패하면 None)
+    모델 호출을 기다리므로 화면에서는 start_solution_review로 백그라운드에서 실행
+    """
+    client = get_openai_client()
+    if client is None:
+        return None
+
+    prompt_manager = get_prompt_manager()
+    with request_trace("review") as trace:
+        try:
+            with trace.span('network'):
+                response = client.chat.completions.create(
+                    model=API_CONFIG['model_name'],
+                    messages=[
+                        {"role": "system", "content": prompt_manager.get_solution_review_prompt()},
+                        {"role": "user", "content": prompt_manager.get_solution_review_request(conversation)}
+                    ],
+                    temperature=0.7,
+                    max_tokens=REVIEW_CONFIG.get('max_tokens', 500)
+                )
+            record_usage("review", response.usage)
+            review = (response.choices[0].message.content or "").strip()
+            if not review:
+                return None
+            get_storage_backend().save_solution_review(student_id, problem_id, review)
+            return review
+        except Exception as e:
+            trace.fail(e)
+            print(f"풀이 리뷰 생성 실패: {str(e)}")
+            return None
@@ -0,0 +1,457 @@
+# 저장소 백엔드: 학생별 프로필/대화/분석 이벤트/토픽 통계를 저장 (JSON 단일 파일 또는 SQLite)
+
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from config.settings import STORAGE_CONFIG, EVENT_LOG_CONFIG, PATHS
+from utils.event_log import EventLog, rollup_key
+
+class StorageBackend:
+    """
+    저장소 인터페이스
+    - profile: 이름/학년/페르소나/누적 통계 등 학생 한 명의 요약 상태 (dict)
+    - messages: (role, content, timestamp) 대화 기록, 추가만 함
+    - events: {'type', 'timestamp', 'data'} 분석 이벤트, 추가만 함 (세션에는 집계값만 유지)
+    - rollups: 보존 기간이 지난 이벤트를 (날짜, 타입, 토픽, 힌트 단계)별 개수로 합친 것
+    - topic_stats: {topic: {'attempted', 'solved'}}
+    - solution_reviews: 정답을 맞힌 문제별 풀이 리뷰 (problem_id 기준)
+    """
+    
+    def load_profile(self, student_id):
+        raise NotImplementedError
+    
+    def save_profile(self, student_id, profile):
+        raise NotImplementedError
+    
+    def append_messages(self, student_id, messages, problem_id=None):
+        raise NotImplementedError
+    
+    def load_messages(self, student_id, limit=None, offset=0):
+        """최근 offset개를 건너뛴 그 이전 limit개 메시지를 시간순으로 반환 (대화 페이지 넘김용)"""
+        raise NotImplementedError
+    
+    def clear_messages(self, student_id):
+        raise NotImplementedError
+    
+    def append_events(self, student_id, events):
+        raise NotImplementedError
+    
+    def iter_events(self, student_id, event_type=None, since=None):
+        """이벤트를 시간순으로 하나씩 반환 (since: ISO 시각 문자열, 이후 이벤트만)"""
+        raise NotImplementedError
+    
+    def load_events(self, student_id, event_type=None, since=None):
+        return list(self.iter_events(student_id, event_type, since))
+    
+    def count_events_by_day(self, student_id, event_type, since=None):
+        """{'YYYY-MM-DD': 개수} (원본 이벤트 + 롤업)"""
+        raise NotImplementedError
+    
+    def compact_events(self, student_id, before):
+        """before(YYYY-MM-DD) 이전 원본 이벤트를 일별 롤업으로 합치고 삭제, 합친 이벤트 수 반환"""
+        raise NotImplementedError
+    
+    def iter_rollups(self, student_id, since=None):
+        """롤업 레코드 반환 ({'day', 'type', 'topic', 'hint_level', 'count'})"""
+        raise NotImplementedError
+    
+    def save_topic_stats(self, student_id, topic_stats):
+        raise NotImplementedError
+    
+    def load_topic_stats(self, student_id):
+        raise NotImplementedError
+    
+    def save_solution_review(self, student_id, problem_id, review):
+        raise NotImplementedError
+    
+    def load_solution_review(self, student_id, problem_id=None):
+        """{'problem_id', 'review', 'created_at'} 반환, problem_id가 없으면 가장 최근 리뷰"""
+        raise NotImplementedError
+    
+    def close(self):
+        pass
+
+class JSONStorageBackend(StorageBackend):
+    """
+    기존 data/session_data.json 단일 파일 저장소 (1인용)
+    student_id와 상관없이 파일 하나를 통째로 읽고 씀
+    분석 이벤트만은 파일에 넣지 않고 추가 전용 JSONL 이벤트 로그에 기록
+    """
+    
+    def __init__(self, path, event_log=None):
+        self.path = path
+        self.event_log = event_log or EventLog(
+            os.path.join(os.path.dirname(path) or '.', EVENT_LOG_CONFIG.get('subdir', 'events'))
+        )
+        self._lock = threading.RLock()
+        self._data = None
+    
+    def _load(self):
+        if self._data is None:
+            self._data = {}
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._data = json.load(f)
+        return self._data
+    
+    def _write(self):
+        """임시 파일에 다 쓴 뒤 rename으로 교체 (쓰는 도중 죽어도 기존 파일은 온전함)"""
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    def load_profile(self, student_id):
+        with self._lock:
+            data = self._load()
+            if not data:
+                return None
+            profile = {k: v for k, v in data.items() if k not in ('chat_history', 'solution_reviews', 'last_saved')}
+            analytics = dict(profile.get('analytics_data') or {})
+            analytics.pop('events', None)
+            analytics.pop('topic_stats', None)
+            profile['analytics_data'] = analytics
+            return profile
+    
+    def save_profile(self, student_id, profile):
+        with self._lock:
+            data = self._load()
+            analytics = data.get('analytics_data') or {}
+            for key, value in profile.items():
+                data[key] = value
+            # 토픽 통계는 save_topic_stats로 관리하므로 프로필 저장 시 덮어쓰지 않음
+            # (예전 버전이 파일 안에 쌓아 둔 events 목록은 더 이상 저장하지 않음)
+            merged = dict(profile.get('analytics_data') or {})
+            if 'topic_stats' in analytics:
+                merged['topic_stats'] = analytics['topic_stats']
+            merged.pop('events', None)
+            data['analytics_data'] = merged
+            data['last_saved'] = datetime.now().isoformat()
+            self._write()
+    
+    def append_messages(self, student_id, messages, problem_id=None):
+        if not messages:
+            return
+        with self._lock:
+            data = self._load()
+            data.setdefault('chat_history', []).extend(list(m) for m in messages)
+            self._write()
+    
+    def load_messages(self, student_id, limit=None, offset=0):
+        with self._lock:
+            history = self._load().get('chat_history', [])
+            end = len(history) - offset
+            start = max(end - limit, 0) if limit else 0
+            return [tuple(m) for m in history[start:max(end, 0)]]
+    
+    def clear_messages(self, student_id):
+        with self._lock:
+            self._load()['chat_history'] = []
+            self._write()
+    
+    def append_events(self, student_id, events):
+        self.event_log.append(student_id, events)
+    
+    def iter_events(self, student_id, event_type=None, since=None):
+        return self.event_log.iter_events(None, event_type, since)
+    
+    def count_events_by_day(self, student_id, event_type, since=None):
+        counts = {}
+        for event in self.iter_events(student_id, event_type, since):
+            day = event.get('timestamp', '')[:10]
+            counts[day] = counts.get(day, 0) + 1
+        for rollup in self.iter_rollups(student_id, since):
+            if rollup['type'] == event_type:
+                counts[rollup['day']] = counts.get(rollup['day'], 0) + rollup['count']
+        return counts
+    
+    def compact_events(self, student_id, before):
+        return self.event_log.compact(before)
+    
+    def iter_rollups(self, student_id, since=None):
+        return self.event_log.iter_rollups(None, since)
+    
+    def save_topic_stats(self, student_id, topic_stats):
+        with self._lock:
+            self._load().setdefault('analytics_data', {})['topic_stats'] = topic_stats
+            self._write()
+    
+    def load_topic_stats(self, student_id):
+        with self._lock:
+            return dict(self._load().get('analytics_data', {}).get('topic_stats', {}))
+    
+    def save_solution_review(self, student_id, problem_id, review):
+        with self._lock:
+            reviews = self._load().setdefault('solution_reviews', {})
+            reviews.pop(problem_id, None)  # 다시 넣어서 최신 항목이 맨 뒤에 오게 함
+            reviews[problem_id] = {'review': review, 'created_at': datetime.now().isoformat()}
+            self._write()
+    
+    def load_solution_review(self, student_id, problem_id=None):
+        with self._lock:
+            reviews = self._load().get('solution_reviews', {})
+            if problem_id is None:
+                if not reviews:
+                    return None
+                problem_id = next(reversed(reviews))
+            entry = reviews.get(problem_id)
+            return {'problem_id': problem_id, **entry} if entry else None
+
+class SQLiteStorageBackend(StorageBackend):
+    """
+    SQLite(WAL) 저장소 - 학생별 레코드, 여러 학생이 한 서버를 같이 써도 안전
+    스레드마다 커넥션을 따로 열고, 쓰기는 짧은 트랜잭션으로 처리
+    """
+    
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS profiles (
+        student_id TEXT PRIMARY KEY,
+        data TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id TEXT NOT NULL,
+        problem_id TEXT,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        timestamp TEXT,
+        created_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_messages_student ON messages (student_id, id);
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id TEXT NOT NULL,
+        type TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        data TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_events_student_time ON events (student_id, timestamp);
+    CREATE INDEX IF NOT EXISTS idx_events_student_type_time ON events (student_id, type, timestamp);
+    CREATE TABLE IF NOT EXISTS event_rollups (
+        student_id TEXT NOT NULL,
+        day TEXT NOT NULL,
+        type TEXT NOT NULL,
+        topic TEXT NOT NULL DEFAULT '',
+        hint_level INTEGER NOT NULL DEFAULT 0,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (student_id, day, type, topic, hint_level)
+    );
+    CREATE TABLE IF NOT EXISTS solution_reviews (
+        student_id TEXT NOT NULL,
+        problem_id TEXT NOT NULL,
+        review TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        PRIMARY KEY (student_id, problem_id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_reviews_student_time ON solution_reviews (student_id, created_at);
+    CREATE TABLE IF NOT EXISTS topic_stats (
+        student_id TEXT NOT NULL,
+        topic TEXT NOT NULL,
+        attempted INTEGER NOT NULL DEFAULT 0,
+        solved INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (student_id, topic)
+    );
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._connect().executescript(self.SCHEMA)
+    
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=STORAGE_CONFIG.get('sqlite_busy_timeout', 5.0))
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def load_profile(self, student_id):
+        row = self._connect().execute(
+            "SELECT data FROM profiles WHERE student_id = ?", (student_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def save_profile(self, student_id, profile):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO profiles (student_id, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(student_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                (student_id, json.dumps(profile, ensure_ascii=False), datetime.now().isoformat())
+            )
+    
+    def append_messages(self, student_id, messages, problem_id=None):
+        if not messages:
+            return
+        now = datetime.now().isoformat()
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO messages (student_id, problem_id, role, content, timestamp, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(student_id, problem_id, role, content, ts, now) for role, content, ts in messages]
+            )
+    
+    def load_messages(self, student_id, limit=None, offset=0):
+        query = "SELECT role, content, timestamp FROM messages WHERE student_id = ? ORDER BY id DESC"
+        params = [student_id]
+        if limit or offset:
+            query += " LIMIT ? OFFSET ?"
+            params.extend([limit or -1, offset])
+        rows = self._connect().execute(query, params).fetchall()
+        return [tuple(row) for row in reversed(rows)]
+    
+    def clear_messages(self, student_id):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM messages WHERE student_id = ?", (student_id,))
+    
+    def append_events(self, student_id, events):
+        if not events:
+            return
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO events (student_id, type, timestamp, data) VALUES (?, ?, ?, ?)",
+                [
+                    (student_id, e['type'], e['timestamp'], json.dumps(e.get('data'), ensure_ascii=False))
+                    for e in events
+                ]
+            )
+    
+    def iter_events(self, student_id, event_type=None, since=None):
+        query = "SELECT type, timestamp, data FROM events WHERE student_id = ?"
+        params = [student_id]
+        if event_type is not None:
+            query += " AND type = ?"
+            params.append(event_type)
+        if since is not None:
+            query += " AND timestamp >= ?"
+            params.append(since)
+        query += " ORDER BY timestamp, id"
+        # 커서를 그대로 순회해서 한 행씩 흘려보냄
+        for t, ts, data in self._connect().execute(query, params):
+            yield {'type': t, 'timestamp': ts, 'data': json.loads(data) if data else None}
+    
+    def count_events_by_day(self, student_id, event_type, since=None):
+        query = ("SELECT substr(timestamp, 1, 10) AS day, COUNT(*) FROM events "
+                 "WHERE student_id = ? AND type = ?")
+        params = [student_id, event_type]
+        if since is not None:
+            query += " AND timestamp >= ?"
+            params.append(since)
+        query += " GROUP BY day"
+        counts = dict(self._connect().execute(query, params).fetchall())
+        for rollup in self.iter_rollups(student_id, since):
+            if rollup['type'] == event_type:
+                counts[rollup['day']] = counts.get(rollup['day'], 0) + rollup['count']
+        return counts
+    
+    def compact_events(self, student_id, before):
+        conn = self._connect()
+        with conn:
+            # 집계와 삭제 사이에 다른 쓰기가 끼지 않도록 쓰기 잠금부터 잡음
+            conn.execute("BEGIN IMMEDIATE")
+            counts = {}
+            for t, ts, data in conn.execute(
+                "SELECT type, timestamp, data FROM events WHERE student_id = ? AND timestamp < ?",
+                (student_id, before)
+            ):
+                key = rollup_key({'type': t, 'timestamp': ts, 'data': json.loads(data) if data else None})
+                counts[key] = counts.get(key, 0) + 1
+            if not counts:
+                return 0
+            conn.executemany(
+                "INSERT INTO event_rollups (student_id, day, type, topic, hint_level, count) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(student_id, day, type, topic, hint_level) DO UPDATE SET count = count + excluded.count",
+                [(student_id,) + key + (count,) for key, count in counts.items()]
+            )
+            conn.execute("DELETE FROM events WHERE student_id = ? AND timestamp < ?", (student_id, before))
+        return sum(counts.values())
+    
+    def iter_rollups(self, student_id, since=None):
+        query = "SELECT day, type, topic, hint_level, count FROM event_rollups WHERE student_id = ?"
+        params = [student_id]
+        if since is not None:
+            query += " AND day >= ?"
+            params.append(since[:10])
+        query += " ORDER BY day"
+        for day, t, topic, hint_level, count in self._connect().execute(query, params):
+            yield {'day': day, 'type': t, 'topic': topic, 'hint_level': hint_level, 'count': count}
+    
+    def save_topic_stats(self, student_id, topic_stats):
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO topic_stats (student_id, topic, attempted, solved) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(student_id, topic) DO UPDATE SET "
+                "attempted = excluded.attempted, solved = excluded.solved",
+                [
+                    (student_id, topic, stat.get('attempted', 0), stat.get('solved', 0))
+                    for topic, stat in topic_stats.items()
+                ]
+            )
+    
+    def load_topic_stats(self, student_id):
+        rows = self._connect().execute(
+            "SELECT topic, attempted, solved FROM topic_stats WHERE student_id = ?", (student_id,)
+        ).fetchall()
+        return {topic: {'attempted': attempted, 'solved': solved} for topic, attempted, solved in rows}
+    
+    def save_solution_review(self, student_id, problem_id, review):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO solution_reviews (student_id, problem_id, review, created_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(student_id, problem_id) DO UPDATE SET "
+                "review = excluded.review, created_at = excluded.created_at",
+                (student_id, problem_id, review, datetime.now().isoformat())
+            )
+    
+    def load_solution_review(self, student_id, problem_id=None):
+        query = "SELECT problem_id, review, created_at FROM solution_reviews WHERE student_id = ?"
+        params = [student_id]
+        if problem_id is not None:
+            query += " AND problem_id = ?"
+            params.append(problem_id)
+        query += " ORDER BY created_at DESC LIMIT 1"
+        row = self._connect().execute(query, params).fetchone()
+        return {'problem_id': row[0], 'review': row[1], 'created_at': row[2]} if row else None
+    
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_storage_backend():
+    """STORAGE_CONFIG['backend'] 설정에 맞는 프로세스 공용 저장소 반환"""
+    global _backend
+    
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                data_dir = PATHS['data_dir']
+                if STORAGE_CONFIG.get('backend') == 'sqlite':
+                    _backend = SQLiteStorageBackend(os.path.join(data_dir, STORAGE_CONFIG.get('sqlite_file', 'tutor.db')))
+                else:
+                    _backend = JSONStorageBackend(os.path.join(data_dir, STORAGE_CONFIG.get('json_file', 'session_data.json')))
+    return _backend
@@ -0,0 +1,264 @@
+# 요청별 텔레메트리: 모델 요청 한 건의 구간별 시간(span), 토큰/비용, 캐시 적중, 재시도 횟수를 JSONL로 기록
+# 기록 파일: logs_dir/telemetry.jsonl (크기 기준 회전), 디스크 쓰기는 로깅 큐 리스너 스레드가 처리 (화면을 막지 않음)
+#
+# 구간 이름
+#   analysis_wait:  문제 전사(분석) 결과를 기다린 시간
+#   image_encoding: 업로드 이미지 전처리/base64 인코딩 (prompt_build와 겹칠 수 있음)
+#   prompt_build:   시스템 프롬프트 + 대화 기록 + 현재 입력 메시지 구성
+#   network:        모델 호출 대기 (스트리밍이면 조각을 기다린 시간의 합)
+#   ttft:           추적 시작부터 첫 조각까지 (스트리밍만)
+#   parsing:        응답 후처리 (토픽/판정, 힌트 사다리 JSON)
+#   rendering:      스트리밍 조각을 화면에 그린 시간의 합
+
+import os
+import json
+import math
+import queue
+import time
+import uuid
+import atexit
+import logging
+import threading
+import logging.handlers
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from config.settings import API_CONFIG, DEBUG_CONFIG, PATHS, TELEMETRY_CONFIG
+
+SPAN_NAMES = ('analysis_wait', 'image_encoding', 'prompt_build', 'network', 'ttft', 'parsing', 'rendering')
+
+_local = threading.local()
+_recent = deque(maxlen=TELEMETRY_CONFIG.get('recent_size', 500))
+_recent_lock = threading.Lock()
+
+_logger = None
+_listener = None
+_logger_lock = threading.Lock()
+
+def is_telemetry_enabled():
+    return bool(TELEMETRY_CONFIG.get('enabled', True) and DEBUG_CONFIG.get('save_logs', True))
+
+def get_telemetry_path():
+    return os.path.join(PATHS['logs_dir'], TELEMETRY_CONFIG.get('file', 'telemetry.jsonl'))
+
+def _get_logger():
+    """텔레메트리 전용 로거 (큐 → 리스너 스레드 → 회전 파일), 처음 쓸 때 생성"""
+    global _logger, _listener
+
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                path = get_telemetry_path()
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                file_handler = logging.handlers.RotatingFileHandler(
+                    path,
+                    maxBytes=TELEMETRY_CONFIG.get('max_bytes', 5 * 1024 * 1024),
+                    backupCount=TELEMETRY_CONFIG.get('backup_count', 5),
+                    encoding='utf-8'
+                )
+                file_handler.setFormatter(logging.Formatter('%(message)s'))
+
+                records = queue.SimpleQueue()
+                _listener = logging.handlers.QueueListener(records, file_handler)
+                _listener.start()
+                atexit.register(_listener.stop)
+
+                logger = logging.getLogger('tutor.telemetry')
+                logger.setLevel(logging.INFO)
+                logger.propagate = False  # 앱 로그(stderr)에 섞지 않음
+                logger.addHandler(logging.handlers.QueueHandler(records))
+                _logger = logger
+    return _logger
+
+class RequestTrace:
+    """모델 요청 한 건의 추적 기록 (한 스레드 안에서만 사용)"""
+
+    def __init__(self, mode, persona=None, model=None, **fields):
+        self.request_id = uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.fields = {
+            'mode': mode,
+            'persona': persona,
+            'model': model or API_CONFIG.get('model_name'),
+            'streamed': False,
+            'cache_hit': False,
+            **fields
+        }
+        self.usage = None
+        self.cost_usd = None
+        self.attempts = 0
+        self.error = None
+
+    @contextmanager
+    def span(self, name):
+        """구간 시간 측정 (같은 이름이 여러 번 나오면 합산)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def add(self, name, ms):
+        self.spans[name] = self.spans.get(name, 0.0) + ms
+
+    def mark(self, name):
+        """추적 시작부터 지금까지를 구간으로 기록 (처음 한 번만, 예: ttft)"""
+        if name not in self.spans:
+            self.spans[name] = (time.perf_counter() - self.started) * 1000
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def note_usage(self, usage, cost_usd=None):
+        """토큰 사용량 반영 (한 추적에서 여러 번 호출되면 합산)"""
+        if self.usage is None:
+            self.usage = {'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0}
+        for key in self.usage:
+            self.usage[key] += usage.get(key, 0)
+        if cost_usd is not None:
+            self.cost_usd = (self.cost_usd or 0.0) + cost_usd
+
+    def fail(self, error):
+        self.error = f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error)
+
+    def to_record(self):
+        usage = self.usage or {}
+        return {
+            'ts': datetime.now().isoformat(),
+            'request_id': self.request_id,
+            **self.fields,
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 1),
+            'spans': {name: round(ms, 1) for name, ms in self.spans.items()},
+            'prompt_tokens': usage.get('prompt_tokens'),
+            'cached_tokens': usage.get('cached_tokens'),
+            'completion_tokens': usage.get('completion_tokens'),
+            'cost_usd': round(self.cost_usd, 6) if self.cost_usd is not None else None,
+            'retries': max(0, self.attempts - 1),
+            'error': self.error
+        }
+
+def current_trace():
+    """현재 스레드에서 진행 중인 추적 (없으면 None)"""
+    return getattr(_local, 'trace', None)
+
+@contextmanager
+def request_trace(mode, **fields):
+    """
+    모델 요청 추적 시작 - 끝나면 기록 한 줄을 남김
+    이미 진행 중인 추적이 있으면 그 추적을 그대로 씀 (화면 쪽에서 연 추적 안에서 ai_handler가 다시 열 때)
+    """
+    outer = current_trace()
+    if outer is not None:
+        yield outer
+        return
+
+    trace = RequestTrace(mode, **fields)
+    _local.trace = trace
+    try:
+        yield trace
+    except Exception as e:
+        trace.fail(e)
+        raise
+    finally:
+        _local.trace = None
+        emit(trace.to_record())
+
+@contextmanager
+def span(name):
+    """진행 중인 추적이 있으면 구간 측정, 없으면 아무것도 안 함"""
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+    with trace.span(name):
+        yield
+
+def note_usage(usage, cost_usd=None):
+    """(usage_tracker.record_usage에서 호출) 진행 중인 추적에 토큰 사용량 반영"""
+    trace = current_trace()
+    if trace is not None:
+        trace.note_usage(usage, cost_usd)
+
+def count_http_request(request):
+    """
+    httpx 요청 이벤트 훅 (utils/openai_client.py)
+    SDK가 재시도할 때마다 요청이 한 번 더 나가므로 시도 횟수 - 1 = 재시도 횟수
+    """
+    trace = current_trace()
+    if trace is not None:
+        trace.attempts += 1
+
+def emit(record):
+    """기록 한 줄 남기기 (최근 기록은 메모리에도 보관)"""
+    with _recent_lock:
+        _recent.append(record)
+    if not is_telemetry_enabled():
+        return
+    try:
+        _get_logger().info(json.dumps(record, ensure_ascii=False))
+    except Exception as e:
+        print(f"텔레메트리 기록 실패: {str(e)}")
+
+def get_recent_records():
+    with _recent_lock:
+        return list(_recent)
+
+def read_records(path=None, since=None):
+    """기록 파일(회전된 파일 포함, 오래된 것부터)에서 기록 읽기 - since: ISO 시각 문자열"""
+    path = path or get_telemetry_path()
+    backups = [f"{path}.{i}" for i in range(TELEMETRY_CONFIG.get('backup_count', 5), 0, -1)]
+    for file_path in backups + [path]:
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if since and record.get('ts', '') < since:
+                    continue
+                yield record
+
+def percentile(values, p):
+    """최근접 순위 백분위수 (values가 비어 있으면 None)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = min(len(ordered), max(1, math.ceil(p / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+def summarize_records(records, group_by='mode', percentiles=(50, 95, 99)):
+    """
+    기록 → 그룹별 요약
+    {그룹: {'count', 'errors', 'cache_hits', 'retries', 'prompt_tokens', 'cached_tokens', 'completion_tokens',
+            'cost_usd', 'total_ms': {'p50', ...}, 'spans': {구간: {'p50', ...}}}}
+    """
+    groups = {}
+    for record in records:
+        key = record.get(group_by)
+        group = groups.setdefault(key, {
+            'count': 0, 'errors': 0, 'cache_hits': 0, 'retries': 0,
+            'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0, 'cost_usd': 0.0,
+            '_total': [], '_spans': {}
+        })
+        group['count'] += 1
+        group['errors'] += 1 if record.get('error') else 0
+        group['cache_hits'] += 1 if record.get('cache_hit') else 0
+        group['retries'] += record.get('retries') or 0
+        for field in ('prompt_tokens', 'cached_tokens', 'completion_tokens', 'cost_usd'):
+            group[field] += record.get(field) or 0
+        group['_total'].append(record.get('total_ms') or 0)
+        for name, ms in (record.get('spans') or {}).items():
+            group['_spans'].setdefault(name, []).append(ms)
+
+    def _percentiles(values):
+        return {f"p{p}": percentile(values, p) for p in percentiles}
+
+    for group in groups.values():
+        group['cost_usd'] = round(group['cost_usd'], 6)
+        group['total_ms'] = _percentiles(group.pop('_total'))
+        spans = group.pop('_spans')
+        group['spans'] = {name: _percentiles(spans[name]) for name in SPAN_NAMES if name in spans}
+    return groups
@@ -0,0 +1,66 @@
+# 토큰 사용량 집계: 응답의 usage(특히 프롬프트 캐시 적중 토큰)를 모드별로 누적
+
+import logging
+import threading
+from config.settings import API_CONFIG, MODEL_PRICES
+from utils.telemetry import note_usage
+
+logger = logging.getLogger(__name__)
+
+_totals = {}  # mode -> {'requests', 'prompt_tokens', 'cached_tokens', 'completion_tokens'}
+_totals_lock = threading.Lock()
+
+def usage_to_dict(usage):
+    """OpenAI usage 객체 → {'prompt_tokens', 'cached_tokens', 'completion_tokens'}"""
+    if usage is None:
+        return {'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0}
+
+    details = getattr(usage, 'prompt_tokens_details', None)
+    return {
+        'prompt_tokens': getattr(usage, 'prompt_tokens', 0) or 0,
+        'cached_tokens': (getattr(details, 'cached_tokens', 0) or 0) if details else 0,
+        'completion_tokens': getattr(usage, 'completion_tokens', 0) or 0
+    }
+
+def estimate_cost(usage, model=None):
+    """usage_to_dict 형식 사용량 → 예상 비용 (USD), 가격표(MODEL_PRICES)에 없는 모델은 None"""
+    prices = MODEL_PRICES.get(model or API_CONFIG['model_name'])
+    if prices is None:
+        return None
+    input_price, cached_price, output_price = prices
+    uncached = usage.get('prompt_tokens', 0) - usage.get('cached_tokens', 0)
+    return (uncached * input_price + usage.get('cached_tokens', 0) * cached_price
+            + usage.get('completion_tokens', 0) * output_price) / 1_000_000
+
+def record_usage(mode, usage):
+    """
+    요청 한 건의 사용량 기록 (usage는 OpenAI usage 객체 또는 usage_to_dict 결과)
+    진행 중인 텔레메트리 추적이 있으면 토큰/예상 비용도 거기에 붙임
+    """
+    if not isinstance(usage, dict):
+        usage = usage_to_dict(usage)
+    note_usage(usage, estimate_cost(usage))
+
+    with _totals_lock:
+        totals = _totals.setdefault(mode, {
+            'requests': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0
+        })
+        totals['requests'] += 1
+        for key in ('prompt_tokens', 'cached_tokens', 'completion_tokens'):
+            totals[key] += usage.get(key, 0)
+
+    logger.info(
+        "토큰 사용량 mode=%s prompt=%d cached=%d completion=%d",
+        mode, usage.get('prompt_tokens', 0), usage.get('cached_tokens', 0), usage.get('completion_tokens', 0)
+    )
+    return usage
+
+def get_usage_stats():
+    """모드별 누적 사용량 + 프롬프트 캐시 적중률(cached / prompt 토큰, %)"""
+    with _totals_lock:
+        stats = {mode: dict(totals) for mode, totals in _totals.items()}
+
+    for totals in stats.values():
+        prompt = totals['prompt_tokens']
+        totals['cached_rate'] = round(totals['cached_tokens'] / prompt * 100, 1) if prompt else 0
+    return stats